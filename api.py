@@ -1,9 +1,27 @@
-from fastapi import FastAPI, HTTPException
+import time
+_IMPORT_START = time.perf_counter()
+
+from fastapi import FastAPI, HTTPException, Request, UploadFile, File, Depends, Header
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import StreamingResponse, PlainTextResponse, JSONResponse
 from pydantic import BaseModel
+from typing import List, Literal, Optional
 from fastapi.middleware.cors import CORSMiddleware
-from rag_system import CareerAI
-from career_data import CAREER_TIPS
-from user_db import init_user_db, save_message
+from user_db import init_user_db, save_message, close_user_db, get_history_page
+from file_utils import (
+    extract_text_from_path, save_upload, ExtractionError, FileTooLargeError, MAX_FILE_BYTES, shutdown_extract_pool,
+)
+from law_index import LawIndex
+from job_queue import JobQueue, JobError
+from session_store import is_valid_session_id
+from monitor.metrics import metrics, start_request_timing, end_request_timing, server_timing_header
+from monitor.rollups import get_rollup_store, ROLLUP_INTERVAL
+import asyncio
+import json
+import os
+import secrets
+import threading
+# rag_system(chromadb, 임베딩 모델, google.generativeai)은 무거워서 백그라운드 워밍업에서 불러옴
 
 # 1. 앱 초기화
 app = FastAPI(title="Job-Navigator API", description="AI 자소서 코칭 백엔드 서버")
@@ -23,32 +41,146 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
-# 3. AI 시스템 로드
-print("🚀 AI 시스템 로딩 중...")
-ai_system = CareerAI()
-ai_system.load_data(CAREER_TIPS)
-init_user_db()
-print("✅ 로딩 완료!")
+# 요청별 구간 시간 측정 → Server-Timing 헤더 + /metrics 집계
+@app.middleware("http")
+async def add_server_timing(request: Request, call_next):
+    timings, token = start_request_timing()
+    start = time.perf_counter()
+    try:
+        response = await call_next(request)
+    finally:
+        end_request_timing(token)
+    total_ms = (time.perf_counter() - start) * 1000
+    route = request.scope.get("route")
+    path = route.path if route is not None else request.url.path  # /api/jobs/{job_id} 처럼 템플릿 기준으로 집계
+    metrics.observe(f"http {request.method} {path}", total_ms)
+    response.headers["Server-Timing"] = server_timing_header(timings + [("total", total_ms)])
+    return response
+
+# 3. AI 시스템 로드 (백그라운드 워밍업)
+# "/" 는 서버가 뜨자마자 응답하고, 모델/인덱스 준비가 끝나면 "/ready" 가 200 으로 바뀜
+# 준비 전에 들어온 AI 요청은 503 + Retry-After 로 돌려보냄
+READY_RETRY_AFTER = "5"
+READY_POLL_INTERVAL = 0.2   # 초 - 워밍업을 기다리는 백그라운드 작업이 준비/실패 여부를 확인하는 주기
+
+ai_system = None
+startup = {"import_ms": None, "ready_ms": None, "stages": {}, "error": None}
+_ready = threading.Event()
+
+
+def _elapsed_ms():
+    return round((time.perf_counter() - _IMPORT_START) * 1000, 1)
+
+
+def _warm_up():
+    global ai_system
+    print("🚀 AI 시스템 로딩 중...")
+    stages = startup["stages"]
+    try:
+        t = time.perf_counter()
+        from rag_system import CareerAI
+        from career_data import CAREER_TIPS
+        stages["import_rag_ms"] = round((time.perf_counter() - t) * 1000, 1)
+
+        t = time.perf_counter()
+        system = CareerAI()
+        system.load_data(CAREER_TIPS)
+        init_user_db()
+        stages["load_ms"] = round((time.perf_counter() - t) * 1000, 1)
+
+        stages.update(system.warm_up())
+        ai_system = system
+    except Exception as e:
+        startup["error"] = str(e)
+        print(f"❌ AI 시스템 로딩 실패: {e}")
+        return
+
+    startup["ready_ms"] = _elapsed_ms()
+    metrics.observe("startup time_to_ready", startup["ready_ms"])
+    _ready.set()
+    print(f"✅ 로딩 완료! ({startup['ready_ms']}ms)")
+
+
+@app.on_event("startup")
+def start_warm_up():
+    threading.Thread(target=_warm_up, name="warm-up", daemon=True).start()
+
+
+async def wait_until_ready():
+    """
+    워밍업이 끝날 때까지 이벤트 루프를 막지 않고 기다림 → 준비되면 True, 워밍업이 실패하면 False
+    (스레드에서 _ready.wait() 로 기다리면 실패 시 영원히 풀리지 않고, 종료 때 취소해도 스레드가 남아 종료가 멈춤)
+    """
+    while not _ready.is_set():
+        if startup["error"]:
+            return False
+        await asyncio.sleep(READY_POLL_INTERVAL)
+    return True
+
+
+def require_ai():
+    """AI 가 필요한 엔드포인트용 의존성 - 워밍업 전이면 503"""
+    if not _ready.is_set():
+        raise HTTPException(
+            status_code=503,
+            detail="AI 시스템을 준비 중입니다. 잠시 후 다시 시도해 주세요.",
+            headers={"Retry-After": READY_RETRY_AFTER},
+        )
+    return ai_system
+
+# 관리자 전용 엔드포인트 (채팅 기록, 통계) - X-Admin-Token 헤더가 ADMIN_TOKEN 과 같아야 함
+# ADMIN_TOKEN 을 설정하지 않으면 관리자 엔드포인트는 모두 닫힘
+ADMIN_TOKEN = os.getenv("ADMIN_TOKEN")
+
+def require_admin(x_admin_token: Optional[str] = Header(None)):
+    if not ADMIN_TOKEN:
+        raise HTTPException(status_code=503, detail="관리자 토큰(ADMIN_TOKEN)이 설정되지 않았습니다.")
+    if not x_admin_token or not secrets.compare_digest(x_admin_token, ADMIN_TOKEN):
+        raise HTTPException(status_code=401, detail="관리자 인증이 필요합니다.")
 
 # ------------------------------------------------------------------
 # 4. 데이터 모델 정의 (주문서 양식)
 # ------------------------------------------------------------------
 class CoachingRequest(BaseModel):
     user_input: str  # 자소서 내용 (코칭용)
+    mode: Literal["full", "fast"] = "full"  # full: 2단계 코칭, fast: 1회 호출 구조화 코칭
+    session_id: Optional[str] = None        # 멀티턴 대화 ID (클라이언트가 만든 UUID 등, 생략 시 단발성 코칭)
+
+class BatchCoachingRequest(BaseModel):
+    user_inputs: List[str]                  # 자소서 여러 건 (일괄 코칭용)
+    max_concurrency: Optional[int] = None   # 배치 안에서 동시에 돌릴 개수 (생략 시 서버 기본값)
+    mode: Literal["full", "fast"] = "full"
 
 class ParseRequest(BaseModel):
     raw_resume: str  # 통짜 이력서 텍스트 (파싱용) - 🔥 신규 추가
 
+class LawSearchRequest(BaseModel):
+    query: str                       # 법률 질문
+    top_k: int = 5                   # 돌려줄 조문/항 개수
+    law_name: Optional[str] = None   # 특정 법령만 검색 (예: "근로기준법")
+
+class JobRequest(BaseModel):
+    kind: Literal["coach", "parse"]  # coach: CoachingRequest 양식, parse: ParseRequest 양식
+    payload: dict
+
 # ------------------------------------------------------------------
 # 5. API 엔드포인트 (메뉴판)
 # ------------------------------------------------------------------
 
-# [메뉴 1] 자소서 코칭 (기존 기능)
+def check_session_id(session_id):
+    if session_id is not None and not is_valid_session_id(session_id):
+        raise HTTPException(status_code=422, detail="session_id 는 영문/숫자/-/_ 8~64자여야 합니다.")
+
+# [메뉴 1] 자소서 코칭 (기존 기능) - session_id 를 보내면 이전 대화 맥락(요약 + 최근 턴)을 이어서 코칭
 @app.post("/api/coach")
-async def get_coaching(request: CoachingRequest):
+async def get_coaching(request: CoachingRequest, ai=Depends(require_ai)):
+    check_session_id(request.session_id)
     try:
-        response_text, sources, draft_text = ai_system.get_coaching(request.user_input)
-        save_message(request.user_input, response_text)
+        # 비동기 파이프라인: LLM 대기 중에도 다른 요청(헬스 체크 포함)을 처리
+        response_text, sources, draft_text = await ai.aget_coaching(
+            request.user_input, mode=request.mode, session_id=request.session_id
+        )
+        await run_in_threadpool(save_message, request.user_input, response_text)
         return {
             "status": "success",
             "answer": response_text,
@@ -57,13 +189,58 @@ async def get_coaching(request: CoachingRequest):
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
+# [메뉴 1-1] 자소서 코칭 스트리밍 (Server-Sent Events)
+# 검색/1차 분석 완료 이벤트 후, 2차 코칭 토큰을 도착하는 대로 전송
+@app.post("/api/coach/stream")
+async def stream_coaching(request: CoachingRequest, ai=Depends(require_ai)):
+    check_session_id(request.session_id)
+
+    async def event_stream():
+        async for event in ai.astream_coaching(request.user_input, mode=request.mode, session_id=request.session_id):
+            if event["event"] == "done":
+                await run_in_threadpool(save_message, request.user_input, event["answer"])
+            yield f"event: {event['event']}\ndata: {json.dumps(event, ensure_ascii=False)}\n\n"
+
+    return StreamingResponse(
+        event_stream(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+# [메뉴 1-2] 자소서 일괄 코칭 (기수 단위 리뷰)
+# 항목별 결과/에러를 따로 돌려주므로 일부가 실패해도 전체는 200 응답
+MAX_BATCH_ITEMS = 100
+MAX_BATCH_CONCURRENCY = 16
+
+@app.post("/api/coach/batch")
+async def get_coaching_batch(request: BatchCoachingRequest, ai=Depends(require_ai)):
+    from rag_system import BATCH_COACHING_CONCURRENCY
+
+    if not request.user_inputs:
+        raise HTTPException(status_code=400, detail="user_inputs 가 비어 있습니다.")
+    if len(request.user_inputs) > MAX_BATCH_ITEMS:
+        raise HTTPException(status_code=400, detail=f"한 번에 최대 {MAX_BATCH_ITEMS}건까지 가능합니다.")
+
+    concurrency = min(request.max_concurrency or BATCH_COACHING_CONCURRENCY, MAX_BATCH_CONCURRENCY)
+    try:
+        results = await ai.aget_coaching_batch(request.user_inputs, max_concurrency=concurrency, mode=request.mode)
+        for item in results:
+            if item["status"] == "success":
+                await run_in_threadpool(save_message, request.user_inputs[item["index"]], item["answer"])
+        return {
+            "status": "success",
+            "results": results
+        }
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
 # [메뉴 2] 이력서 JSON 변환 (🔥 신규 추가된 기능!)
 # 외부에서 'POST /api/parse' 주소로 요청하면 이 함수가 실행됩니다.
 @app.post("/api/parse")
-async def parse_resume(request: ParseRequest):
+async def parse_resume(request: ParseRequest, ai=Depends(require_ai)):
     try:
         # 주방장(rag_system)에게 파싱 시키기
-        parsed_data = ai_system.parse_resume_to_json(request.raw_resume)
+        parsed_data = await ai.aparse_resume_to_json(request.raw_resume)
         
         return {
             "status": "success",
@@ -72,7 +249,223 @@ async def parse_resume(request: ParseRequest):
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
-# 6. 헬스 체크
+# [메뉴 2-1] 이력서 파일(PDF/DOCX/TXT) 업로드 → 텍스트 추출 → JSON 변환
+@app.post("/api/parse/file")
+async def parse_resume_file(file: UploadFile = File(...), ai=Depends(require_ai)):
+    filename = file.filename or ""
+    if file.size is not None and file.size > MAX_FILE_BYTES:
+        raise HTTPException(status_code=413, detail=f"파일이 너무 큽니다. (최대 {MAX_FILE_BYTES // (1024 * 1024)}MB)")
+
+    # 업로드(spooled 임시 파일)를 조금씩 읽어 디스크 임시 파일로 옮기고, 추출은 그 경로로
+    # (내용을 메모리에 모아두거나 작업자 프로세스마다 복사해 보내지 않음)
+    path = None
+    try:
+        path, digest = await run_in_threadpool(save_upload, file.file, filename)
+        with metrics.span("extract_text"):
+            raw_text = await run_in_threadpool(extract_text_from_path, path, filename, digest)
+    except FileTooLargeError as e:
+        raise HTTPException(status_code=413, detail=str(e))
+    except ExtractionError as e:
+        raise HTTPException(status_code=422, detail=str(e))
+    except Exception as e:
+        raise HTTPException(status_code=400, detail=f"파일 읽기 오류: {e}")
+    finally:
+        if path is not None:
+            os.unlink(path)
+
+    if not raw_text:
+        raise HTTPException(status_code=422, detail="파일에서 텍스트를 찾지 못했습니다.")
+
+    try:
+        parsed_data = await ai.aparse_resume_to_json(raw_text)
+        return {
+            "status": "success",
+            "data": parsed_data
+        }
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+# [메뉴 3] 채팅 기록 조회 (관리자용) - 최신순 페이지 단위, q 로 전문 검색 (2글자 이하 단어만 있으면 최근 기록 안에서만 찾음)
+# 다음 페이지는 응답의 next_cursor 를 cursor 로 넘기면 됨
+@app.get("/api/history", dependencies=[Depends(require_admin)])
+async def list_history(limit: int = 50, cursor: Optional[int] = None, q: Optional[str] = None,
+                       start: Optional[str] = None, end: Optional[str] = None):
+    try:
+        page = await run_in_threadpool(get_history_page, limit, cursor, q, start, end)
+        return {"status": "success", **page}
+    except ValueError as e:
+        raise HTTPException(status_code=422, detail=str(e))
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+# [메뉴 4] 법령 조문 검색 - 별도 law 컬렉션에서 top-k 조문/항
+# 적재는 `python law_index.py ingest <벌크 JSONL...>` 로 따로 돌림
+MAX_LAW_TOP_K = 50
+_law_index = None
+_law_index_lock = threading.Lock()
+
+def get_law_index(ai):
+    global _law_index
+    with _law_index_lock:
+        if _law_index is None:
+            _law_index = LawIndex(embedding_function=getattr(ai, "embedding_fn", None))
+        return _law_index
+
+@app.post("/api/law/search")
+async def search_law(request: LawSearchRequest, ai=Depends(require_ai)):
+    if not 1 <= request.top_k <= MAX_LAW_TOP_K:
+        raise HTTPException(status_code=422, detail=f"top_k 는 1~{MAX_LAW_TOP_K} 사이여야 합니다.")
+    try:
+        index = await run_in_threadpool(get_law_index, ai)
+        hits = await run_in_threadpool(index.search, request.query, request.top_k, request.law_name)
+        return {"status": "success", "results": hits}
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+# [메뉴 5] 백그라운드 작업 (모바일/느린 연결용) - 등록 후 바로 202, 결과는 작업 ID 로 조회
+# 같은 내용의 작업이 진행 중이거나 결과가 남아 있으면 새로 만들지 않고 그 작업을 돌려줌
+# (세션 대화는 같은 글이라도 이전 턴에 따라 답이 달라지므로 중복 제거하지 않음)
+JOB_PAYLOAD_MODELS = {"coach": CoachingRequest, "parse": ParseRequest}
+job_queue = None   # 서버 시작 시 생성 (import 만으로 monitor/jobs.db 를 만들지 않도록)
+
+def require_job_queue():
+    if job_queue is None:
+        raise HTTPException(status_code=503, detail="작업 큐를 준비 중입니다.", headers={"Retry-After": READY_RETRY_AFTER})
+    return job_queue
+
+async def run_coach_job(payload):
+    request = CoachingRequest(**payload)
+    # CoachingError (API 키 없음 포함) 는 작업 실패로 기록
+    answer, sources = await ai_system.acoach_job(request.user_input, request.mode, request.session_id)
+    await asyncio.to_thread(save_message, request.user_input, answer)
+    return {"answer": answer, "sources": sources}
+
+async def run_parse_job(payload):
+    request = ParseRequest(**payload)
+    parsed_data = await ai_system.aparse_resume_to_json(request.raw_resume)
+    if "error" in parsed_data:
+        raise JobError(parsed_data["error"])
+    return {"data": parsed_data}
+
+@app.on_event("startup")
+async def start_job_workers():
+    global job_queue
+    job_queue = JobQueue()
+    job_queue.register("coach", run_coach_job)
+    job_queue.register("parse", run_parse_job)
+
+    async def start_when_ready():
+        # 워밍업이 끝나야 handler 가 ai_system 을 쓸 수 있음 (재시작 전에 남은 작업도 이때부터 처리)
+        if not await wait_until_ready():
+            print("⚠️ AI 시스템 로딩 실패로 작업 큐 작업자를 시작하지 않습니다.")
+            return
+        await job_queue.start()
+        print(f"✅ 작업 큐 시작 (작업자 {job_queue.workers}개)")
+
+    app.state.job_starter = asyncio.create_task(start_when_ready())
+
+@app.post("/api/jobs", status_code=202)
+async def submit_job(request: JobRequest, ai=Depends(require_ai), queue=Depends(require_job_queue)):
+    try:
+        payload = JOB_PAYLOAD_MODELS[request.kind](**request.payload).model_dump()
+    except Exception as e:
+        raise HTTPException(status_code=422, detail=f"payload 오류: {e}")
+    check_session_id(payload.get("session_id"))
+    try:
+        job, created = await run_in_threadpool(queue.submit, request.kind, payload, not payload.get("session_id"))
+        return {"status": "success", "job": job, "deduplicated": not created}
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+@app.get("/api/jobs/{job_id}")
+async def get_job(job_id: str, queue=Depends(require_job_queue)):
+    job = await run_in_threadpool(queue.get, job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="작업을 찾을 수 없습니다. (없는 ID 이거나 보관 기간이 지났습니다)")
+    return {"status": "success", "job": job}
+
+@app.delete("/api/jobs/{job_id}")
+async def cancel_job(job_id: str, queue=Depends(require_job_queue)):
+    job = await run_in_threadpool(queue.cancel, job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="작업을 찾을 수 없습니다. (없는 ID 이거나 보관 기간이 지났습니다)")
+    return {"status": "success", "job": job}
+
+# [메뉴 5-1] 대화 세션 초기화 ("새 대화") - 유휴 세션은 SESSION_IDLE_TTL 이 지나면 자동 삭제
+@app.delete("/api/sessions/{session_id}")
+async def reset_session(session_id: str, ai=Depends(require_ai)):
+    check_session_id(session_id)
+    deleted = await run_in_threadpool(ai.reset_session, session_id)
+    return {"status": "success", "deleted": deleted}
+
+# [메뉴 6] 관리자 통계 - 미리 집계된 테이블만 읽음 (기록 건수와 무관하게 일정한 조회 비용)
+# 집계는 백그라운드에서 ROLLUP_INTERVAL 초마다 새로 쌓인 기록만 반영
+MAX_ANALYTICS_MINUTES = 24 * 60
+MAX_ANALYTICS_HOURS = 24 * 90
+
+@app.on_event("startup")
+async def start_rollup_refresh():
+    async def refresh_loop():
+        while True:
+            try:
+                await asyncio.to_thread(get_rollup_store().refresh)
+            except Exception as e:
+                print(f"⚠️ 통계 집계 실패: {e}")
+            await asyncio.sleep(ROLLUP_INTERVAL)
+
+    app.state.rollup_refresher = asyncio.create_task(refresh_loop())
+
+@app.get("/api/admin/analytics", dependencies=[Depends(require_admin)])
+async def get_analytics(minutes: int = 60, hours: int = 48):
+    if not 1 <= minutes <= MAX_ANALYTICS_MINUTES or not 1 <= hours <= MAX_ANALYTICS_HOURS:
+        raise HTTPException(status_code=422, detail=f"minutes 는 1~{MAX_ANALYTICS_MINUTES}, hours 는 1~{MAX_ANALYTICS_HOURS} 사이여야 합니다.")
+    try:
+        dashboard = await run_in_threadpool(get_rollup_store().dashboard, minutes, hours)
+        return {"status": "success", **dashboard}
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+# 종료 시 백그라운드 큐에 남은 채팅 기록을 모두 저장
+# 실행 중이던 작업은 대기열로 되돌려서 재시작 후 이어서 처리
+@app.on_event("shutdown")
+async def flush_on_shutdown():
+    app.state.rollup_refresher.cancel()
+    app.state.job_starter.cancel()
+    if job_queue is not None:
+        await job_queue.stop()
+    await run_in_threadpool(close_user_db)
+    await run_in_threadpool(shutdown_extract_pool)
+
+# 6. 헬스 체크 - "/" 는 프로세스가 살아 있는지만, "/ready" 는 AI 워밍업 완료 여부
 @app.get("/")
 def health_check():
-    return {"status": "ok", "message": "Job-Navigator API is running"}
\ No newline at end of file
+    return {"status": "ok", "message": "Job-Navigator API is running"}
+
+@app.get("/ready")
+def readiness_check():
+    if _ready.is_set():
+        return {"status": "ready", **startup}
+    status = "failed" if startup["error"] else "warming_up"
+    return JSONResponse(status_code=503, content={"status": status, **startup}, headers={"Retry-After": READY_RETRY_AFTER})
+
+# 7. 지표 (구간별 p50/p95/p99, 카운터, 캐시 적중률) - 기본은 Prometheus 텍스트, ?format=json 가능
+@app.get("/metrics")
+def get_metrics(format: str = "prometheus"):
+    gauges = {"startup": {"import_ms": startup["import_ms"] or 0, "ready_ms": startup["ready_ms"] or 0, "ready": int(_ready.is_set())}}
+    if job_queue is not None:
+        gauges["jobs"] = job_queue.stats()
+    if ai_system is not None:
+        gauges["coaching_cache"] = ai_system.cache.stats()
+        gauges["resume_cache"] = ai_system.resume_cache.stats()
+        if hasattr(ai_system, "sessions"):
+            gauges["sessions"] = ai_system.sessions.stats()
+        if hasattr(ai_system, "embedding_fn"):
+            gauges["embedding"] = ai_system.embedding_fn.stats()
+
+    if format == "json":
+        return {**metrics.snapshot(), **gauges}
+    return PlainTextResponse(metrics.render_prometheus(gauges))
+
+# 모듈 import 에 걸린 시간 (uvicorn 이 연결을 받기 시작하기 전까지의 비용)
+startup["import_ms"] = _elapsed_ms()
+metrics.observe("startup api_import", startup["import_ms"])
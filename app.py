@@ -4,9 +4,12 @@ from pyngrok import ngrok
 from rag_system import CareerAI
 from career_data import CAREER_TIPS
 from monitor.gsheet_logger import RealTimeLogger
-from user_db import init_user_db, save_message, get_all_history 
+from user_db import init_user_db, save_message, get_history_page
+from monitor.rollups import get_rollup_store, start_background_refresh, ROLLUP_INTERVAL
+import pandas as pd
 import time
 import os
+import uuid
 
 # -------------------------------------------------------------------------
 # 1. 기본 설정
@@ -98,11 +101,16 @@ def init_system():
     init_user_db() 
     ai = CareerAI()
     ai.load_data(CAREER_TIPS)
-    logger = RealTimeLogger('monitor/service_key.json', 'CareerLog')
-    return ai, logger
+    return ai
+
+# 로거는 API Key 와 무관 → Key 교체 때 다시 만들지 않음 (전송 스레드가 하나만 돌도록)
+@st.cache_resource
+def init_logger():
+    return RealTimeLogger('monitor/service_key.json', 'CareerLog')
 
 try:
-    ai_system, logger = init_system()
+    ai_system = init_system()
+    logger = init_logger()
 except Exception as e:
     st.error(f"시스템 오류: {e}")
     st.stop()
@@ -133,6 +141,15 @@ tab1, tab2 = st.tabs(["📝 자소서 첨삭", "⚙️ 관리자"])
 with tab1:
     if "messages" not in st.session_state:
         st.session_state.messages = [{"role": "assistant", "content": "안녕하세요! 자소서 내용을 입력해주시면 분석해 드립니다."}]
+    # 브라우저 세션마다 대화 ID 1개 → 후속 질문은 서버에 저장된 요약 + 최근 턴을 이어서 코칭
+    if "session_id" not in st.session_state:
+        st.session_state.session_id = uuid.uuid4().hex
+
+    if len(st.session_state.messages) > 1 and st.button("🆕 새 대화"):
+        ai_system.reset_session(st.session_state.session_id)
+        del st.session_state.messages
+        del st.session_state.session_id
+        st.rerun()
 
     for msg in st.session_state.messages:
         avatar = "🎓" if msg["role"] == "assistant" else None
@@ -147,21 +164,42 @@ with tab1:
             st.markdown(prompt)
         
         logger.log("User", "REQ_COACHING", prompt[:30])
+        started = time.perf_counter()
 
         with st.chat_message("assistant", avatar="🎓"):
-            with st.status("분석 중...", expanded=True) as status:
-                st.write("🔍 데이터베이스 조회...")
-                time.sleep(0.5)
-                
-                response_text, sources, draft_text = ai_system.get_coaching(prompt)
-                
-                st.write("✨ 답변 작성 중...")
-                time.sleep(0.5)
-                status.update(label="완료!", state="complete", expanded=False)
-
-            st.markdown(response_text)
-
-        save_message(prompt, response_text)
+            # 실제 진행 단계(검색 → 1차 분석 → 코칭 작성)에 맞춰 상태 표시, 답변은 도착하는 대로 출력
+            status = st.status("🔍 데이터베이스 조회 중...", expanded=True)
+            result = {}
+
+            def answer_tokens():
+                for event in ai_system.stream_coaching(prompt, session_id=st.session_state.session_id):
+                    if event["event"] == "retrieval":
+                        status.write(f"🔍 참고 자료 {len(event['sources'])}건 조회 완료")
+                        status.update(label="🧐 1차 분석 중...")
+                    elif event["event"] == "draft":
+                        status.write("🧐 1차 분석 완료")
+                        status.update(label="✨ 답변 작성 중...")
+                    elif event["event"] == "token":
+                        yield event["text"]
+                    elif event["event"] == "done":
+                        result["answer"] = event["answer"]
+                        status.update(label="완료!", state="complete", expanded=False)
+                    elif event["event"] == "error":
+                        result["error"] = event["message"]
+                        status.update(label="오류", state="error", expanded=False)
+
+            st.write_stream(answer_tokens())
+            if "error" in result:
+                st.error(result["error"])
+
+        response_text = result.get("answer") or result.get("error", "")
+        # 관리자 통계(동작별 지연시간/오류 수)는 details 의 latency_ms 를 집계함
+        latency = f"latency_ms={(time.perf_counter() - started) * 1000:.0f}"
+        if "answer" in result:
+            save_message(prompt, response_text)
+            logger.log("AI", "RES_COACHING", latency)
+        else:
+            logger.log("AI", "ERR_COACHING", f"{latency} {response_text[:30]}")
         st.session_state.messages.append({"role": "assistant", "content": response_text})
         
         scroll_to_bottom()
@@ -183,7 +221,8 @@ with tab2:
             if st.button("🔄 Key 덮어쓰기"):
                 if new_key.strip():
                     os.environ["GOOGLE_API_KEY"] = new_key.strip()
-                    st.cache_resource.clear()
+                    # AI 시스템만 새 Key 로 다시 만듦 (전체 clear 는 로거 스레드/ngrok 연결까지 새로 만듦)
+                    init_system.clear()
                     st.toast("새로운 Key 적용 완료!")
                     time.sleep(1)
                     st.rerun()
@@ -192,9 +231,57 @@ with tab2:
 
         st.divider()
 
+        st.markdown("##### 📊 이용 통계")
+        # 원본 기록이 아닌 집계 테이블만 읽음 (새로 쌓인 기록 반영은 백그라운드 스레드가 주기적으로)
+        start_background_refresh()
+        dash = get_rollup_store().dashboard(minutes=60, hours=48)
+        st.caption(f"집계는 {ROLLUP_INTERVAL:.0f}초마다 갱신됩니다.")
+
+        last_hour = dash["per_minute"]
+        col_req, col_err = st.columns(2)
+        col_req.metric("최근 1시간 요청", sum(r["requests"] for r in last_hour))
+        col_err.metric("최근 1시간 오류", sum(r["errors"] for r in last_hour))
+        if dash["per_hour"]:
+            st.caption("시간당 요청 수 (최근 48시간)")
+            st.bar_chart(pd.DataFrame(dash["per_hour"]).set_index("bucket")[["requests", "errors"]])
+        st.caption("입력 길이 분포 (글자 수)")
+        st.bar_chart(pd.DataFrame(
+            [{"구간": f"~{r['le']}" if r["le"] else "그 이상", "건수": r["count"]} for r in dash["input_length"]]
+        ).set_index("구간"))
+        if dash["latency_ms"]:
+            st.caption("동작별 지연시간 (ms)")
+            st.dataframe(pd.DataFrame(dash["latency_ms"]).T, use_container_width=True)
+        st.dataframe(dash["actions"], use_container_width=True)
+
+        st.divider()
+
         st.markdown("##### 📥 사용자 데이터")
-        history_df = get_all_history()
-        st.dataframe(history_df, use_container_width=True)
+        # 전체 테이블을 읽지 않고 페이지 단위로 조회 (검색어는 전문 검색)
+        search = st.text_input("🔎 기록 검색", placeholder="질문/답변 내용 (3글자 이상 단어 포함)")
+        if st.session_state.get("history_search") != search:
+            st.session_state.history_search = search
+            st.session_state.history_cursors = [None]
+        cursors = st.session_state.setdefault("history_cursors", [None])
+
+        try:
+            page = get_history_page(limit=50, cursor=cursors[-1], query=search or None)
+        except ValueError as e:
+            # 검색 조건이 잘못됐을 때 필터 없는 목록을 보여주면 검색 결과로 오해할 수 있음
+            st.error(f"검색할 수 없습니다: {e}")
+            page = {"items": [], "next_cursor": None, "scan_limit": None}
+        if page["scan_limit"]:
+            st.caption(f"ℹ️ 짧은 검색어라 최근 {page['scan_limit']:,}건 안에서만 찾았습니다.")
+        st.dataframe(page["items"], use_container_width=True)
+
+        col_prev, col_next = st.columns(2)
+        with col_prev:
+            if len(cursors) > 1 and st.button("◀ 이전"):
+                cursors.pop()
+                st.rerun()
+        with col_next:
+            if page["next_cursor"] is not None and st.button("다음 ▶"):
+                cursors.append(page["next_cursor"])
+                st.rerun()
         
         st.divider()
         
@@ -0,0 +1,241 @@
+"""
+오프라인 부하/지연시간 벤치마크
+
+가짜 LLM(LLM_BACKEND=fake) + 해시 임베딩(EMBEDDING_BACKEND=hash) 으로 API 키/네트워크 없이
+dummy_personas.json, career_data.CAREER_TIPS 를 작업량으로 써서 측정함
+
+사용법:
+    python benchmark.py                                   # 기본: 동시성 1,4,16 / 시나리오 전체
+    python benchmark.py --concurrency 1,8,32 --requests 200 --latency 0.3 --error-rate 0.05
+    python benchmark.py --out bench.json --compare baseline.json   # 이전 결과와 비교
+
+시나리오:
+    coach     POST /api/coach   (mode=full, LLM 2회)
+    fast      POST /api/coach   (mode=fast, LLM 1회)
+    parse     POST /api/parse
+    retrieval CareerAI.search_tips (임베딩 + 벡터 검색)
+    history   user_db.save_message (채팅 기록 저장 큐)
+"""
+import argparse
+import asyncio
+import json
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+import time
+
+REPO_DIR = os.path.dirname(os.path.abspath(__file__))
+SCENARIOS = ("coach", "fast", "parse", "retrieval", "history")
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Job-Navigator 오프라인 벤치마크")
+    parser.add_argument("--concurrency", default="1,4,16", help="동시 요청 수 목록 (쉼표 구분)")
+    parser.add_argument("--requests", type=int, default=64, help="시나리오/동시성 조합마다 보낼 요청 수")
+    parser.add_argument("--scenarios", default=",".join(SCENARIOS), help=f"실행할 시나리오 ({', '.join(SCENARIOS)})")
+    parser.add_argument("--latency", type=float, default=0.2, help="가짜 LLM 호출 1회 지연시간(초)")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="가짜 LLM 오류 비율 (429 → 재시도 대상)")
+    parser.add_argument("--seed", type=int, default=0, help="가짜 LLM 오류 순서 seed")
+    parser.add_argument("--real-embeddings", action="store_true", help="해시 임베딩 대신 실제 임베딩 모델 사용")
+    parser.add_argument("--out", default="bench_results.json", help="결과 JSON 파일")
+    parser.add_argument("--compare", help="비교할 이전 결과 JSON (p95/처리량 변화 출력)")
+    return parser.parse_args(argv)
+
+
+def configure_environment(args, workdir):
+    """api / rag_system 을 불러오기 전에 가짜 백엔드와 임시 저장소 경로를 지정"""
+    os.environ["LLM_BACKEND"] = "fake"
+    os.environ["FAKE_LLM_LATENCY"] = str(args.latency)
+    os.environ["FAKE_LLM_ERROR_RATE"] = str(args.error_rate)
+    os.environ["FAKE_LLM_SEED"] = str(args.seed)
+    os.environ.setdefault("LLM_RPM", "0")
+    os.environ.setdefault("LLM_TPM", "0")
+    os.environ.setdefault("LLM_RETRY_BASE_DELAY", "0.05")
+    if not args.real_embeddings:
+        os.environ["EMBEDDING_BACKEND"] = "hash"
+    # 캐시/DB/벡터 인덱스는 모두 임시 폴더에 만들어서 실제 데이터에 영향 없음
+    sys.path.insert(0, REPO_DIR)
+    os.chdir(workdir)
+
+
+def load_personas():
+    with open(os.path.join(REPO_DIR, "dummy_personas.json"), encoding="utf-8") as f:
+        return json.load(f)["personas"]
+
+
+def build_payloads(scenario, personas, count, level):
+    """
+    요청마다 내용을 조금씩 바꿔서 캐시/중복 호출 합치기에 걸리지 않게 함 (순수 처리 비용 측정)
+    동시성 단계(level)도 내용에 넣어서 이전 단계 결과가 캐시로 재사용되지 않게 함
+    """
+    payloads = []
+    for i in range(count):
+        persona = personas[i % len(personas)]
+        tag = f" (요청 {i}, c{level})"
+        if scenario in ("coach", "fast"):
+            payloads.append({"user_input": persona["raw_input"] + tag, "mode": "fast" if scenario == "fast" else "full"})
+        elif scenario == "parse":
+            resume = (
+                f"2019.03 ~ 2022.02 (주)테스트컴퍼니{i} {persona['job_title']}\n"
+                f"{persona['refined_output']}\n"
+                f"2022.03 ~ 현재 주식회사 샘플{i} 시니어 {persona['job_title']}{tag}\n{persona['raw_input']}"
+            )
+            payloads.append({"raw_resume": resume})
+        else:
+            payloads.append(persona["raw_input"] + tag)
+    return payloads
+
+
+def summarize(scenario, concurrency, latencies, errors, wall):
+    from monitor.metrics import Histogram
+
+    hist = Histogram(size=max(1, len(latencies)))
+    for ms in latencies:
+        hist.observe(ms)
+    total = len(latencies) + errors
+    return {
+        "scenario": scenario,
+        "concurrency": concurrency,
+        "requests": total,
+        "errors": errors,
+        "error_rate": round(errors / total, 4) if total else 0.0,
+        "throughput_rps": round(total / wall, 2) if wall else 0.0,
+        "mean_ms": round(hist.total / hist.count, 2) if hist.count else 0.0,
+        "p50_ms": round(hist.percentile(50), 2),
+        "p95_ms": round(hist.percentile(95), 2),
+        "p99_ms": round(hist.percentile(99), 2),
+    }
+
+
+async def run_level(scenario, concurrency, payloads, client, ai_system):
+    """payloads 를 concurrency 개 작업자가 나눠서 처리 → 요청별 지연시간 / 오류 수 / 전체 시간"""
+    from monitor.rollups import HISTORY_ERROR_PREFIXES
+    from user_db import save_message
+
+    queue = asyncio.Queue()
+    for payload in payloads:
+        queue.put_nowait(payload)
+    latencies, errors = [], 0
+
+    async def call(payload):
+        if scenario in ("coach", "fast"):
+            response = await client.post("/api/coach", json=payload)
+            # 코칭은 실패해도 200 + 에러 문구라서 본문 앞부분으로 판단 (집계 테이블과 같은 기준)
+            return response.status_code == 200 and not response.json().get("answer", "").startswith(HISTORY_ERROR_PREFIXES)
+        if scenario == "parse":
+            response = await client.post("/api/parse", json=payload)
+            return response.status_code == 200 and "error" not in response.json().get("data", {})
+        if scenario == "retrieval":
+            await asyncio.to_thread(ai_system.search_tips, payload)
+            return True
+        await asyncio.to_thread(save_message, payload, "벤치마크 응답")
+        return True
+
+    async def worker():
+        nonlocal errors
+        while not queue.empty():
+            payload = queue.get_nowait()
+            start = time.perf_counter()
+            try:
+                ok = await call(payload)
+            except Exception:
+                ok = False
+            if ok:
+                latencies.append((time.perf_counter() - start) * 1000)
+            else:
+                errors += 1
+
+    start = time.perf_counter()
+    await asyncio.gather(*[worker() for _ in range(concurrency)])
+    return latencies, errors, time.perf_counter() - start
+
+
+async def run_benchmark(args):
+    import httpx
+    import api
+    from user_db import flush_history
+
+    api._warm_up()
+    if not api._ready.is_set():
+        raise RuntimeError(f"AI 시스템 준비 실패: {api.startup['error']}")
+
+    personas = load_personas()
+    levels = [int(c) for c in args.concurrency.split(",") if c.strip()]
+    scenarios = [s.strip() for s in args.scenarios.split(",") if s.strip()]
+    unknown = set(scenarios) - set(SCENARIOS)
+    if unknown:
+        raise SystemExit(f"알 수 없는 시나리오: {', '.join(sorted(unknown))}")
+
+    results = []
+    transport = httpx.ASGITransport(app=api.app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench", timeout=120) as client:
+        for scenario in scenarios:
+            for level in levels:
+                payloads = build_payloads(scenario, personas, args.requests, level)
+                latencies, errors, wall = await run_level(scenario, level, payloads, client, api.ai_system)
+                if scenario == "history":
+                    flush_history()
+                row = summarize(scenario, level, latencies, errors, wall)
+                results.append(row)
+                print(f"{scenario:<10} c={level:<4} {row['throughput_rps']:>8.1f} req/s  "
+                      f"p50={row['p50_ms']:>8.1f}ms  p95={row['p95_ms']:>8.1f}ms  p99={row['p99_ms']:>8.1f}ms  "
+                      f"errors={row['errors']}")
+    return results
+
+
+def git_commit():
+    try:
+        return subprocess.check_output(["git", "-C", REPO_DIR, "rev-parse", "--short", "HEAD"], text=True).strip()
+    except Exception:
+        return None
+
+
+def compare(results, baseline_path):
+    """이전 결과 대비 p95 / 처리량 변화율 출력 (같은 시나리오 + 동시성끼리)"""
+    with open(baseline_path, encoding="utf-8") as f:
+        baseline = {(r["scenario"], r["concurrency"]): r for r in json.load(f)["results"]}
+    print(f"\n📊 {baseline_path} 대비")
+    for row in results:
+        old = baseline.get((row["scenario"], row["concurrency"]))
+        if not old:
+            continue
+        p95 = (row["p95_ms"] - old["p95_ms"]) / old["p95_ms"] * 100 if old["p95_ms"] else 0.0
+        rps = (row["throughput_rps"] - old["throughput_rps"]) / old["throughput_rps"] * 100 if old["throughput_rps"] else 0.0
+        print(f"{row['scenario']:<10} c={row['concurrency']:<4} p95 {p95:+6.1f}%  throughput {rps:+6.1f}%")
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    out_path = os.path.abspath(args.out)
+    compare_path = os.path.abspath(args.compare) if args.compare else None
+
+    with tempfile.TemporaryDirectory(prefix="jobnav-bench-") as workdir:
+        configure_environment(args, workdir)
+        results = asyncio.run(run_benchmark(args))
+
+        from user_db import close_user_db
+        close_user_db()
+        os.chdir(REPO_DIR)
+
+    report = {
+        "meta": {
+            "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+            "commit": git_commit(),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "config": vars(args),
+        },
+        "results": results,
+    }
+    with open(out_path, "w", encoding="utf-8") as f:
+        json.dump(report, f, ensure_ascii=False, indent=2)
+    print(f"\n✅ 결과 저장: {out_path}")
+
+    if compare_path:
+        compare(results, compare_path)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,150 @@
+import sqlite3
+import hashlib
+import json
+import os
+import re
+import threading
+import time
+import unicodedata
+
+# 캐시 DB 경로 / 설정값 (환경변수로 조정 가능)
+CACHE_DB = os.getenv("COACH_CACHE_DB", "monitor/coaching_cache.db")
+CACHE_TTL = int(os.getenv("COACH_CACHE_TTL", str(7 * 24 * 3600)))       # 초 단위 (기본 7일)
+CACHE_MAX_ENTRIES = int(os.getenv("COACH_CACHE_MAX_ENTRIES", "5000"))
+
+
+def normalize_text(text):
+    """공백/유니코드 차이만 있는 입력은 같은 글로 취급"""
+    text = unicodedata.normalize("NFC", text or "")
+    return re.sub(r"\s+", " ", text).strip()
+
+
+class CoachingCache:
+    """
+    코칭 응답 캐시 (SQLite 디스크 저장)
+    - 키: 정규화된 사용자 글 + 검색된 팁 문서 ID + 프롬프트 버전
+    - TTL 만료 / 최대 개수 초과 시 오래 안 쓴 항목부터 삭제(LRU)
+    - 팁 문서가 바뀌면 그 문서를 참조한 항목만 무효화
+    """
+
+    def __init__(self, db_path=CACHE_DB, ttl=CACHE_TTL, max_entries=CACHE_MAX_ENTRIES):
+        self.db_path = db_path
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+
+        folder = os.path.dirname(db_path)
+        if folder:
+            os.makedirs(folder, exist_ok=True)
+        self.conn = sqlite3.connect(db_path, check_same_thread=False)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.executescript('''
+            CREATE TABLE IF NOT EXISTS coaching_cache (
+                key TEXT PRIMARY KEY,
+                answer TEXT,
+                sources TEXT,
+                draft TEXT,
+                created_at REAL,
+                last_access REAL
+            );
+            CREATE TABLE IF NOT EXISTS coaching_cache_deps (
+                key TEXT,
+                doc_id TEXT
+            );
+            CREATE INDEX IF NOT EXISTS idx_cache_deps_doc ON coaching_cache_deps(doc_id);
+            CREATE INDEX IF NOT EXISTS idx_cache_deps_key ON coaching_cache_deps(key);
+            CREATE INDEX IF NOT EXISTS idx_cache_access ON coaching_cache(last_access);
+        ''')
+        self.conn.commit()
+
+    @staticmethod
+    def make_key(user_text, doc_ids, prompt_version):
+        raw = json.dumps([prompt_version, normalize_text(user_text), sorted(doc_ids)], ensure_ascii=False)
+        return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+    def get(self, key):
+        """(answer, sources, draft) 또는 None"""
+        now = time.time()
+        with self._lock:
+            row = self.conn.execute(
+                "SELECT answer, sources, draft, created_at FROM coaching_cache WHERE key = ?", (key,)
+            ).fetchone()
+            if row is None or now - row[3] > self.ttl:
+                if row is not None:
+                    self._delete_keys([key])
+                    self.conn.commit()
+                self.misses += 1
+                return None
+            self.conn.execute("UPDATE coaching_cache SET last_access = ? WHERE key = ?", (now, key))
+            self.conn.commit()
+            self.hits += 1
+        return row[0], json.loads(row[1]), row[2]
+
+    def set(self, key, answer, sources, draft, doc_ids):
+        now = time.time()
+        with self._lock:
+            self._delete_keys([key])
+            self.conn.execute(
+                "INSERT INTO coaching_cache (key, answer, sources, draft, created_at, last_access) VALUES (?, ?, ?, ?, ?, ?)",
+                (key, answer, json.dumps(sources, ensure_ascii=False), draft, now, now),
+            )
+            self.conn.executemany(
+                "INSERT INTO coaching_cache_deps (key, doc_id) VALUES (?, ?)",
+                [(key, doc_id) for doc_id in set(doc_ids)],
+            )
+            self._evict(now)
+            self.conn.commit()
+
+    def invalidate_docs(self, doc_ids):
+        """해당 팁 문서를 참조한 캐시 항목 삭제 (지식 추가/수정/삭제 시 호출)"""
+        doc_ids = list(doc_ids)
+        if not doc_ids:
+            return 0
+        with self._lock:
+            marks = ",".join("?" * len(doc_ids))
+            keys = [r[0] for r in self.conn.execute(
+                f"SELECT DISTINCT key FROM coaching_cache_deps WHERE doc_id IN ({marks})", doc_ids
+            )]
+            self._delete_keys(keys)
+            self.conn.commit()
+        return len(keys)
+
+    def clear(self):
+        with self._lock:
+            self.conn.execute("DELETE FROM coaching_cache")
+            self.conn.execute("DELETE FROM coaching_cache_deps")
+            self.conn.commit()
+
+    def stats(self):
+        with self._lock:
+            size = self.conn.execute("SELECT COUNT(*) FROM coaching_cache").fetchone()[0]
+        total = self.hits + self.misses
+        return {
+            "entries": size,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / total, 4) if total else 0.0,
+        }
+
+    # 아래 두 함수는 lock 을 잡은 상태에서만 호출
+    def _delete_keys(self, keys):
+        if not keys:
+            return
+        marks = ",".join("?" * len(keys))
+        self.conn.execute(f"DELETE FROM coaching_cache WHERE key IN ({marks})", keys)
+        self.conn.execute(f"DELETE FROM coaching_cache_deps WHERE key IN ({marks})", keys)
+
+    def _evict(self, now):
+        expired = [r[0] for r in self.conn.execute(
+            "SELECT key FROM coaching_cache WHERE created_at < ?", (now - self.ttl,)
+        )]
+        self._delete_keys(expired)
+
+        overflow = self.conn.execute("SELECT COUNT(*) FROM coaching_cache").fetchone()[0] - self.max_entries
+        if overflow > 0:
+            stale = [r[0] for r in self.conn.execute(
+                "SELECT key FROM coaching_cache ORDER BY last_access ASC LIMIT ?", (overflow,)
+            )]
+            self._delete_keys(stale)
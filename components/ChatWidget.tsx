@@ -1,17 +1,34 @@
 "use client";
 import { useState, useRef, useEffect } from "react";
 
-// 🔥 [핵심] Render 배포 주소 적용 (끝에 /api/coach 필수)
-const API_URL = "https://project-sys-j.onrender.com/api/coach";
+// 🔥 [핵심] Render 배포 주소 적용 (끝에 /api/coach/stream 필수 - 토큰 스트리밍)
+const API_URL = "https://project-sys-j.onrender.com/api/coach/stream";
+
+// 대화 세션 초기화 주소 (DELETE /api/sessions/{id})
+const SESSIONS_URL = "https://project-sys-j.onrender.com/api/sessions";
+
+// 첫 인사 말풍선
+const GREETING = { role: "ai" as const, text: "안녕하세요! AI 자소서 코치입니다. 자소서 내용이나 면접 고민을 입력해주시면 분석해 드립니다." };
+
+// 단계 이벤트별 로딩 문구
+const STAGE_LABELS: Record<string, string> = {
+  retrieval: "가이드 검색 완료, 문장을 분석 중입니다...",
+  draft: "분석 완료, 첨삭 답변을 작성 중입니다...",
+};
 
 export default function ChatWidget() {
   const [isOpen, setIsOpen] = useState(false); // 채팅창 열림/닫힘 상태
   const [input, setInput] = useState("");      // 사용자 입력값
-  const [messages, setMessages] = useState<{ role: "user" | "ai"; text: string }[]>([
-    { role: "ai", text: "안녕하세요! AI 자소서 코치입니다. 자소서 내용이나 면접 고민을 입력해주시면 분석해 드립니다." }
-  ]);
+  const [messages, setMessages] = useState<{ role: "user" | "ai"; text: string }[]>([GREETING]);
   const [isLoading, setIsLoading] = useState(false); // 로딩 상태
+  const [stageLabel, setStageLabel] = useState("AI가 분석 중입니다..."); // 진행 단계 문구
   const scrollRef = useRef<HTMLDivElement>(null);    // 스크롤 자동 이동용
+  // 대화 세션 ID - 서버가 이 ID 로 이전 대화(요약 + 최근 턴)를 기억해서 후속 질문에 이어서 답함
+  // (useRef(crypto.randomUUID()) 는 렌더링마다 UUID 를 새로 만들고 버리므로 처음 한 번만 채움)
+  const sessionIdRef = useRef<string | null>(null);
+  if (sessionIdRef.current === null) {
+    sessionIdRef.current = crypto.randomUUID();
+  }
 
   // 메시지가 추가되거나 창이 열릴 때 스크롤을 맨 아래로 이동
   useEffect(() => {
@@ -20,6 +37,13 @@ export default function ChatWidget() {
     }
   }, [messages, isOpen]);
 
+  // 새 대화: 서버 세션을 지우고 새 ID 로 시작 (지우기 실패해도 유휴 세션은 서버에서 자동 정리)
+  const resetConversation = () => {
+    fetch(`${SESSIONS_URL}/${sessionIdRef.current}`, { method: "DELETE" }).catch(() => {});
+    sessionIdRef.current = crypto.randomUUID();
+    setMessages([GREETING]);
+  };
+
   const sendMessage = async () => {
     if (!input.trim()) return;
 
@@ -28,23 +52,65 @@ export default function ChatWidget() {
     setMessages((prev) => [...prev, { role: "user", text: userMsg }]);
     setInput("");
     setIsLoading(true);
+    setStageLabel("AI가 분석 중입니다...");
+
+    // 마지막 AI 말풍선에 텍스트 이어붙이기 (스트리밍 토큰 렌더링용)
+    let started = false;
+    const appendAiText = (chunk: string) => {
+      if (!started) {
+        started = true;
+        setMessages((prev) => [...prev, { role: "ai", text: chunk }]);
+        return;
+      }
+      setMessages((prev) => {
+        const next = [...prev];
+        const last = next[next.length - 1];
+        next[next.length - 1] = { ...last, text: last.text + chunk };
+        return next;
+      });
+    };
 
     try {
       // 2. FastAPI 서버(Render)로 전송
       const res = await fetch(API_URL, {
         method: "POST",
-        headers: { "Content-Type": "application/json" },
-        body: JSON.stringify({ user_input: userMsg }), // 백엔드 스키마와 일치해야 함
+        headers: { "Content-Type": "application/json", Accept: "text/event-stream" },
+        body: JSON.stringify({ user_input: userMsg, session_id: sessionIdRef.current }), // 백엔드 스키마와 일치해야 함
       });
-      
-      if (!res.ok) {
+
+      if (!res.ok || !res.body) {
         throw new Error(`Server Error: ${res.status}`);
       }
 
-      const data = await res.json();
-      
-      // 3. AI 응답 화면에 표시
-      setMessages((prev) => [...prev, { role: "ai", text: data.answer }]);
+      // 3. SSE 스트림을 읽으면서 AI 응답을 점진적으로 표시
+      const reader = res.body.getReader();
+      const decoder = new TextDecoder();
+      let buffer = "";
+
+      while (true) {
+        const { done, value } = await reader.read();
+        if (done) break;
+        buffer += decoder.decode(value, { stream: true });
+
+        // 이벤트는 빈 줄(\n\n)로 구분됨
+        const events = buffer.split("\n\n");
+        buffer = events.pop() ?? "";
+
+        for (const raw of events) {
+          const dataLine = raw.split("\n").find((line) => line.startsWith("data: "));
+          if (!dataLine) continue;
+          const event = JSON.parse(dataLine.slice(6));
+
+          if (event.event === "token") {
+            setIsLoading(false);
+            appendAiText(event.text);
+          } else if (event.event === "error") {
+            throw new Error(event.message);
+          } else if (STAGE_LABELS[event.event]) {
+            setStageLabel(STAGE_LABELS[event.event]);
+          }
+        }
+      }
     } catch (error) {
       console.error(error);
       setMessages((prev) => [...prev, { role: "ai", text: "죄송합니다. 서버 연결에 문제가 발생했습니다. 잠시 후 다시 시도해주세요." }]);
@@ -66,12 +132,21 @@ export default function ChatWidget() {
               <span className="text-xl">🎓</span>
               <span className="text-cyan-400 font-bold tracking-wider drop-shadow-md">Job-Navigator</span>
             </div>
-            <button 
-              onClick={() => setIsOpen(false)} 
-              className="text-gray-400 hover:text-white hover:rotate-90 transition-transform duration-200"
-            >
-              ✕
-            </button>
+            <div className="flex items-center gap-3">
+              <button
+                onClick={resetConversation}
+                disabled={isLoading}
+                className="text-xs text-cyan-400 hover:text-white disabled:opacity-50 transition-colors"
+              >
+                새 대화
+              </button>
+              <button 
+                onClick={() => setIsOpen(false)} 
+                className="text-gray-400 hover:text-white hover:rotate-90 transition-transform duration-200"
+              >
+                ✕
+              </button>
+            </div>
           </div>
 
           {/* 2. 메시지 리스트 영역 */}
@@ -93,7 +168,7 @@ export default function ChatWidget() {
             {isLoading && (
               <div className="flex justify-start">
                 <div className="bg-gray-800 border border-gray-700 p-3 rounded-2xl rounded-tl-none text-cyan-500 text-xs flex items-center gap-2 animate-pulse">
-                  <span>AI가 분석 중입니다...</span>
+                  <span>{stageLabel}</span>
                   <span className="animate-spin">⏳</span>
                 </div>
               </div>
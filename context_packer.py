@@ -0,0 +1,160 @@
+import os
+import re
+
+from llm_client import estimate_tokens
+from monitor.metrics import metrics
+
+# 단계별 프롬프트 구간 토큰 예산 (환경변수 CONTEXT_BUDGET_<단계>_<구간> 으로 조정 가능)
+# - retrieval: 검색된 참고 가이드 (draft / fast 프롬프트에 공통으로 들어감)
+# - draft    : 1차 분석의 사용자 글
+# - refine   : 2차 코칭 (1차 분석 결과 + 사용자 원문) → 분석에 문제 문장이 인용되어 있어서 원문은 더 짧게
+# - fast     : 빠른 모드 1회 호출의 사용자 글
+# - session  : 멀티턴 대화의 누적 요약 / 아직 요약하지 않은 최근 턴 원문 (모든 코칭 프롬프트에 공통)
+DEFAULT_BUDGETS = {
+    "retrieval": {"tips": 600},
+    "draft": {"user_text": 2000},
+    "refine": {"draft": 1200, "user_text": 1000},
+    "fast": {"user_text": 2000},
+    "session": {"summary": 400, "recent": 800},
+}
+
+# 이 이상 겹치는 참고 팁은 중복으로 보고 뒤에 나온 것을 뺌 (글자 3-gram Jaccard)
+TIP_DEDUPE_THRESHOLD = float(os.getenv("TIP_DEDUPE_THRESHOLD", "0.7"))
+
+# 앞/뒤를 남기고 가운데를 줄일 때 뒤쪽에 남길 비율 (자소서는 결론이 끝에 오는 경우가 많음)
+TAIL_RATIO = 0.3
+
+# 문장(또는 줄) 단위로 자르기 - "1. " 같은 번호나 3.5 같은 숫자는 문장 끝으로 보지 않음
+_UNIT = re.compile(r"[^\n]*?(?<!\d)[.!?](?:[ \t]+|\n|$)|[^\n]+\n?|\n")
+
+
+def budget(stage, section):
+    default = DEFAULT_BUDGETS[stage][section]
+    return int(os.getenv(f"CONTEXT_BUDGET_{stage.upper()}_{section.upper()}", str(default)))
+
+
+def _trigrams(text):
+    text = re.sub(r"\s+", "", text)
+    return {text[i:i + 3] for i in range(max(1, len(text) - 2))}
+
+
+def dedupe_tips(entries, threshold=TIP_DEDUPE_THRESHOLD):
+    """
+    검색된 팁 목록에서 내용이 거의 같은 것 제거 (검색 순위가 높은 쪽을 남김)
+    entries: [(출처, 내용, 문서 ID), ...]
+    """
+    kept, grams = [], []
+    for entry in entries:
+        g = _trigrams(entry[1])
+        if any(len(g & other) / len(g | other) >= threshold for other in grams):
+            continue
+        kept.append(entry)
+        grams.append(g)
+    return kept
+
+
+def fit_text(text, max_tokens, tail_ratio=TAIL_RATIO):
+    """
+    text 가 max_tokens 를 넘으면 문장 단위로 앞/뒤를 남기고 가운데를 "(…중략…)" 으로 줄임
+    - 문장 중간에서 자르지 않아서 인용/첨삭에 그대로 쓸 수 있음
+    - tail_ratio=0 이면 앞에서부터만 남기고 "(…이하 생략…)"
+    """
+    text = text.strip()
+    if estimate_tokens(text) <= max_tokens:
+        return text
+
+    units = _UNIT.findall(text)
+    head_budget = int(max_tokens * (1 - tail_ratio))
+    tail_budget = max_tokens - head_budget
+
+    # 문장별 추정치를 더하면 반올림 오차가 쌓이므로 이어 붙인 글 기준으로 잼
+    head, head_text = [], ""
+    for unit in units:
+        if estimate_tokens(head_text + unit) > head_budget:
+            break
+        head.append(unit)
+        head_text += unit
+
+    tail, tail_text = [], ""
+    for unit in reversed(units[len(head):]):
+        if estimate_tokens(unit + tail_text) > tail_budget:
+            break
+        tail.insert(0, unit)
+        tail_text = unit + tail_text
+
+    # 한 문장이 예산보다 길면 그 문장만 글자 수로 자름
+    if not head and not tail:
+        return text[:max_tokens * 2].rstrip() + " (…이하 생략…)"
+
+    omitted = len(units) - len(head) - len(tail)
+    marker = "(…중략…)" if tail else "(…이하 생략…)"
+    packed = "".join(head).rstrip()
+    if omitted:
+        packed += f"\n{marker}\n"
+    return (packed + "".join(tail)).strip()
+
+
+def pack_tips(entries, max_tokens=None):
+    """
+    중복 제거 후 검색 순위대로 예산 안에 들어가는 만큼 팁을 담음
+    반환: (프롬프트용 텍스트, 실제로 담은 entries)
+    """
+    if max_tokens is None:
+        max_tokens = budget("retrieval", "tips")
+    unique = dedupe_tips(entries)
+    metrics.inc("context_tips_deduped", len(entries) - len(unique))
+
+    text, kept = "", []
+    for source_info, doc, doc_id in unique:
+        line = f"- {source_info}: {doc}\n"
+        if estimate_tokens(text + line) > max_tokens:
+            remaining = max_tokens - estimate_tokens(text) - estimate_tokens(f"- {source_info}: \n")
+            if kept or remaining <= 0:
+                break
+            # 첫 팁 하나가 예산보다 크면 앞부분만이라도 담음
+            line = f"- {source_info}: {fit_text(doc, remaining, tail_ratio=0)}\n"
+        text += line
+        kept.append((source_info, doc, doc_id))
+    metrics.inc("context_tips_dropped", len(unique) - len(kept))
+    return text, kept
+
+
+def fit_section(stage, section, text, tail_ratio=TAIL_RATIO):
+    """단계별 예산으로 구간을 줄이고, 원래/줄인 토큰 수를 단계별로 기록"""
+    before = estimate_tokens(text)
+    packed = fit_text(text, budget(stage, section), tail_ratio)
+    after = estimate_tokens(packed)
+    metrics.inc(f"context_tokens_{stage}_{section}", after)
+    if after < before:
+        metrics.inc("context_tokens_trimmed", before - after)
+    return packed
+
+
+def pack_history(summary, turns):
+    """
+    세션 맥락(누적 요약 + 최근 턴)을 예산 안의 프롬프트용 텍스트로
+    - 요약은 session.summary 예산으로 자름
+    - 최근 턴은 최신 턴부터 session.recent 예산이 찰 때까지 담고, 최신 턴 하나가 넘치면 그 턴만 줄임
+    turns: [(턴 번호, 사용자 글, 답변), ...] (오래된 순)
+    """
+    parts = []
+    if summary:
+        parts.append("[이전 대화 요약]\n" + fit_section("session", "summary", summary, tail_ratio=0))
+
+    remaining = budget("session", "recent")
+    lines = []
+    for _, user_text, ai_text in reversed(turns):
+        line = f"사용자: {user_text.strip()}\n코치: {ai_text.strip()}\n"
+        cost = estimate_tokens(line)
+        if cost > remaining:
+            if lines:
+                metrics.inc("context_session_turns_dropped")
+                break
+            line = fit_text(line, remaining) + "\n"
+            cost = estimate_tokens(line)
+        lines.insert(0, line)
+        remaining -= cost
+    if lines:
+        metrics.inc("context_tokens_session_recent", budget("session", "recent") - remaining)
+        parts.append("[최근 대화]\n" + "".join(lines).rstrip())
+    return "\n\n".join(parts)
@@ -0,0 +1,333 @@
+import sqlite3
+import hashlib
+import os
+import threading
+import time
+from collections import OrderedDict, deque
+
+import numpy as np
+from chromadb.api.types import EmbeddingFunction
+from chromadb.utils.embedding_functions import register_embedding_function
+
+# 임베딩 캐시 설정값 (환경변수로 조정 가능)
+EMBED_CACHE_DB = os.getenv("EMBED_CACHE_DB", "monitor/embedding_cache.db")
+EMBED_LRU_SIZE = int(os.getenv("EMBED_LRU_SIZE", "2048"))
+EMBED_CACHE_MAX_ROWS = int(os.getenv("EMBED_CACHE_MAX_ROWS", "200000"))   # 디스크 캐시 최대 개수 (넘으면 오래 안 쓴 것부터 삭제)
+EMBED_BATCH_WINDOW_MS = float(os.getenv("EMBED_BATCH_WINDOW_MS", "5"))   # 0 이면 배치 대기 없이 바로 호출
+EMBED_MAX_BATCH = int(os.getenv("EMBED_MAX_BATCH", "64"))
+# 임베딩 모델: default (Chroma 기본 ONNX 모델) / hash (모델 없이 결정적 벡터, 오프라인 테스트/벤치마크용)
+EMBEDDING_BACKEND = os.getenv("EMBEDDING_BACKEND", "default")
+HASH_EMBEDDING_DIM = 384
+
+
+def _percentile(values, pct):
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    idx = min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))
+    return ordered[idx]
+
+
+class _PendingEmbed:
+    """배치 스레드에 맡긴 임베딩 요청 1건"""
+
+    def __init__(self, texts):
+        self.texts = texts
+        self.vectors = None
+        self.error = None
+        self.done = threading.Event()
+
+
+@register_embedding_function
+class HashEmbeddingFunction(EmbeddingFunction):
+    """글자 3-gram 해시로 만드는 결정적 임베딩 (모델 다운로드 없이 검색 경로 전체를 돌려볼 때 사용)"""
+
+    def __init__(self, dim=HASH_EMBEDDING_DIM):
+        self.dim = dim
+
+    # Chroma 가 컬렉션에 저장해 두는 임베딩 함수 이름/설정
+    @staticmethod
+    def name():
+        return "career_hash"
+
+    def get_config(self):
+        return {"dim": self.dim}
+
+    @staticmethod
+    def build_from_config(config):
+        return HashEmbeddingFunction(dim=config.get("dim", HASH_EMBEDDING_DIM))
+
+    def __call__(self, input):
+        out = []
+        for text in input:
+            vec = np.zeros(self.dim, dtype=np.float32)
+            for i in range(max(1, len(text) - 2)):
+                h = int.from_bytes(hashlib.md5(text[i:i + 3].encode("utf-8")).digest()[:4], "little")
+                vec[h % self.dim] += 1.0
+            out.append(vec / max(float(np.linalg.norm(vec)), 1e-12))
+        return out
+
+
+class CachedEmbeddingFunction(EmbeddingFunction):
+    """
+    Chroma 임베딩 함수 래퍼
+    - 문장 내용 해시 기준으로 임베딩을 메모리(LRU) + 디스크(SQLite)에 저장
+      (디스크도 max_rows 를 넘으면 오래 안 쓴 항목부터 삭제)
+    - 동시에 들어온 임베딩 요청을 모아서 모델을 한 번만 호출
+    - 호출 지연시간/적중률 통계 제공 (stats)
+    - Chroma 에는 기본 임베딩 함수("default") 로 보임 (기존 컬렉션을 그대로 열 수 있도록)
+    """
+
+    def __init__(self, base=None, db_path=EMBED_CACHE_DB, lru_size=EMBED_LRU_SIZE,
+                 batch_window_ms=EMBED_BATCH_WINDOW_MS, max_batch=EMBED_MAX_BATCH, max_rows=EMBED_CACHE_MAX_ROWS):
+        if base is None and EMBEDDING_BACKEND == "hash":
+            base = HashEmbeddingFunction()
+        elif base is None:
+            from chromadb.utils import embedding_functions
+            base = embedding_functions.DefaultEmbeddingFunction()
+        self.base = base
+        self.model_tag = type(base).__name__
+        self.lru_size = lru_size
+        self.max_rows = max_rows
+        self.batch_window = batch_window_ms / 1000
+        self.max_batch = max_batch
+
+        self._lru = OrderedDict()
+        self._lru_lock = threading.Lock()
+
+        folder = os.path.dirname(db_path)
+        if folder:
+            os.makedirs(folder, exist_ok=True)
+        self._db_lock = threading.Lock()
+        self.conn = sqlite3.connect(db_path, check_same_thread=False)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute('''
+            CREATE TABLE IF NOT EXISTS embeddings (
+                hash TEXT PRIMARY KEY,
+                vector BLOB,
+                last_access REAL DEFAULT 0
+            )
+        ''')
+        # 예전 DB (last_access 컬럼 없음) 는 컬럼 추가
+        columns = [row[1] for row in self.conn.execute("PRAGMA table_info(embeddings)")]
+        if "last_access" not in columns:
+            self.conn.execute("ALTER TABLE embeddings ADD COLUMN last_access REAL DEFAULT 0")
+        self.conn.execute("CREATE INDEX IF NOT EXISTS idx_embeddings_access ON embeddings(last_access)")
+        self.conn.commit()
+        self._rows = self.conn.execute("SELECT COUNT(*) FROM embeddings").fetchone()[0]
+        self.disk_evicted = 0
+
+        # 배치 처리용 큐/스레드 (처음 필요할 때 시작)
+        self._queue = []
+        self._cv = threading.Condition()
+        self._worker = None
+
+        # 통계
+        self._stats_lock = threading.Lock()
+        self.calls = 0
+        self.texts = 0
+        self.memory_hits = 0
+        self.disk_hits = 0
+        self.model_calls = 0
+        self.model_texts = 0
+        self._call_ms = deque(maxlen=1000)
+        self._model_ms = deque(maxlen=1000)
+
+    def __call__(self, input):
+        start = time.perf_counter()
+        texts = list(input)
+        keys = [self._hash(t) for t in texts]
+        vectors = [None] * len(texts)
+
+        missing = OrderedDict()  # hash -> text
+        mem_hits = 0
+        disk_keys = []
+        for i, key in enumerate(keys):
+            vec = self._lru_get(key)
+            if vec is not None:
+                mem_hits += 1
+            else:
+                vec = self._disk_get(key)
+                if vec is not None:
+                    disk_keys.append(key)
+                    self._lru_put(key, vec)
+            if vec is None:
+                missing[key] = texts[i]
+            vectors[i] = vec
+        disk_hits = len(disk_keys)
+        if disk_keys:
+            self._disk_touch(disk_keys)
+
+        if missing:
+            new_vectors = self._embed(list(missing.values()))
+            fresh = dict(zip(missing.keys(), new_vectors))
+            self._disk_put(fresh)
+            for key, vec in fresh.items():
+                self._lru_put(key, vec)
+            vectors = [fresh[k] if v is None else v for k, v in zip(keys, vectors)]
+
+        elapsed = (time.perf_counter() - start) * 1000
+        with self._stats_lock:
+            self.calls += 1
+            self.texts += len(texts)
+            self.memory_hits += mem_hits
+            self.disk_hits += disk_hits
+            self._call_ms.append(elapsed)
+
+        return [v.tolist() for v in vectors]
+
+    # 기존 chroma_db 컬렉션은 Chroma 기본 임베딩("default") 이름으로 저장돼 있으므로 같은 이름/설정을 씀
+    # (Chroma 가 이 이름으로 클래스를 등록하므로 이름만 보고 다시 만들 때도 캐시를 거침)
+    @staticmethod
+    def name():
+        return "default"
+
+    def get_config(self):
+        return {}
+
+    def is_legacy(self):
+        # 기본 구현은 build_from_config 로 캐시를 하나 더 만들어 보므로 base 기준으로만 판단
+        return self.base.is_legacy()
+
+    @staticmethod
+    def build_from_config(config):
+        # 모델 종류는 EMBEDDING_BACKEND 기준
+        return CachedEmbeddingFunction()
+
+    def warm_up(self):
+        """캐시를 거치지 않고 모델을 한 번 호출해서 모델 파일 로딩을 미리 끝냄"""
+        start = time.perf_counter()
+        self.base(["warm-up"])
+        return (time.perf_counter() - start) * 1000
+
+    def stats(self):
+        with self._stats_lock:
+            hit_total = self.memory_hits + self.disk_hits
+            return {
+                "calls": self.calls,
+                "texts": self.texts,
+                "memory_hits": self.memory_hits,
+                "disk_hits": self.disk_hits,
+                "disk_rows": self._rows,
+                "disk_evicted": self.disk_evicted,
+                "hit_rate": round(hit_total / self.texts, 4) if self.texts else 0.0,
+                "model_calls": self.model_calls,
+                "model_texts": self.model_texts,
+                "call_ms_p50": round(_percentile(self._call_ms, 50), 2),
+                "call_ms_p95": round(_percentile(self._call_ms, 95), 2),
+                "model_ms_p50": round(_percentile(self._model_ms, 50), 2),
+                "model_ms_p95": round(_percentile(self._model_ms, 95), 2),
+            }
+
+    # ------------------------------------------------------------------
+    # 캐시 (메모리 LRU / 디스크)
+    # ------------------------------------------------------------------
+    def _hash(self, text):
+        return hashlib.sha256(f"{self.model_tag}\x00{text}".encode("utf-8")).hexdigest()
+
+    def _lru_get(self, key):
+        with self._lru_lock:
+            vec = self._lru.get(key)
+            if vec is not None:
+                self._lru.move_to_end(key)
+            return vec
+
+    def _lru_put(self, key, vec):
+        with self._lru_lock:
+            self._lru[key] = vec
+            self._lru.move_to_end(key)
+            while len(self._lru) > self.lru_size:
+                self._lru.popitem(last=False)
+
+    def _disk_get(self, key):
+        with self._db_lock:
+            row = self.conn.execute("SELECT vector FROM embeddings WHERE hash = ?", (key,)).fetchone()
+        if row is None:
+            return None
+        return np.frombuffer(row[0], dtype=np.float32)
+
+    def _disk_touch(self, keys):
+        """디스크 캐시에서 찾은 항목의 마지막 사용 시각 갱신 (호출 1번에 한 번만 커밋)"""
+        now = time.time()
+        with self._db_lock:
+            self.conn.executemany("UPDATE embeddings SET last_access = ? WHERE hash = ?", [(now, k) for k in keys])
+            self.conn.commit()
+
+    def _disk_put(self, fresh):
+        now = time.time()
+        rows = [(k, np.asarray(v, dtype=np.float32).tobytes(), now) for k, v in fresh.items()]
+        with self._db_lock:
+            self.conn.executemany("INSERT OR REPLACE INTO embeddings (hash, vector, last_access) VALUES (?, ?, ?)", rows)
+            self._rows += len(rows)
+            self._evict()
+            self.conn.commit()
+
+    def _evict(self):
+        # _db_lock 을 잡은 상태에서만 호출 - 개수가 넘으면 오래 안 쓴 항목부터 삭제
+        if self._rows <= self.max_rows:
+            return
+        # 같은 글이 동시에 들어와 REPLACE 된 경우 어림값이 커질 수 있어서 실제 개수로 다시 확인
+        self._rows = self.conn.execute("SELECT COUNT(*) FROM embeddings").fetchone()[0]
+        overflow = self._rows - self.max_rows
+        if overflow <= 0:
+            return
+        self.conn.execute(
+            "DELETE FROM embeddings WHERE hash IN (SELECT hash FROM embeddings ORDER BY last_access ASC LIMIT ?)",
+            (overflow,),
+        )
+        self._rows -= overflow
+        self.disk_evicted += overflow
+
+    # ------------------------------------------------------------------
+    # 모델 호출 (동시 요청 묶어서 한 번에)
+    # ------------------------------------------------------------------
+    def _embed(self, texts):
+        if self.batch_window <= 0:
+            return self._invoke(texts)
+
+        pending = _PendingEmbed(texts)
+        with self._cv:
+            self._queue.append(pending)
+            if self._worker is None:
+                self._worker = threading.Thread(target=self._batch_loop, daemon=True)
+                self._worker.start()
+            self._cv.notify()
+        pending.done.wait()
+        if pending.error is not None:
+            raise pending.error
+        return pending.vectors
+
+    def _batch_loop(self):
+        while True:
+            with self._cv:
+                while not self._queue:
+                    self._cv.wait()
+            # 잠깐 기다리면서 다른 요청이 쌓이도록 함
+            time.sleep(self.batch_window)
+            with self._cv:
+                batch, size = [], 0
+                while self._queue and (not batch or size + len(self._queue[0].texts) <= self.max_batch):
+                    item = self._queue.pop(0)
+                    batch.append(item)
+                    size += len(item.texts)
+
+            unique = list(OrderedDict.fromkeys(t for item in batch for t in item.texts))
+            try:
+                by_text = dict(zip(unique, self._invoke(unique)))
+                for item in batch:
+                    item.vectors = [by_text[t] for t in item.texts]
+            except Exception as e:
+                for item in batch:
+                    item.error = e
+            for item in batch:
+                item.done.set()
+
+    def _invoke(self, texts):
+        start = time.perf_counter()
+        vectors = [np.asarray(v, dtype=np.float32) for v in self.base(texts)]
+        elapsed = (time.perf_counter() - start) * 1000
+        with self._stats_lock:
+            self.model_calls += 1
+            self.model_texts += len(texts)
+            self._model_ms.append(elapsed)
+        return vectors
@@ -1,31 +1,233 @@
 # file_utils.py (새로 만들기)
-from pypdf import PdfReader
-from docx import Document
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from contextlib import contextmanager
+import atexit
+import hashlib
 import io
+import multiprocessing
+import os
+import tempfile
+import threading
+from resume_cache import get_resume_cache, sha256_hex
+
+# 업로드 제한 / 병렬 추출 설정 (환경변수로 조정 가능)
+MAX_FILE_BYTES = int(os.getenv("MAX_FILE_BYTES", str(10 * 1024 * 1024)))   # 10MB
+MAX_PDF_PAGES = int(os.getenv("MAX_PDF_PAGES", "50"))
+PARALLEL_PAGE_THRESHOLD = int(os.getenv("PARALLEL_PAGE_THRESHOLD", "8"))   # 이 쪽수 이상이면 프로세스 풀 사용
+UPLOAD_READ_CHUNK = 1024 * 1024
+EXTRACT_WORKERS = int(os.getenv("EXTRACT_WORKERS", str(min(4, os.cpu_count() or 1))))
+# 작업자 프로세스 시작 방식 - fork 는 스레드/모델을 들고 있는 서버 프로세스를 통째로 복제하므로 쓰지 않음
+EXTRACT_START_METHOD = os.getenv(
+    "EXTRACT_START_METHOD",
+    "forkserver" if "forkserver" in multiprocessing.get_all_start_methods() else "spawn",
+)
+
+SUPPORTED_EXTENSIONS = ('.pdf', '.docx', '.txt')
+
+
+class ExtractionError(Exception):
+    """파일 크기/쪽수 제한 초과, 지원하지 않는 형식 등"""
+
+
+class FileTooLargeError(ExtractionError):
+    """파일 크기 제한(MAX_FILE_BYTES) 초과"""
+
+
+def _too_large():
+    return FileTooLargeError(f"파일이 너무 큽니다. (최대 {MAX_FILE_BYTES // (1024 * 1024)}MB)")
+
+
+# ------------------------------------------------------------------
+# 프로세스 풀 (프로세스당 하나를 계속 재사용, 서버 종료 시 shutdown_extract_pool)
+# - 한 문서를 작업자 수만큼의 연속된 쪽 구간으로 나눠서, 작업자마다 PDF 를 한 번만 열고 한 번만 파싱
+# - 작업자에게는 파일 경로 + 쪽 구간만 넘김 (파일 내용을 작업마다 pickle 해서 보내지 않음)
+# ------------------------------------------------------------------
+_pool = None
+_pool_lock = threading.Lock()
+
+def _get_pool():
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            _pool = ProcessPoolExecutor(
+                max_workers=EXTRACT_WORKERS,
+                mp_context=multiprocessing.get_context(EXTRACT_START_METHOD),
+            )
+            atexit.register(shutdown_extract_pool)
+        return _pool
+
+def _discard_pool(pool):
+    """작업자가 죽어서 망가진 풀은 버리고 다음 요청에서 새로 만듦"""
+    global _pool
+    with _pool_lock:
+        if _pool is pool:
+            _pool = None
+    pool.shutdown(wait=False, cancel_futures=True)
+
+def shutdown_extract_pool():
+    global _pool
+    with _pool_lock:
+        pool, _pool = _pool, None
+    if pool is not None:
+        pool.shutdown(wait=True, cancel_futures=True)
+
+def _extract_pdf_pages(path, start, end):
+    from pypdf import PdfReader
+    reader = PdfReader(path)
+    return [reader.pages[i].extract_text() or "" for i in range(start, end)]
+
+
+@contextmanager
+def _temp_copy(data, suffix):
+    """메모리에 있는 파일 내용을 작업자가 열 수 있는 임시 파일로 (끝나면 삭제)"""
+    fd, path = tempfile.mkstemp(suffix=suffix)
+    try:
+        with os.fdopen(fd, "wb") as f:
+            f.write(data)
+        yield path
+    finally:
+        os.unlink(path)
+
+
+def _iter_pdf(reader, max_pages, path=None, data=None):
+    """
+    PDF 쪽별 텍스트를 앞쪽부터 순서대로 yield
+    - 여러 쪽이면 공용 프로세스 풀에서 나눠 추출 (path 가 없으면 data 를 임시 파일로 만들어 넘김)
+    - 풀이 망가지면 남은 쪽은 현재 프로세스에서 이어서 추출
+    """
+    page_count = len(reader.pages)
+    if page_count > max_pages:
+        raise ExtractionError(f"쪽수가 너무 많습니다. ({page_count}쪽, 최대 {max_pages}쪽)")
+
+    if page_count < PARALLEL_PAGE_THRESHOLD or EXTRACT_WORKERS <= 1:
+        for page in reader.pages:
+            yield page.extract_text() or ""
+        return
+
+    if path is None:
+        with _temp_copy(data, ".pdf") as temp_path:
+            yield from _iter_pdf(reader, max_pages, path=temp_path)
+        return
+
+    step = -(-page_count // EXTRACT_WORKERS)
+    pool = _get_pool()
+    futures, done = [], 0
+    try:
+        for start in range(0, page_count, step):
+            futures.append(pool.submit(_extract_pdf_pages, path, start, min(start + step, page_count)))
+        for future in futures:
+            pages = future.result()
+            done += len(pages)
+            yield from pages
+    except BrokenProcessPool:
+        _discard_pool(pool)
+        for i in range(done, page_count):
+            yield reader.pages[i].extract_text() or ""
+    finally:
+        for future in futures:
+            future.cancel()
+
+
+def iter_text_from_bytes(data, filename, max_pages=MAX_PDF_PAGES):
+    """
+    파일 내용(bytes)에서 텍스트를 쪽/문단 단위로 흘려보내는 제너레이터
+    (Streamlit 업로드처럼 이미 메모리에 있는 파일용, 디스크에 있으면 iter_text_from_path)
+    """
+    if len(data) > MAX_FILE_BYTES:
+        raise _too_large()
+
+    name = filename.lower()
+
+    # 1. PDF 파일일 경우 (pypdf / python-docx 는 실제로 필요할 때만 불러옴)
+    if name.endswith('.pdf'):
+        from pypdf import PdfReader
+        yield from _iter_pdf(PdfReader(io.BytesIO(data)), max_pages, data=data)
+
+    # 2. Word(DOCX) 파일일 경우
+    elif name.endswith('.docx'):
+        from docx import Document
+        doc = Document(io.BytesIO(data))
+        for para in doc.paragraphs:
+            yield para.text
+
+    # 3. 텍스트 파일일 경우
+    elif name.endswith('.txt'):
+        yield data.decode("utf-8")
+
+    else:
+        raise ExtractionError(f"지원하지 않는 파일 형식입니다. ({', '.join(SUPPORTED_EXTENSIONS)})")
+
+
+def iter_text_from_path(path, filename, max_pages=MAX_PDF_PAGES):
+    """디스크에 있는 파일에서 텍스트를 흘려보내는 제너레이터 (파일 전체를 메모리에 올리지 않음)"""
+    if os.path.getsize(path) > MAX_FILE_BYTES:
+        raise _too_large()
+
+    name = filename.lower()
+    if name.endswith('.pdf'):
+        from pypdf import PdfReader
+        with open(path, "rb") as f:
+            yield from _iter_pdf(PdfReader(f), max_pages, path=path)
+    elif name.endswith('.docx'):
+        from docx import Document
+        for para in Document(path).paragraphs:
+            yield para.text
+    elif name.endswith('.txt'):
+        with open(path, encoding="utf-8") as f:
+            yield f.read()
+    else:
+        raise ExtractionError(f"지원하지 않는 파일 형식입니다. ({', '.join(SUPPORTED_EXTENSIONS)})")
+
+
+def save_upload(fileobj, filename):
+    """
+    업로드 파일 객체를 조금씩 읽어 임시 파일로 저장하면서 내용 해시도 같이 계산
+    - 크기 제한을 넘는 순간 중단하고 FileTooLargeError (임시 파일은 삭제)
+    - 반환: (임시 파일 경로, sha256) → 다 쓰면 호출한 쪽에서 os.unlink
+    """
+    digest = hashlib.sha256()
+    size = 0
+    fd, path = tempfile.mkstemp(suffix=os.path.splitext(filename.lower())[1])
+    try:
+        with os.fdopen(fd, "wb") as out:
+            while chunk := fileobj.read(UPLOAD_READ_CHUNK):
+                size += len(chunk)
+                if size > MAX_FILE_BYTES:
+                    raise _too_large()
+                digest.update(chunk)
+                out.write(chunk)
+    except BaseException:
+        os.unlink(path)
+        raise
+    return path, digest.hexdigest()
+
+
+def _cached_extract(digest, filename, extract):
+    """같은 파일(바이트 해시 + 확장자)은 캐시된 추출 결과를 바로 반환"""
+    key = f"{digest}{os.path.splitext(filename.lower())[1]}"
+    cache = get_resume_cache()
+    cached = cache.get("extract", key)
+    if cached is not None:
+        return cached
+
+    text = "\n".join(extract()).strip()
+    cache.set("extract", key, text)
+    return text
+
+
+def extract_text_from_bytes(data, filename):
+    return _cached_extract(sha256_hex(data), filename, lambda: iter_text_from_bytes(data, filename))
+
+
+def extract_text_from_path(path, filename, digest):
+    """save_upload 로 저장한 파일에서 추출 (digest: save_upload 가 계산한 내용 해시)"""
+    return _cached_extract(digest, filename, lambda: iter_text_from_path(path, filename))
+
 
 def extract_text_from_file(uploaded_file):
     """업로드된 파일(PDF, DOCX)에서 텍스트만 추출하는 함수"""
-    text = ""
-    
     try:
-        # 1. PDF 파일일 경우
-        if uploaded_file.name.endswith('.pdf'):
-            reader = PdfReader(uploaded_file)
-            for page in reader.pages:
-                text += page.extract_text() + "\n"
-                
-        # 2. Word(DOCX) 파일일 경우
-        elif uploaded_file.name.endswith('.docx'):
-            doc = Document(uploaded_file)
-            for para in doc.paragraphs:
-                text += para.text + "\n"
-        
-        # 3. 텍스트 파일일 경우
-        elif uploaded_file.name.endswith('.txt'):
-            stringio = io.StringIO(uploaded_file.getvalue().decode("utf-8"))
-            text = stringio.read()
-            
+        return extract_text_from_bytes(uploaded_file.getvalue(), uploaded_file.name)
     except Exception as e:
         return f"파일 읽기 오류: {e}"
-
-    return text.strip()
\ No newline at end of file
@@ -0,0 +1,61 @@
+import hashlib
+import json
+import os
+import sys
+from itertools import islice
+
+
+def content_id(*parts):
+    """문서 내용(+메타데이터)으로 만든 고정 ID - 같은 내용이면 언제 넣어도 같은 ID"""
+    raw = "\x1f".join(str(p) for p in parts)
+    return hashlib.sha256(raw.encode("utf-8")).hexdigest()[:32]
+
+
+def iter_jsonl(path):
+    """대용량 JSONL 파일을 한 줄씩 읽어서 dict 로 흘려보냄 (전체를 메모리에 올리지 않음)"""
+    with open(path, encoding="utf-8") as f:
+        for line_no, line in enumerate(f, 1):
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                yield json.loads(line)
+            except json.JSONDecodeError as e:
+                print(f"⚠️ {path}:{line_no} 줄 건너뜀 ({e})")
+
+
+def jsonl_origin(path):
+    """JSONL 파일별 origin - 정리(prune)할 때 같은 파일로 들어온 문서만 지우도록 파일마다 따로 둠"""
+    return f"jsonl:{os.path.basename(path)}"
+
+
+def batched(iterable, size):
+    it = iter(iterable)
+    while True:
+        chunk = list(islice(it, size))
+        if not chunk:
+            return
+        yield chunk
+
+
+def iter_collection_ids(collection, page_size=1000):
+    """컬렉션에 저장된 (id, metadata) 를 페이지 단위로 훑기"""
+    offset = 0
+    while True:
+        page = collection.get(include=["metadatas"], limit=page_size, offset=offset)
+        if not page["ids"]:
+            return
+        yield from zip(page["ids"], page["metadatas"])
+        offset += len(page["ids"])
+
+
+if __name__ == "__main__":
+    # 사용법: python ingest.py tips.jsonl  (각 줄: {"category", "source", "content"})
+    from rag_system import CareerAI
+
+    if len(sys.argv) < 2:
+        print("사용법: python ingest.py <tips.jsonl>")
+        sys.exit(1)
+    ai = CareerAI()
+    # 기본 origin("seed") 을 쓰면 초기 데이터(CAREER_TIPS)가 정리 대상이 되어 지워짐
+    ai.load_data(iter_jsonl(sys.argv[1]), origin=jsonl_origin(sys.argv[1]))
@@ -0,0 +1,317 @@
+import asyncio
+import hashlib
+import json
+import os
+import socket
+import sqlite3
+import threading
+import time
+import uuid
+
+from monitor.metrics import metrics
+
+# 작업 큐 설정 (환경변수로 조정 가능)
+JOB_DB = os.getenv("JOB_DB", "monitor/jobs.db")
+JOB_WORKERS = int(os.getenv("JOB_WORKERS", "4"))                       # 프로세스당 동시에 처리할 작업 수
+JOB_RESULT_TTL = int(os.getenv("JOB_RESULT_TTL", str(24 * 3600)))     # 끝난 작업 결과 보관 시간 (초)
+JOB_POLL_INTERVAL = float(os.getenv("JOB_POLL_INTERVAL", "0.5"))      # 다른 프로세스가 넣은 작업 확인 주기
+JOB_HEARTBEAT_INTERVAL = float(os.getenv("JOB_HEARTBEAT_INTERVAL", "5"))
+JOB_STALE_SECONDS = float(os.getenv("JOB_STALE_SECONDS", "60"))       # 이 시간 동안 소식 없는 실행 중 작업은 다시 대기열로
+JOB_MAX_ATTEMPTS = int(os.getenv("JOB_MAX_ATTEMPTS", "3"))
+
+QUEUED, RUNNING, SUCCEEDED, FAILED, CANCELLED = "queued", "running", "succeeded", "failed", "cancelled"
+FINISHED = (SUCCEEDED, FAILED, CANCELLED)
+
+
+class JobError(Exception):
+    """작업 실패 - 메시지가 그대로 작업의 error 로 저장됨"""
+
+
+def dedup_key(kind, payload):
+    raw = json.dumps([kind, payload], sort_keys=True, ensure_ascii=False)
+    return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+
+class JobQueue:
+    """
+    SQLite 에 저장되는 백그라운드 작업 큐
+    - submit: 같은 작업(kind + payload)이 대기/실행 중이거나 결과가 남아 있으면 그 작업을 돌려줌 (중복 제거)
+              결과가 이전 상태에 따라 달라지는 작업은 dedup=False 로 항상 새로 등록
+    - 작업자(asyncio task)가 대기열에서 하나씩 가져가서 등록된 handler 실행
+    - 결과는 DB 에 남아서 프로세스가 재시작돼도 조회 가능, JOB_RESULT_TTL 이 지나면 삭제
+    - 실행 중이던 프로세스가 죽으면 heartbeat 가 끊긴 작업을 다시 대기열로 (최대 JOB_MAX_ATTEMPTS 번)
+    - cancel: 대기 중이면 바로 취소, 실행 중이면 실행 중인 프로세스가 작업을 중단
+    """
+
+    def __init__(self, db_path=JOB_DB, workers=JOB_WORKERS, result_ttl=JOB_RESULT_TTL):
+        self.db_path = db_path
+        self.workers = workers
+        self.result_ttl = result_ttl
+        self.handlers = {}
+        self.owner = f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:6]}"
+
+        self._lock = threading.Lock()
+        self._running = {}     # job_id → asyncio.Task (이 프로세스에서 실행 중인 작업)
+        self._wakeup = None    # start() 에서 생성
+        self._loop = None
+        self._stopping = False
+        self._tasks = []
+
+        folder = os.path.dirname(db_path)
+        if folder:
+            os.makedirs(folder, exist_ok=True)
+        self.conn = sqlite3.connect(db_path, timeout=30, check_same_thread=False, isolation_level=None)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        self.conn.executescript('''
+            CREATE TABLE IF NOT EXISTS jobs (
+                id TEXT PRIMARY KEY,
+                kind TEXT,
+                dedup_key TEXT,
+                payload TEXT,
+                status TEXT,
+                result TEXT,
+                error TEXT,
+                attempts INTEGER DEFAULT 0,
+                cancel_requested INTEGER DEFAULT 0,
+                owner TEXT,
+                created_at REAL,
+                started_at REAL,
+                heartbeat_at REAL,
+                finished_at REAL,
+                expires_at REAL
+            );
+            CREATE INDEX IF NOT EXISTS idx_jobs_queue ON jobs(status, created_at);
+            CREATE INDEX IF NOT EXISTS idx_jobs_dedup ON jobs(dedup_key, status);
+            CREATE INDEX IF NOT EXISTS idx_jobs_expires ON jobs(expires_at);
+        ''')
+
+    def register(self, kind, handler):
+        """handler: async def handler(payload) -> JSON 으로 저장 가능한 결과 (실패 시 예외)"""
+        self.handlers[kind] = handler
+
+    # ------------------------------------------------------------------
+    # 조회 / 등록 / 취소 (동기 - FastAPI 에서는 run_in_threadpool 로 호출)
+    # ------------------------------------------------------------------
+    @staticmethod
+    def _row_to_job(row):
+        if row is None:
+            return None
+        (job_id, kind, _, payload, status, result, error, attempts, cancel_requested,
+         _, created_at, started_at, _, finished_at, expires_at) = row
+        return {
+            "id": job_id,
+            "kind": kind,
+            "status": status,
+            "payload": json.loads(payload),
+            "result": json.loads(result) if result is not None else None,
+            "error": error,
+            "attempts": attempts,
+            "cancel_requested": bool(cancel_requested),
+            "created_at": created_at,
+            "started_at": started_at,
+            "finished_at": finished_at,
+            "expires_at": expires_at,
+        }
+
+    def submit(self, kind, payload, dedup=True):
+        """작업 등록 → (작업, 새로 만들었는지). dedup=True 면 같은 작업이 살아 있을 때 그것을 돌려줌"""
+        if kind not in self.handlers:
+            raise ValueError(f"알 수 없는 작업 종류: {kind}")
+        key = dedup_key(kind, payload) if dedup else None
+        now = time.time()
+        with self._lock:
+            self.conn.execute("BEGIN IMMEDIATE")
+            try:
+                row = None
+                if key is not None:
+                    row = self.conn.execute(
+                        "SELECT * FROM jobs WHERE dedup_key = ? AND status IN (?, ?, ?) "
+                        "AND (expires_at IS NULL OR expires_at > ?) ORDER BY created_at DESC LIMIT 1",
+                        (key, QUEUED, RUNNING, SUCCEEDED, now),
+                    ).fetchone()
+                if row is not None:
+                    self.conn.execute("COMMIT")
+                    metrics.inc("jobs_deduplicated")
+                    return self._row_to_job(row), False
+
+                job_id = uuid.uuid4().hex
+                self.conn.execute(
+                    "INSERT INTO jobs (id, kind, dedup_key, payload, status, created_at) VALUES (?, ?, ?, ?, ?, ?)",
+                    (job_id, kind, key, json.dumps(payload, ensure_ascii=False), QUEUED, now),
+                )
+                self.conn.execute("COMMIT")
+            except Exception:
+                self.conn.execute("ROLLBACK")
+                raise
+        metrics.inc("jobs_submitted")
+        if self._loop is not None:
+            self._loop.call_soon_threadsafe(self._wakeup.set)
+        return self.get(job_id), True
+
+    def get(self, job_id):
+        """작업 상태/결과 (없거나 보관 기간이 지났으면 None)"""
+        with self._lock:
+            row = self.conn.execute(
+                "SELECT * FROM jobs WHERE id = ? AND (expires_at IS NULL OR expires_at > ?)", (job_id, time.time())
+            ).fetchone()
+        return self._row_to_job(row)
+
+    def cancel(self, job_id):
+        """대기 중이면 바로 취소, 실행 중이면 취소 요청 (실행 중인 프로세스가 중단) → 바뀐 작업 상태"""
+        now = time.time()
+        with self._lock:
+            self.conn.execute(
+                "UPDATE jobs SET status = ?, finished_at = ?, expires_at = ? WHERE id = ? AND status = ?",
+                (CANCELLED, now, now + self.result_ttl, job_id, QUEUED),
+            )
+            self.conn.execute(
+                "UPDATE jobs SET cancel_requested = 1 WHERE id = ? AND status = ?", (job_id, RUNNING)
+            )
+        task = self._running.get(job_id)
+        if task is not None and self._loop is not None:
+            self._loop.call_soon_threadsafe(task.cancel)
+        return self.get(job_id)
+
+    def stats(self):
+        with self._lock:
+            rows = self.conn.execute("SELECT status, COUNT(*) FROM jobs GROUP BY status").fetchall()
+        counts = {status: 0 for status in (QUEUED, RUNNING) + FINISHED}
+        counts.update(dict(rows))
+        counts["running_here"] = len(self._running)
+        return counts
+
+    # ------------------------------------------------------------------
+    # 작업자 쪽 (DB 접근은 전부 짧은 트랜잭션)
+    # ------------------------------------------------------------------
+    def _claim(self):
+        """가장 오래 기다린 작업 하나를 이 프로세스 몫으로 가져옴"""
+        now = time.time()
+        with self._lock:
+            self.conn.execute("BEGIN IMMEDIATE")
+            try:
+                row = self.conn.execute(
+                    "SELECT id FROM jobs WHERE status = ? ORDER BY created_at LIMIT 1", (QUEUED,)
+                ).fetchone()
+                if row is None:
+                    self.conn.execute("COMMIT")
+                    return None
+                self.conn.execute(
+                    "UPDATE jobs SET status = ?, owner = ?, started_at = ?, heartbeat_at = ?, attempts = attempts + 1 "
+                    "WHERE id = ?",
+                    (RUNNING, self.owner, now, now, row[0]),
+                )
+                self.conn.execute("COMMIT")
+            except Exception:
+                self.conn.execute("ROLLBACK")
+                raise
+            return self._row_to_job(self.conn.execute("SELECT * FROM jobs WHERE id = ?", (row[0],)).fetchone())
+
+    def _finish(self, job_id, status, result=None, error=None):
+        now = time.time()
+        with self._lock:
+            self.conn.execute(
+                "UPDATE jobs SET status = ?, result = ?, error = ?, finished_at = ?, expires_at = ? "
+                "WHERE id = ? AND owner = ? AND status = ?",
+                (status, json.dumps(result, ensure_ascii=False) if result is not None else None, error,
+                 now, now + self.result_ttl, job_id, self.owner, RUNNING),
+            )
+        metrics.inc(f"jobs_{status}")
+
+    def _housekeeping(self):
+        """
+        - 이 프로세스가 실행 중인 작업의 heartbeat 갱신 + 다른 프로세스에서 들어온 취소 요청 확인
+        - heartbeat 가 끊긴(프로세스가 죽은) 작업은 다시 대기열로, 시도 횟수를 넘기면 실패 처리
+        - 보관 기간이 지난 결과 삭제
+        반환: 취소 요청이 들어온 이 프로세스의 작업 ID 목록
+        """
+        now = time.time()
+        running = list(self._running)
+        with self._lock:
+            cancel_ids = []
+            if running:
+                marks = ",".join("?" * len(running))
+                self.conn.execute(f"UPDATE jobs SET heartbeat_at = ? WHERE id IN ({marks})", [now] + running)
+                cancel_ids = [r[0] for r in self.conn.execute(
+                    f"SELECT id FROM jobs WHERE cancel_requested = 1 AND id IN ({marks})", running
+                )]
+            stale = now - JOB_STALE_SECONDS
+            self.conn.execute(
+                "UPDATE jobs SET status = ?, error = ?, finished_at = ?, expires_at = ? "
+                "WHERE status = ? AND heartbeat_at < ? AND attempts >= ?",
+                (FAILED, "작업자가 응답하지 않아 중단되었습니다.", now, now + self.result_ttl, RUNNING, stale, JOB_MAX_ATTEMPTS),
+            )
+            requeued = self.conn.execute(
+                "UPDATE jobs SET status = ?, owner = NULL WHERE status = ? AND heartbeat_at < ?",
+                (QUEUED, RUNNING, stale),
+            ).rowcount
+            self.conn.execute("DELETE FROM jobs WHERE expires_at IS NOT NULL AND expires_at < ?", (now,))
+        if requeued:
+            metrics.inc("jobs_requeued", requeued)
+        return cancel_ids
+
+    async def _run_job(self, job):
+        handler = self.handlers.get(job["kind"])
+        try:
+            if handler is None:
+                raise JobError(f"알 수 없는 작업 종류: {job['kind']}")
+            with metrics.span(f"job_{job['kind']}"):
+                result = await handler(job["payload"])
+        except asyncio.CancelledError:
+            # 종료 중이면 상태를 그대로 두고 stop() 이 대기열로 되돌림
+            if self._stopping:
+                raise
+            await asyncio.to_thread(self._finish, job["id"], CANCELLED, None, "취소되었습니다.")
+        except Exception as e:
+            await asyncio.to_thread(self._finish, job["id"], FAILED, None, str(e))
+        else:
+            await asyncio.to_thread(self._finish, job["id"], SUCCEEDED, result)
+
+    async def _worker(self):
+        while not self._stopping:
+            job = await asyncio.to_thread(self._claim)
+            if job is None:
+                self._wakeup.clear()
+                try:
+                    await asyncio.wait_for(self._wakeup.wait(), JOB_POLL_INTERVAL)
+                except asyncio.TimeoutError:
+                    pass
+                continue
+            # 작업마다 별도 task → 취소해도 그 작업만 멈추고 작업자는 계속 돎
+            task = asyncio.create_task(self._run_job(job))
+            self._running[job["id"]] = task
+            try:
+                await task
+            finally:
+                self._running.pop(job["id"], None)
+
+    async def _janitor(self):
+        while not self._stopping:
+            for job_id in await asyncio.to_thread(self._housekeeping):
+                task = self._running.get(job_id)
+                if task is not None:
+                    task.cancel()
+            await asyncio.sleep(JOB_HEARTBEAT_INTERVAL)
+
+    async def start(self):
+        """현재 이벤트 루프에서 작업자 workers 개 + 관리 작업 시작"""
+        self._loop = asyncio.get_running_loop()
+        self._wakeup = asyncio.Event()
+        self._stopping = False
+        self._tasks = [asyncio.create_task(self._worker()) for _ in range(self.workers)]
+        self._tasks.append(asyncio.create_task(self._janitor()))
+
+    async def stop(self):
+        """작업자 중단 - 이 프로세스가 실행 중이던 작업은 다른 프로세스/재시작 후 이어받도록 대기열로 되돌림"""
+        self._stopping = True
+        running = list(self._running)
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        if running:
+            with self._lock:
+                marks = ",".join("?" * len(running))
+                self.conn.execute(
+                    f"UPDATE jobs SET status = ?, owner = NULL WHERE owner = ? AND status = ? AND id IN ({marks})",
+                    [QUEUED, self.owner, RUNNING] + running,
+                )
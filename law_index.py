@@ -0,0 +1,241 @@
+import os
+import re
+import sys
+import time
+
+from ingest import content_id, iter_jsonl
+from monitor.metrics import metrics
+
+# 법령 인덱스 설정 (환경변수로 조정 가능)
+LAW_DB_PATH = os.getenv("LAW_DB_PATH", "./law_db")
+LAW_COLLECTION = "law_articles"
+LAW_INGEST_BATCH = int(os.getenv("LAW_INGEST_BATCH", "256"))
+LAW_SEARCH_TARGET_MS = float(os.getenv("LAW_SEARCH_TARGET_MS", "100"))   # bench 의 p95 목표
+
+# 수십만 조문 규모 기준 HNSW 파라미터 (M: 그래프 연결 수, ef: 탐색 폭)
+LAW_HNSW_METADATA = {
+    "hnsw:space": "cosine",
+    "hnsw:M": int(os.getenv("LAW_HNSW_M", "32")),
+    "hnsw:construction_ef": int(os.getenv("LAW_HNSW_CONSTRUCTION_EF", "200")),
+    "hnsw:search_ef": int(os.getenv("LAW_HNSW_SEARCH_EF", "64")),
+    "hnsw:batch_size": 1000,
+    "hnsw:sync_threshold": 10000,
+}
+
+# "주택임대차보호법 제3조(대항력 등)" → 법령명 / 조문번호 / 제목
+_SOURCE = re.compile(r"^(?P<law>.+?)\s+(?P<article>제\d+조(?:의\d+)?)(?:\((?P<title>[^)]*)\))?\s*$")
+# 항 번호 ①~⑳
+_PARAGRAPH = re.compile(r"([①-⑳])")
+
+
+def normalize_law_record(record):
+    """
+    입력 레코드를 공통 형태로 맞춤
+    - 벌크 파일(JSONL): {"law_name", "article_no", "article_title", "effective_date", "text"}
+    - 샘플 데이터(law_data.SAMPLE_LAWS): {"source": "법령명 제N조(제목)", "content"}
+    """
+    if "source" in record and "law_name" not in record:
+        match = _SOURCE.match(record["source"])
+        if match:
+            record = {
+                "law_name": match.group("law"),
+                "article_no": match.group("article"),
+                "article_title": match.group("title") or "",
+                "text": record["content"],
+            }
+        else:
+            record = {"law_name": record["source"], "article_no": "", "text": record["content"]}
+    return {
+        "law_name": record.get("law_name", ""),
+        "article_no": record.get("article_no", ""),
+        "article_title": record.get("article_title", ""),
+        "effective_date": record.get("effective_date", ""),
+        "text": (record.get("text") or "").strip(),
+    }
+
+
+def chunk_article(record):
+    """
+    조문 1개를 검색 단위로 나눔
+    - 항(①②...)이 있으면 항 단위, 없으면 조문 전체를 한 덩어리로
+    - 각 덩어리 앞에 "법령명 제N조(제목)" 을 붙여서 항만 봐도 어느 조문인지 알 수 있게 함
+    """
+    article = normalize_law_record(record)
+    if not article["text"]:
+        return []
+
+    header = f"{article['law_name']} {article['article_no']}"
+    if article["article_title"]:
+        header += f"({article['article_title']})"
+
+    # split 결과: [항 앞 본문, "①", 1항 내용, "②", 2항 내용, ...]
+    parts = _PARAGRAPH.split(article["text"])
+    if len(parts) > 1:
+        paragraphs = [(parts[i], (parts[i] + parts[i + 1]).strip()) for i in range(1, len(parts), 2)]
+        lead = parts[0].strip()
+        if lead:
+            paragraphs[0] = (paragraphs[0][0], f"{lead} {paragraphs[0][1]}")
+    else:
+        paragraphs = [("", article["text"])]
+
+    chunks = []
+    for paragraph_no, body in paragraphs:
+        meta = {
+            "law_name": article["law_name"],
+            "article_no": article["article_no"],
+            "article_title": article["article_title"],
+            "paragraph": paragraph_no,
+            "effective_date": article["effective_date"],
+        }
+        doc_id = content_id(article["law_name"], article["article_no"], paragraph_no, article["effective_date"], body)
+        chunks.append((doc_id, f"{header} {body}", meta))
+    return chunks
+
+
+class LawIndex:
+    """법령 조문 검색 인덱스 (자소서 팁과 분리된 별도 컬렉션)"""
+
+    def __init__(self, path=LAW_DB_PATH, embedding_function=None):
+        import chromadb
+        from embedding_cache import CachedEmbeddingFunction
+
+        self.embedding_fn = embedding_function or CachedEmbeddingFunction()
+        self.client = chromadb.PersistentClient(path=path)
+        self.collection = self.client.get_or_create_collection(
+            name=LAW_COLLECTION,
+            embedding_function=self.embedding_fn,
+            metadata=LAW_HNSW_METADATA,
+        )
+
+    def count(self):
+        return self.collection.count()
+
+    def ingest(self, records, batch_size=LAW_INGEST_BATCH):
+        """
+        조문 레코드를 흘려보내면서 적재 (파일 전체를 메모리에 올리지 않음)
+        - ID 는 내용 해시라서 이미 있는 조문/항은 건너뜀 (재실행해도 변경분만 임베딩)
+        - 같은 조문(법령명 + 조문번호)의 새 버전이 들어오면 이전 버전의 항은 삭제
+          (한 조문의 항은 항상 같은 배치에 담아서, 배치 경계에서 방금 넣은 항을 지우지 않음)
+        반환: {"articles", "chunks", "added", "removed", "seconds", "chunks_per_sec"}
+        """
+        start = time.perf_counter()
+        articles = chunks_total = added = removed = 0
+
+        def iter_batches():
+            # {조문 키: 항 목록} - 같은 배치 안에 같은 조문이 또 나오면 뒤에 나온 버전만 남김
+            nonlocal articles
+            batch, size = {}, 0
+            for record in records:
+                articles += 1
+                chunks = chunk_article(record)
+                if not chunks:
+                    continue
+                meta = chunks[0][2]
+                key = (meta["law_name"], meta["article_no"]) if meta["article_no"] else chunks[0][0]
+                size += len(chunks) - len(batch.pop(key, []))
+                batch[key] = chunks
+                if size >= batch_size:
+                    yield batch
+                    batch, size = {}, 0
+            if batch:
+                yield batch
+
+        for batch in iter_batches():
+            rows = {doc_id: (text, meta) for chunks in batch.values() for doc_id, text, meta in chunks}
+            chunks_total += len(rows)
+            stale = [doc_id for doc_id in self._article_chunk_ids(batch) if doc_id not in rows]
+            if stale:
+                self.collection.delete(ids=stale)
+                removed += len(stale)
+            existing = set(self.collection.get(ids=list(rows), include=[])["ids"])
+            new_ids = [doc_id for doc_id in rows if doc_id not in existing]
+            if new_ids:
+                self.collection.add(
+                    ids=new_ids,
+                    documents=[rows[i][0] for i in new_ids],
+                    metadatas=[rows[i][1] for i in new_ids],
+                )
+                added += len(new_ids)
+
+        seconds = time.perf_counter() - start
+        return {
+            "articles": articles,
+            "chunks": chunks_total,
+            "added": added,
+            "removed": removed,
+            "seconds": round(seconds, 3),
+            "chunks_per_sec": round(chunks_total / seconds, 1) if seconds else 0.0,
+        }
+
+    def _article_chunk_ids(self, batch):
+        """배치에 들어 있는 조문들의 이미 저장된 항 ID (조문번호가 없는 레코드는 제외)"""
+        clauses = [
+            {"$and": [{"law_name": key[0]}, {"article_no": key[1]}]}
+            for key in batch if isinstance(key, tuple)
+        ]
+        if not clauses:
+            return []
+        where = clauses[0] if len(clauses) == 1 else {"$or": clauses}
+        return self.collection.get(where=where, include=[])["ids"]
+
+    def search(self, query, top_k=5, law_name=None):
+        """질문과 가까운 조문/항 top_k 개"""
+        where = {"law_name": law_name} if law_name else None
+        with metrics.span("law_search"):
+            results = self.collection.query(query_texts=[query], n_results=top_k, where=where)
+
+        hits = []
+        for i, doc_id in enumerate(results["ids"][0]):
+            meta = results["metadatas"][0][i]
+            hits.append({
+                "id": doc_id,
+                "law_name": meta.get("law_name", ""),
+                "article_no": meta.get("article_no", ""),
+                "article_title": meta.get("article_title", ""),
+                "paragraph": meta.get("paragraph", ""),
+                "effective_date": meta.get("effective_date", ""),
+                "text": results["documents"][0][i],
+                "score": round(1 - results["distances"][0][i], 4),
+            })
+        return hits
+
+
+def iter_law_files(paths):
+    """여러 벌크 JSONL 파일을 순서대로 흘려보냄"""
+    for path in paths:
+        yield from iter_jsonl(path)
+
+
+if __name__ == "__main__":
+    # 사용법:
+    #   python law_index.py ingest laws1.jsonl laws2.jsonl ...  → 적재 + 처리량 출력
+    #   python law_index.py ingest                              → law_data.SAMPLE_LAWS 적재
+    #   python law_index.py bench "해고 예고" ...               → 검색 지연시간(p50/p95) 측정
+    if len(sys.argv) < 2 or sys.argv[1] not in ("ingest", "bench"):
+        print("사용법: python law_index.py ingest [파일...] | bench [질문...]")
+        sys.exit(1)
+
+    index = LawIndex()
+    if sys.argv[1] == "ingest":
+        if len(sys.argv) > 2:
+            source = iter_law_files(sys.argv[2:])
+        else:
+            from law_data import SAMPLE_LAWS
+            source = iter(SAMPLE_LAWS)
+        print(f"✅ 법령 적재 완료: {index.ingest(source)} (총 {index.count()}건)")
+    else:
+        queries = sys.argv[2:] or ["해고 예고 기간", "임차인 대항력", "사기죄 처벌", "불법행위 손해배상"]
+        timings = []
+        for _ in range(20):
+            for q in queries:
+                t = time.perf_counter()
+                index.search(q, top_k=5)
+                timings.append((time.perf_counter() - t) * 1000)
+        timings.sort()
+        p95 = timings[int(len(timings) * 0.95) - 1]
+        print(f"🔍 검색 {len(timings)}회 (코퍼스 {index.count()}건): "
+              f"p50={timings[len(timings) // 2]:.1f}ms p95={p95:.1f}ms")
+        if p95 > LAW_SEARCH_TARGET_MS:
+            print(f"❌ p95 가 목표({LAW_SEARCH_TARGET_MS:.0f}ms)를 넘었습니다.")
+            sys.exit(1)
+        print(f"✅ p95 가 목표({LAW_SEARCH_TARGET_MS:.0f}ms) 안에 들어옵니다.")
@@ -0,0 +1,523 @@
+import asyncio
+import contextlib
+import hashlib
+import heapq
+import json
+import os
+import random
+import threading
+import time
+from concurrent.futures import Future
+
+from monitor.metrics import metrics
+
+# LLM 백엔드: gemini (기본) / fake (로컬 테스트/벤치마크용, API 키 불필요)
+LLM_BACKEND = os.getenv("LLM_BACKEND", "gemini")
+LLM_MODEL_NAME = os.getenv("LLM_MODEL_NAME", "gemini-flash-latest")
+
+# 계정 할당량에 맞춰 조정 (0 이면 제한 없음)
+LLM_RPM = float(os.getenv("LLM_RPM", "300"))               # 분당 요청 수
+LLM_TPM = float(os.getenv("LLM_TPM", "1000000"))           # 분당 토큰 수 (입력 + 출력)
+LLM_BURST_SECONDS = float(os.getenv("LLM_BURST_SECONDS", "10"))  # 몇 초 분량까지 몰아서 보낼 수 있는지
+LLM_OUTPUT_TOKEN_ESTIMATE = int(os.getenv("LLM_OUTPUT_TOKEN_ESTIMATE", "1024"))
+
+# 재시도 (429/5xx/타임아웃만) - 지수 백오프 + full jitter
+LLM_MAX_RETRIES = int(os.getenv("LLM_MAX_RETRIES", "3"))
+LLM_RETRY_BASE_DELAY = float(os.getenv("LLM_RETRY_BASE_DELAY", "0.5"))
+LLM_RETRY_MAX_DELAY = float(os.getenv("LLM_RETRY_MAX_DELAY", "8"))
+
+# 동시 호출 슬롯 중 대화형 요청 전용으로 남겨둘 개수 (배치가 슬롯을 다 차지하지 못하게)
+LLM_INTERACTIVE_RESERVED = int(os.getenv("LLM_INTERACTIVE_RESERVED", "1"))
+
+# 우선순위 (숫자가 작을수록 먼저)
+INTERACTIVE = 0   # 사용자가 화면 앞에서 기다리는 코칭
+BATCH = 1         # 일괄 코칭, 이력서 파싱
+
+_RETRYABLE_CODES = {408, 429, 500, 502, 503, 504}
+_RETRYABLE_NAMES = {
+    "ResourceExhausted", "TooManyRequests", "ServiceUnavailable", "InternalServerError",
+    "DeadlineExceeded", "GatewayTimeout", "BadGateway", "TimeoutError",
+}
+
+
+def is_retryable(error):
+    """할당량 초과(429), 일시적 서버 오류(5xx), 타임아웃이면 True"""
+    code = getattr(error, "code", None)
+    if isinstance(code, int) and code in _RETRYABLE_CODES:
+        return True
+    return type(error).__name__ in _RETRYABLE_NAMES
+
+
+def estimate_tokens(text):
+    """토큰 수 대략 추정 (한글은 1~2글자 ≈ 1토큰이라 보수적으로 2글자당 1토큰)"""
+    return max(1, len(text) // 2)
+
+
+def backoff_delay(attempt, base=LLM_RETRY_BASE_DELAY, cap=LLM_RETRY_MAX_DELAY):
+    """attempt 번째 재시도 전 대기 시간 (full jitter)"""
+    return random.uniform(0, min(cap, base * (2 ** attempt)))
+
+
+class TokenBucket:
+    """
+    초당 rate 만큼 채워지고 capacity 까지 쌓이는 토큰 통 (rate <= 0 이면 제한 없음)
+    - reserve() 는 먼저 빼고 기다릴 시간을 돌려줌 (잔고가 음수 = 앞 사람들이 예약한 분량)
+    """
+
+    def __init__(self, rate, capacity):
+        self.rate = rate
+        self.capacity = max(capacity, 1.0)
+        self.tokens = self.capacity
+        self.updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def _refill(self):
+        now = time.monotonic()
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def reserve(self, amount):
+        if self.rate <= 0:
+            return 0.0
+        with self._lock:
+            self._refill()
+            self.tokens -= min(amount, self.capacity)
+            return max(0.0, -self.tokens / self.rate)
+
+    def adjust(self, amount):
+        """예약량과 실제 사용량의 차이를 돌려받거나(+) 더 냄(-)"""
+        if self.rate <= 0:
+            return
+        with self._lock:
+            self._refill()
+            self.tokens = min(self.capacity, self.tokens + amount)
+
+
+class _Waiter:
+    __slots__ = ("notify", "active")
+
+    def __init__(self, notify):
+        self.notify = notify   # 자리를 받았을 때 깨우는 함수
+        self.active = True     # 자리를 받았거나 기다리기를 포기하면 False
+
+
+class PrioritySlots:
+    """
+    우선순위가 있는 세마포어 (비동기 요청과 동기 스레드가 같은 슬롯을 나눠 씀)
+    - 자리가 나면 우선순위(INTERACTIVE → BATCH), 같은 우선순위는 먼저 온 순서대로
+    - reserved 개 슬롯은 INTERACTIVE 만 사용 가능
+    - 비동기는 acquire(), 동기(Streamlit / 스레드 풀)는 acquire_sync() 로 기다림
+    """
+
+    def __init__(self, size, reserved=0):
+        self.size = max(1, size)
+        self.reserved = max(0, min(reserved, self.size - 1))
+        self.in_use = 0
+        self._waiters = []   # (priority, seq, _Waiter)
+        self._seq = 0
+        self._lock = threading.Lock()
+
+    def _admissible(self, priority):
+        limit = self.size if priority == INTERACTIVE else self.size - self.reserved
+        return self.in_use < limit
+
+    def _head_priority(self):
+        while self._waiters and not self._waiters[0][2].active:
+            heapq.heappop(self._waiters)
+        return self._waiters[0][0] if self._waiters else None
+
+    def _try_take(self, priority):
+        """바로 자리를 받을 수 있으면 차지 (앞에 같거나 높은 우선순위가 기다리면 새치기하지 않음)"""
+        head = self._head_priority()
+        if self._admissible(priority) and (head is None or head > priority):
+            self.in_use += 1
+            return True
+        return False
+
+    def _push(self, priority, notify):
+        waiter = _Waiter(notify)
+        self._seq += 1
+        heapq.heappush(self._waiters, (priority, self._seq, waiter))
+        return waiter
+
+    async def acquire(self, priority):
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+
+        def wake():
+            if not future.done():
+                future.set_result(None)
+
+        with self._lock:
+            if self._try_take(priority):
+                return
+            waiter = self._push(priority, lambda: loop.call_soon_threadsafe(wake))
+        try:
+            await future
+        except asyncio.CancelledError:
+            with self._lock:
+                granted = not waiter.active
+                waiter.active = False
+            # 자리를 받은 직후에 취소되면 바로 반납
+            if granted:
+                self.release()
+            raise
+
+    def acquire_sync(self, priority):
+        event = threading.Event()
+        with self._lock:
+            if self._try_take(priority):
+                return
+            self._push(priority, event.set)
+        event.wait()
+
+    def release(self):
+        granted = []
+        with self._lock:
+            self.in_use -= 1
+            while self._waiters:
+                priority, _, waiter = self._waiters[0]
+                if not waiter.active:
+                    heapq.heappop(self._waiters)
+                    continue
+                if not self._admissible(priority):
+                    break
+                heapq.heappop(self._waiters)
+                self.in_use += 1
+                waiter.active = False
+                granted.append(waiter)
+        for waiter in granted:
+            waiter.notify()
+
+
+class LLMClient:
+    """
+    모든 LLM 호출이 지나가는 공용 클라이언트
+    - 요청 수 / 토큰 수 토큰 버킷으로 할당량 안에서만 호출
+    - 429/5xx 는 지수 백오프 + jitter 로 재시도
+    - 동시 호출 슬롯은 우선순위 순서로 배정 (대화형 코칭이 배치 작업보다 먼저)
+    - 똑같은 프롬프트(+옵션)가 이미 호출 중이면 새로 보내지 않고 그 결과를 같이 씀
+    """
+
+    def __init__(self, backend, max_concurrency=8, rpm=LLM_RPM, tpm=LLM_TPM,
+                 max_retries=LLM_MAX_RETRIES, interactive_reserved=LLM_INTERACTIVE_RESERVED):
+        self.backend = backend
+        self.max_concurrency = max_concurrency
+        self.max_retries = max_retries
+        self.interactive_reserved = interactive_reserved
+        self.request_bucket = TokenBucket(rpm / 60, rpm / 60 * LLM_BURST_SECONDS)
+        self.token_bucket = TokenBucket(tpm / 60, tpm / 60 * LLM_BURST_SECONDS)
+
+        self._slots = PrioritySlots(max_concurrency, interactive_reserved)
+        self._inflight = {}
+        self._sync_inflight = {}
+        self._sync_lock = threading.Lock()
+
+    # ------------------------------------------------------------------
+    # 공통
+    # ------------------------------------------------------------------
+    @staticmethod
+    def _coalesce_key(prompt, kwargs):
+        raw = json.dumps([prompt, kwargs], sort_keys=True, ensure_ascii=False, default=str)
+        return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+    def _reserve(self, prompt):
+        """할당량 예약 → (기다릴 시간, 예약한 토큰 수)"""
+        tokens = estimate_tokens(prompt) + LLM_OUTPUT_TOKEN_ESTIMATE
+        wait = max(self.request_bucket.reserve(1), self.token_bucket.reserve(tokens))
+        return wait, tokens
+
+    def _settle(self, response, reserved_tokens, stage):
+        """실제 토큰 사용량 기록 (전체 + 단계별) + 예약량과의 차이 정산"""
+        usage = getattr(response, "usage_metadata", None)
+        if not usage:
+            return
+        prompt_tokens = getattr(usage, "prompt_token_count", 0) or 0
+        output_tokens = getattr(usage, "candidates_token_count", 0) or 0
+        metrics.inc("llm_prompt_tokens", prompt_tokens)
+        metrics.inc("llm_output_tokens", output_tokens)
+        metrics.inc(f"llm_prompt_tokens_{stage}", prompt_tokens)
+        metrics.inc(f"llm_output_tokens_{stage}", output_tokens)
+        if prompt_tokens or output_tokens:
+            self.token_bucket.adjust(reserved_tokens - (prompt_tokens + output_tokens))
+
+    def _wait_for_quota(self, prompt):
+        """할당량이 찰 때까지 대기 (슬롯을 잡기 전에 - 기다리는 동안 다른 요청이 슬롯을 쓸 수 있게) → 예약한 토큰 수"""
+        wait, reserved = self._reserve(prompt)
+        if wait:
+            metrics.observe("llm_rate_wait", wait * 1000)
+            time.sleep(wait)
+        return reserved
+
+    async def _await_quota(self, prompt):
+        wait, reserved = self._reserve(prompt)
+        if wait:
+            metrics.observe("llm_rate_wait", wait * 1000)
+            await asyncio.sleep(wait)
+        return reserved
+
+    def _should_retry(self, error, attempt):
+        if attempt >= self.max_retries or not is_retryable(error):
+            return False
+        metrics.inc("llm_retries")
+        return True
+
+    # ------------------------------------------------------------------
+    # 동기 호출 (Streamlit, 스레드 풀)
+    # ------------------------------------------------------------------
+    def generate(self, prompt, stage, priority=INTERACTIVE, **kwargs):
+        """agenerate 의 동기 버전 - 같은 슬롯/우선순위/할당량/재시도/중복 합치기 적용"""
+        key = self._coalesce_key(prompt, kwargs)
+        with self._sync_lock:
+            future = self._sync_inflight.get(key)
+            owner = future is None
+            if owner:
+                future = Future()
+                self._sync_inflight[key] = future
+        if not owner:
+            metrics.inc("llm_coalesced")
+            return future.result()
+
+        try:
+            response = self._call(prompt, stage, priority, **kwargs)
+            future.set_result(response)
+            return response
+        except Exception as e:
+            future.set_exception(e)
+            raise
+        finally:
+            with self._sync_lock:
+                self._sync_inflight.pop(key, None)
+
+    def _call(self, prompt, stage, priority, **kwargs):
+        attempt = 0
+        while True:
+            reserved = self._wait_for_quota(prompt)
+            with self._sync_slot(priority), metrics.span(f"llm_{stage}"):
+                try:
+                    response = self.backend.generate_content(prompt, **kwargs)
+                except Exception as e:
+                    metrics.inc("llm_errors")
+                    if not self._should_retry(e, attempt):
+                        raise
+                else:
+                    self._settle(response, reserved, stage)
+                    return response
+            time.sleep(backoff_delay(attempt))
+            attempt += 1
+
+    def stream(self, prompt, stage, priority=INTERACTIVE, **kwargs):
+        """astream 의 동기 버전 (Streamlit) - 첫 조각이 오기 전에 난 오류만 재시도"""
+        attempt = 0
+        while True:
+            started = False
+            reserved = self._wait_for_quota(prompt)
+            with self._sync_slot(priority), metrics.span(f"llm_{stage}"):
+                last_chunk = None
+                try:
+                    for chunk in self.backend.generate_content(prompt, stream=True, **kwargs):
+                        last_chunk = chunk
+                        if chunk.text:
+                            started = True
+                            yield chunk.text
+                except Exception as e:
+                    metrics.inc("llm_errors")
+                    if started or not self._should_retry(e, attempt):
+                        raise
+                else:
+                    self._settle(last_chunk, reserved, stage)
+                    return
+            time.sleep(backoff_delay(attempt))
+            attempt += 1
+
+    # ------------------------------------------------------------------
+    # 비동기 호출 (FastAPI)
+    # ------------------------------------------------------------------
+    async def agenerate(self, prompt, stage, priority=INTERACTIVE, **kwargs):
+        key = self._coalesce_key(prompt, kwargs)
+        task = self._inflight.get(key)
+        if task is not None:
+            metrics.inc("llm_coalesced")
+        else:
+            task = asyncio.ensure_future(self._acall(prompt, stage, priority, **kwargs))
+            self._inflight[key] = task
+            task.add_done_callback(lambda _: self._inflight.pop(key, None))
+        # 기다리던 요청 하나가 취소돼도 같이 기다리는 다른 요청의 호출은 계속 진행
+        return await asyncio.shield(task)
+
+    async def _acall(self, prompt, stage, priority, **kwargs):
+        attempt = 0
+        while True:
+            reserved = await self._await_quota(prompt)
+            async with self._slot(priority):
+                with metrics.span(f"llm_{stage}"):
+                    try:
+                        response = await self.backend.generate_content_async(prompt, **kwargs)
+                    except Exception as e:
+                        metrics.inc("llm_errors")
+                        if not self._should_retry(e, attempt):
+                            raise
+                    else:
+                        self._settle(response, reserved, stage)
+                        return response
+            # 백오프 동안은 슬롯을 내놓아서 다른 요청이 쓸 수 있게 함
+            await asyncio.sleep(backoff_delay(attempt))
+            attempt += 1
+
+    async def astream(self, prompt, stage, priority=INTERACTIVE, **kwargs):
+        """
+        비동기 스트리밍 호출 - 텍스트 조각을 도착하는 대로 흘려보냄
+        첫 조각이 오기 전에 난 오류만 재시도 (이미 보낸 조각은 되돌릴 수 없음)
+        """
+        attempt = 0
+        while True:
+            started = False
+            reserved = await self._await_quota(prompt)
+            async with self._slot(priority):
+                with metrics.span(f"llm_{stage}"):
+                    last_chunk = None
+                    try:
+                        response = await self.backend.generate_content_async(prompt, stream=True, **kwargs)
+                        async for chunk in response:
+                            last_chunk = chunk
+                            if chunk.text:
+                                started = True
+                                yield chunk.text
+                    except Exception as e:
+                        metrics.inc("llm_errors")
+                        if started or not self._should_retry(e, attempt):
+                            raise
+                    else:
+                        # 토큰 사용량은 마지막 청크에 누적되어 들어옴
+                        self._settle(last_chunk, reserved, stage)
+                        return
+            await asyncio.sleep(backoff_delay(attempt))
+            attempt += 1
+
+    def _slot(self, priority):
+        return _SlotContext(self._slots, priority)
+
+    @contextlib.contextmanager
+    def _sync_slot(self, priority):
+        start = time.perf_counter()
+        self._slots.acquire_sync(priority)
+        metrics.observe("llm_queue_wait", (time.perf_counter() - start) * 1000)
+        try:
+            yield
+        finally:
+            self._slots.release()
+
+
+class _SlotContext:
+    def __init__(self, slots, priority):
+        self.slots = slots
+        self.priority = priority
+
+    async def __aenter__(self):
+        start = time.perf_counter()
+        await self.slots.acquire(self.priority)
+        metrics.observe("llm_queue_wait", (time.perf_counter() - start) * 1000)
+
+    async def __aexit__(self, *exc):
+        self.slots.release()
+
+
+# ------------------------------------------------------------------
+# 로컬 가짜 백엔드 (API 키 없이 테스트/부하 측정)
+# ------------------------------------------------------------------
+class FakeLLMError(Exception):
+    """가짜 백엔드가 일부러 내는 오류 (code=429 → 재시도 대상)"""
+
+    def __init__(self, message, code=429):
+        super().__init__(message)
+        self.code = code
+
+
+class _FakeUsage:
+    def __init__(self, prompt_token_count, candidates_token_count):
+        self.prompt_token_count = prompt_token_count
+        self.candidates_token_count = candidates_token_count
+
+
+class FakeResponse:
+    def __init__(self, text, usage=None):
+        self.text = text
+        self.usage_metadata = usage
+
+
+class FakeLLMBackend:
+    """
+    generate_content / generate_content_async 를 흉내 내는 결정적(deterministic) 백엔드
+    - latency: 호출 1회 지연시간(초), error_rate: 오류 비율, seed: 같은 seed 면 같은 오류 순서
+    - JSON 모드(response_mime_type=application/json) 면 코칭/이력서 파싱 스키마에 맞는 JSON 을 돌려줌
+    """
+
+    def __init__(self, latency=0.0, error_rate=0.0, seed=0, error_code=429):
+        self.latency = latency
+        self.error_rate = error_rate
+        self.error_code = error_code
+        self.calls = 0
+        self._random = random.Random(seed)
+        self._lock = threading.Lock()
+
+    def _next(self, prompt, generation_config):
+        with self._lock:
+            self.calls += 1
+            fail = self.error_rate > 0 and self._random.random() < self.error_rate
+        if fail:
+            raise FakeLLMError("fake backend error", code=self.error_code)
+
+        digest = hashlib.sha256(prompt.encode("utf-8")).hexdigest()[:8]
+        if (generation_config or {}).get("response_mime_type") == "application/json":
+            text = json.dumps({
+                "summary": f"요약 {digest}",
+                "items": [{"original": "원문", "reason": "이유", "suggestion": "수정안"}],
+                "closing": "화이팅",
+                "experiences": [{"company": f"회사 {digest}", "role": "개발자", "period": "2020 ~ 2022",
+                                 "details": ["성과"]}],
+            }, ensure_ascii=False)
+        else:
+            text = f"가짜 응답 {digest}: 문장을 더 구체적으로 다듬어 보세요."
+        return FakeResponse(text, _FakeUsage(estimate_tokens(prompt), estimate_tokens(text)))
+
+    @staticmethod
+    def _chunks(response):
+        """단어 단위 조각 (토큰 사용량은 실제 API 처럼 마지막 조각에만)"""
+        words = response.text.split(" ")
+        for i, word in enumerate(words):
+            last = i == len(words) - 1
+            yield FakeResponse(word + ("" if last else " "), response.usage_metadata if last else None)
+
+    def generate_content(self, prompt, generation_config=None, stream=False, **kwargs):
+        if self.latency:
+            time.sleep(self.latency)
+        response = self._next(prompt, generation_config)
+        return self._chunks(response) if stream else response
+
+    async def generate_content_async(self, prompt, generation_config=None, stream=False, **kwargs):
+        if self.latency:
+            await asyncio.sleep(self.latency)
+        response = self._next(prompt, generation_config)
+        if not stream:
+            return response
+
+        async def chunks():
+            for chunk in self._chunks(response):
+                yield chunk
+        return chunks()
+
+
+def create_backend(name=LLM_BACKEND):
+    """환경변수 설정에 맞는 LLM 백엔드 생성 (gemini 는 API 키가 없으면 None)"""
+    if name == "fake":
+        return FakeLLMBackend(
+            latency=float(os.getenv("FAKE_LLM_LATENCY", "0")),
+            error_rate=float(os.getenv("FAKE_LLM_ERROR_RATE", "0")),
+            seed=int(os.getenv("FAKE_LLM_SEED", "0")),
+        )
+    api_key = os.getenv("GOOGLE_API_KEY")
+    if not api_key:
+        return None
+    import google.generativeai as genai
+    genai.configure(api_key=api_key)
+    return genai.GenerativeModel(LLM_MODEL_NAME)
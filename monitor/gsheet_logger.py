@@ -3,20 +3,70 @@ import gspread
 from oauth2client.service_account import ServiceAccountCredentials
 from datetime import datetime
 import os
+import atexit
+import queue
+import random
+import threading
+import time
+
+# 로그 전송 설정 (환경변수로 조정 가능)
+LOG_QUEUE_SIZE = int(os.getenv("LOG_QUEUE_SIZE", "10000"))
+LOG_BATCH_SIZE = int(os.getenv("LOG_BATCH_SIZE", "50"))
+LOG_FLUSH_INTERVAL = float(os.getenv("LOG_FLUSH_INTERVAL", "2"))   # 초
+LOG_MAX_RETRIES = int(os.getenv("LOG_MAX_RETRIES", "3"))
+LOG_RETRY_BASE = float(os.getenv("LOG_RETRY_BASE", "0.5"))        # 초 (재시도마다 2배)
+
+
+class LocalSink:
+    """구글 시트 대신 쓰는 로컬 전송 대상 (테스트/개발용) - fail=True 면 장애 흉내"""
+
+    def __init__(self):
+        self.rows = []
+        self.fail = False
+        self.calls = 0
+
+    def append_rows(self, rows):
+        self.calls += 1
+        if self.fail:
+            raise ConnectionError("sink down")
+        self.rows.extend(rows)
+
 
 class RealTimeLogger:
-    def __init__(self, key_path, sheet_name):
+    """
+    사용자 행동 로그 기록기
+    - log() 는 큐에 넣기만 하고 바로 반환 (요청 처리 중 네트워크/DB 대기 없음)
+    - 백그라운드 스레드가 크기/시간 기준으로 묶어서 SQLite 저장 + 시트에 append_rows 1회 전송
+    - 시트 전송 실패 시 재시도(지수 백오프 + 지터), 그래도 실패하면 SQLite(log_spill)에
+      보관했다가 다음 주기에 다시 전송
+    - 로컬 저장과 시트 전송은 따로 실패 처리 → 한쪽이 실패해도 묶음이 사라지지 않음
+    """
+
+    def __init__(self, key_path, sheet_name, sink=None, db_path='monitor/service.db',
+                 batch_size=LOG_BATCH_SIZE, flush_interval=LOG_FLUSH_INTERVAL):
         self.key_path = key_path
         self.sheet_name = sheet_name
-        self.worksheet = None
+        self.db_path = db_path
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.worksheet = sink
         self.conn = None
+        self.queue = queue.Queue(maxsize=LOG_QUEUE_SIZE)
+        self.dropped = 0
+        self.shipped = 0
+        self._closed = False
 
         # DB/시트 연결 시도
         self._connect_sqlite()
-        if os.path.exists(key_path):
-            self._connect_gsheet()
-        else:
-            print(f"⚠️ 경고: {key_path} 파일을 찾을 수 없어 구글 시트 연동을 건너뜁니다.")
+        if self.worksheet is None:
+            if os.path.exists(key_path):
+                self._connect_gsheet()
+            else:
+                print(f"⚠️ 경고: {key_path} 파일을 찾을 수 없어 구글 시트 연동을 건너뜁니다.")
+
+        self.thread = threading.Thread(target=self._run, name="log-shipper", daemon=True)
+        self.thread.start()
+        atexit.register(self.close)
 
     def _connect_gsheet(self):
         try:
@@ -29,8 +79,11 @@ class RealTimeLogger:
 
     def _connect_sqlite(self):
         # 상위 폴더가 없으면 생성
-        os.makedirs(os.path.dirname('monitor/service.db'), exist_ok=True)
-        self.conn = sqlite3.connect('monitor/service.db', check_same_thread=False)
+        folder = os.path.dirname(self.db_path)
+        if folder:
+            os.makedirs(folder, exist_ok=True)
+        # 연결은 전송 스레드만 사용 (초기화 이후 다른 스레드에서 건드리지 않음)
+        self.conn = sqlite3.connect(self.db_path, check_same_thread=False)
         cursor = self.conn.cursor()
         cursor.execute('''
             CREATE TABLE IF NOT EXISTS user_logs (
@@ -41,6 +94,16 @@ class RealTimeLogger:
                 details TEXT
             )
         ''')
+        # 시트 전송에 실패한 로그 임시 보관함
+        cursor.execute('''
+            CREATE TABLE IF NOT EXISTS log_spill (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                timestamp TEXT,
+                user_id TEXT,
+                action TEXT,
+                details TEXT
+            )
+        ''')
         self.conn.commit()
 
     def log(self, user_id, action, details):
@@ -48,15 +111,126 @@ class RealTimeLogger:
         print(f"[{now}] {user_id} : {action}")
 
         try:
-            cursor = self.conn.cursor()
-            cursor.execute('INSERT INTO user_logs (timestamp, user_id, action, details) VALUES (?, ?, ?, ?)', 
-                           (now, user_id, action, details))
+            self.queue.put_nowait((now, user_id, action, details))
+        except queue.Full:
+            self.dropped += 1
+
+    def flush(self, timeout=30):
+        """지금까지 넣은 로그를 저장/전송 시도까지 마치고 반환"""
+        done = threading.Event()
+        self.queue.put(done)
+        return done.wait(timeout)
+
+    def close(self):
+        if self._closed:
+            return
+        self._closed = True
+        self.queue.put(None)
+        self.thread.join(timeout=30)
+
+    def spill_count(self):
+        # 전송 스레드의 연결과 섞이지 않도록 별도 연결로 조회
+        conn = sqlite3.connect(self.db_path)
+        try:
+            return conn.execute("SELECT COUNT(*) FROM log_spill").fetchone()[0]
+        finally:
+            conn.close()
+
+    # ------------------------------------------------------------------
+    # 백그라운드 전송
+    # ------------------------------------------------------------------
+    def _run(self):
+        while True:
+            batch, markers, stop = [], [], False
+            deadline = time.monotonic() + self.flush_interval
+            while len(batch) < self.batch_size:
+                try:
+                    item = self.queue.get(timeout=max(0, deadline - time.monotonic()))
+                except queue.Empty:
+                    break
+                if item is None:
+                    stop = True
+                    break
+                if isinstance(item, threading.Event):
+                    markers.append(item)
+                    break
+                batch.append(item)
+
+            saved = False
+            if batch:
+                try:
+                    self._save_local(batch)
+                    saved = True
+                except Exception as e:
+                    print(f"DB Error: {e}")
+            try:
+                delivered = self._ship(batch)
+            except Exception as e:
+                print(f"⚠️ 로그 전송 중 에러: {e}")
+                delivered = False
+            # 시트로 보내지도(보관하지도) 못했는데 로컬에도 없으면 log_spill 에 남김
+            if batch and not delivered and (self.worksheet or not saved):
+                self._spill_safely(batch)
+            for marker in markers:
+                marker.set()
+            if stop:
+                self.conn.close()
+                return
+
+    def _save_local(self, rows):
+        self.conn.executemany(
+            'INSERT INTO user_logs (timestamp, user_id, action, details) VALUES (?, ?, ?, ?)', rows
+        )
+        self.conn.commit()
+
+    def _ship(self, rows):
+        """시트로 전송 (실패하면 log_spill 에 보관) → 처리했으면 True, 시트가 없으면 False"""
+        if not self.worksheet:
+            return False
+
+        # 이전에 실패해서 보관 중인 로그부터 순서대로 재전송
+        while True:
+            spilled = self.conn.execute(
+                "SELECT id, timestamp, user_id, action, details FROM log_spill ORDER BY id LIMIT ?",
+                (self.batch_size,)
+            ).fetchall()
+            if not spilled:
+                break
+            if not self._send([list(r[1:]) for r in spilled]):
+                self._spill(rows)
+                return True
+            self.conn.execute("DELETE FROM log_spill WHERE id <= ?", (spilled[-1][0],))
             self.conn.commit()
-        except Exception as e:
-            print(f"DB Error: {e}")
 
-        if self.worksheet:
+        if rows and not self._send([list(r) for r in rows]):
+            self._spill(rows)
+        return True
+
+    def _send(self, rows):
+        for attempt in range(LOG_MAX_RETRIES):
             try:
-                self.worksheet.append_row([now, user_id, action, details])
-            except:
-                pass
\ No newline at end of file
+                self.worksheet.append_rows(rows)
+                self.shipped += len(rows)
+                return True
+            except Exception as e:
+                if attempt == LOG_MAX_RETRIES - 1:
+                    print(f"⚠️ 시트 전송 실패 ({len(rows)}건 보관): {e}")
+                    return False
+                time.sleep(LOG_RETRY_BASE * (2 ** attempt) * (0.5 + random.random()))
+        return False
+
+    def _spill(self, rows):
+        if not rows:
+            return
+        self.conn.executemany(
+            'INSERT INTO log_spill (timestamp, user_id, action, details) VALUES (?, ?, ?, ?)', rows
+        )
+        self.conn.commit()
+
+    def _spill_safely(self, rows):
+        try:
+            self.conn.rollback()
+            self._spill(rows)
+        except Exception as e:
+            self.dropped += len(rows)
+            print(f"❌ 로그 {len(rows)}건 보관 실패 (유실): {e}")
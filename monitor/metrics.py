@@ -0,0 +1,113 @@
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+# 요청 1건 안에서 측정된 구간 목록 (Server-Timing 헤더용)
+_request_timings = ContextVar("request_timings", default=None)
+
+# 히스토그램 1개당 보관하는 최근 샘플 수 (백분위수 계산용)
+SAMPLE_SIZE = 2048
+
+
+class Histogram:
+    """최근 샘플 기준 p50/p95/p99 + 누적 개수/합계"""
+
+    def __init__(self, size=SAMPLE_SIZE):
+        self.samples = deque(maxlen=size)
+        self.count = 0
+        self.total = 0.0
+
+    def observe(self, value):
+        self.samples.append(value)
+        self.count += 1
+        self.total += value
+
+    def percentile(self, pct):
+        if not self.samples:
+            return 0.0
+        ordered = sorted(self.samples)
+        idx = min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))
+        return ordered[idx]
+
+    def summary(self):
+        return {
+            "count": self.count,
+            "sum": round(self.total, 3),
+            "p50": round(self.percentile(50), 3),
+            "p95": round(self.percentile(95), 3),
+            "p99": round(self.percentile(99), 3),
+        }
+
+
+class Metrics:
+    """프로세스 단위 지표 모음 (구간별 지연시간 히스토그램 + 카운터)"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.histograms = {}
+        self.counters = {}
+
+    def observe(self, name, ms):
+        with self._lock:
+            self.histograms.setdefault(name, Histogram()).observe(ms)
+        timings = _request_timings.get()
+        if timings is not None:
+            timings.append((name, ms))
+
+    def inc(self, name, amount=1):
+        with self._lock:
+            self.counters[name] = self.counters.get(name, 0) + amount
+
+    @contextmanager
+    def span(self, name):
+        """with metrics.span("retrieval"): ... 형태로 구간 시간(ms) 기록 (async 안에서도 사용 가능)"""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(name, (time.perf_counter() - start) * 1000)
+
+    def snapshot(self):
+        with self._lock:
+            return {
+                "latency_ms": {name: h.summary() for name, h in self.histograms.items()},
+                "counters": dict(self.counters),
+            }
+
+    def render_prometheus(self, gauges=None):
+        """Prometheus 텍스트 포맷 (gauges: {"그룹": {"이름": 숫자}} 형태의 추가 지표)"""
+        snap = self.snapshot()
+        lines = ["# TYPE stage_latency_ms summary"]
+        for name, s in sorted(snap["latency_ms"].items()):
+            for q in ("p50", "p95", "p99"):
+                lines.append(f'stage_latency_ms{{stage="{name}",quantile="0.{q[1:]}"}} {s[q]}')
+            lines.append(f'stage_latency_ms_count{{stage="{name}"}} {s["count"]}')
+            lines.append(f'stage_latency_ms_sum{{stage="{name}"}} {s["sum"]}')
+        lines.append("# TYPE app_events_total counter")
+        for name, value in sorted(snap["counters"].items()):
+            lines.append(f'app_events_total{{name="{name}"}} {value}')
+        for group, values in sorted((gauges or {}).items()):
+            for name, value in sorted(values.items()):
+                if isinstance(value, (int, float)):
+                    lines.append(f'{group}{{name="{name}"}} {value}')
+        return "\n".join(lines) + "\n"
+
+
+def start_request_timing():
+    """요청 시작 시 호출 - 이후 span 들이 이 요청의 타이밍 목록에 쌓임"""
+    timings = []
+    return timings, _request_timings.set(timings)
+
+
+def end_request_timing(token):
+    _request_timings.reset(token)
+
+
+def server_timing_header(timings):
+    return ", ".join(f"{name};dur={ms:.1f}" for name, ms in timings)
+
+
+# 앱 전체에서 같이 쓰는 인스턴스
+metrics = Metrics()
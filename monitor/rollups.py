@@ -0,0 +1,334 @@
+import os
+import re
+import sqlite3
+import threading
+import time
+from collections import Counter
+from datetime import datetime, timedelta
+
+from user_db import DB_NAME as HISTORY_DB
+
+# 관리자 통계용 집계 테이블 설정 (환경변수로 조정 가능)
+ROLLUP_DB = os.getenv("ROLLUP_DB", "monitor/analytics.db")
+SERVICE_LOG_DB = os.getenv("SERVICE_LOG_DB", "monitor/service.db")
+ROLLUP_BATCH = int(os.getenv("ROLLUP_BATCH", "5000"))                      # 한 트랜잭션에 반영할 원본 행 수
+ROLLUP_INTERVAL = float(os.getenv("ROLLUP_INTERVAL", "30"))                # 백그라운드 갱신 주기 (초)
+ROLLUP_MINUTE_RETENTION_HOURS = int(os.getenv("ROLLUP_MINUTE_RETENTION_HOURS", "48"))
+ROLLUP_HOUR_RETENTION_DAYS = int(os.getenv("ROLLUP_HOUR_RETENTION_DAYS", "90"))
+
+# 분포는 고정 구간(상한값) 히스토그램으로 저장 → 백분위수는 구간 안에서 선형 보간
+INPUT_LENGTH_EDGES = (100, 300, 500, 1000, 2000, 4000, float("inf"))                        # 글자 수
+LATENCY_EDGES = (100, 250, 500, 750, 1000, 1500, 2000, 3000, 4000, 6000, 8000, 12000, 16000, 24000, 32000, 64000, float("inf"))  # ms
+
+# 답변이 이 문구로 시작하면 실패한 요청 (CoachingError 메시지 / API 키 없음 안내가 그대로 저장됨)
+# 정상 답변 본문에 "에러" 같은 단어가 있어도 실패로 세지 않도록 앞부분만 비교
+HISTORY_ERROR_PREFIXES = ("분석 중 에러:", "코칭 중 에러:", "API 키가 없습니다")
+# user_logs 의 details 에 "latency_ms=1234" 가 있으면 지연시간으로 집계
+_LATENCY = re.compile(r"latency_ms=(\d+(?:\.\d+)?)")
+
+TS_FORMAT = "%Y-%m-%d %H:%M:%S"
+
+
+def _bucket_of(edges, value):
+    for le in edges:
+        if value <= le:
+            return le
+    return edges[-1]
+
+
+def _history_event(row):
+    """history 1행 → (시각, 동작, 실패 여부, 입력 길이, 지연시간)"""
+    _, timestamp, user_input, ai_response = row
+    failed = (ai_response or "").startswith(HISTORY_ERROR_PREFIXES)
+    return timestamp, "coaching", failed, len(user_input or ""), None
+
+
+def _log_event(row):
+    """user_logs 1행 → (시각, 동작, 실패 여부, 입력 길이, 지연시간)"""
+    _, timestamp, _, action, details = row
+    match = _LATENCY.search(details or "")
+    latency = float(match.group(1)) if match else None
+    return timestamp, action, "ERR" in (action or "").upper(), None, latency
+
+
+# 원본 이름 → (DB 경로 설정값 이름, 조회 SQL, 행 변환 함수)
+SOURCES = {
+    "history": (
+        "history_db",
+        "SELECT id, timestamp, user_input, ai_response FROM history WHERE id > ? ORDER BY id LIMIT ?",
+        _history_event,
+    ),
+    "user_logs": (
+        "service_log_db",
+        "SELECT id, timestamp, user_id, action, details FROM user_logs WHERE id > ? ORDER BY id LIMIT ?",
+        _log_event,
+    ),
+}
+
+
+def histogram_percentile(buckets, pct):
+    """[(상한값, 개수), ...] (상한값 오름차순) 에서 pct 백분위수 추정"""
+    total = sum(count for _, count in buckets)
+    if not total:
+        return 0.0
+    target = pct / 100 * total
+    cum, lower = 0, 0.0
+    for le, count in buckets:
+        if count and cum + count >= target:
+            if le == float("inf"):
+                return lower
+            return lower + (le - lower) * (target - cum) / count
+        cum += count
+        if le != float("inf"):
+            lower = le
+    return lower
+
+
+class RollupStore:
+    """
+    채팅 기록(history) / 사용자 로그(user_logs) 를 분·시간 단위로 미리 집계해 두는 저장소
+    - refresh(): 원본별로 저장된 마지막 id(high-water mark) 이후 행만 읽어서 집계 테이블에 더함
+      (집계 반영과 마지막 id 갱신이 한 트랜잭션 → 중간에 죽어도 중복/누락 없음)
+    - dashboard(): 집계 테이블만 읽음 → 기록이 아무리 많아도 조회 비용은 조회 기간에만 비례
+    - 여러 프로세스가 동시에 refresh 해도 BEGIN IMMEDIATE 로 한 번에 하나씩만 반영
+    """
+
+    def __init__(self, db_path=ROLLUP_DB, history_db=HISTORY_DB, service_log_db=SERVICE_LOG_DB):
+        self.db_path = db_path
+        self.history_db = history_db
+        self.service_log_db = service_log_db
+        self._lock = threading.Lock()
+
+        folder = os.path.dirname(db_path)
+        if folder:
+            os.makedirs(folder, exist_ok=True)
+        self.conn = sqlite3.connect(db_path, timeout=30, check_same_thread=False, isolation_level=None)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        self.conn.executescript('''
+            CREATE TABLE IF NOT EXISTS rollup_state (
+                source TEXT PRIMARY KEY,
+                last_id INTEGER,
+                updated_at REAL
+            );
+            CREATE TABLE IF NOT EXISTS rollup_counts (
+                granularity TEXT,
+                bucket TEXT,
+                source TEXT,
+                action TEXT,
+                requests INTEGER DEFAULT 0,
+                errors INTEGER DEFAULT 0,
+                PRIMARY KEY (granularity, bucket, source, action)
+            );
+            CREATE TABLE IF NOT EXISTS rollup_hist (
+                bucket TEXT,
+                metric TEXT,
+                action TEXT,
+                le REAL,
+                count INTEGER DEFAULT 0,
+                PRIMARY KEY (bucket, metric, action, le)
+            );
+        ''')
+
+    # ------------------------------------------------------------------
+    # 갱신 (증분)
+    # ------------------------------------------------------------------
+    def refresh(self, batch_size=ROLLUP_BATCH):
+        """모든 원본의 새 행을 집계에 반영 → {원본: 반영한 행 수}"""
+        with self._lock:
+            processed = {name: self._refresh_source(name, batch_size) for name in SOURCES}
+            self._prune()
+        return processed
+
+    def _open_source(self, name):
+        path = getattr(self, SOURCES[name][0])
+        if not os.path.exists(path):
+            return None
+        # 원본은 읽기 전용으로 열어서 기록 저장 쪽과 잠금이 섞이지 않게 함
+        return sqlite3.connect(f"file:{path}?mode=ro", uri=True, timeout=30)
+
+    def _refresh_source(self, name, batch_size):
+        _, sql, to_event = SOURCES[name]
+        source = self._open_source(name)
+        if source is None:
+            return 0
+        total = 0
+        try:
+            while True:
+                self.conn.execute("BEGIN IMMEDIATE")
+                try:
+                    row = self.conn.execute("SELECT last_id FROM rollup_state WHERE source = ?", (name,)).fetchone()
+                    last_id = row[0] if row else 0
+                    try:
+                        rows = source.execute(sql, (last_id, batch_size)).fetchall()
+                    except sqlite3.OperationalError:
+                        rows = []   # 원본 테이블이 아직 없음
+                    if rows:
+                        self._apply(name, [to_event(r) for r in rows])
+                        self.conn.execute(
+                            "INSERT INTO rollup_state (source, last_id, updated_at) VALUES (?, ?, ?) "
+                            "ON CONFLICT(source) DO UPDATE SET last_id = excluded.last_id, updated_at = excluded.updated_at",
+                            (name, rows[-1][0], time.time()),
+                        )
+                    self.conn.execute("COMMIT")
+                except Exception:
+                    self.conn.execute("ROLLBACK")
+                    raise
+                total += len(rows)
+                if len(rows) < batch_size:
+                    return total
+        finally:
+            source.close()
+
+    def _apply(self, name, events):
+        counts = Counter()
+        errors = Counter()
+        hist = Counter()
+        for timestamp, action, failed, length, latency in events:
+            if not timestamp:
+                continue
+            minute, hour = timestamp[:16], timestamp[:13] + ":00"
+            for key in (("minute", minute), ("hour", hour)):
+                counts[key + (action,)] += 1
+                errors[key + (action,)] += int(failed)
+            if length is not None:
+                hist[(hour, "input_length", action, _bucket_of(INPUT_LENGTH_EDGES, length))] += 1
+            if latency is not None:
+                hist[(hour, "latency_ms", action, _bucket_of(LATENCY_EDGES, latency))] += 1
+
+        self.conn.executemany(
+            "INSERT INTO rollup_counts (granularity, bucket, source, action, requests, errors) VALUES (?, ?, ?, ?, ?, ?) "
+            "ON CONFLICT(granularity, bucket, source, action) DO UPDATE SET "
+            "requests = requests + excluded.requests, errors = errors + excluded.errors",
+            [(g, b, name, a, n, errors[(g, b, a)]) for (g, b, a), n in counts.items()],
+        )
+        self.conn.executemany(
+            "INSERT INTO rollup_hist (bucket, metric, action, le, count) VALUES (?, ?, ?, ?, ?) "
+            "ON CONFLICT(bucket, metric, action, le) DO UPDATE SET count = count + excluded.count",
+            [key + (n,) for key, n in hist.items()],
+        )
+
+    def _prune(self):
+        """오래된 분 단위 / 시간 단위 집계 삭제 (집계 테이블 크기도 일정하게 유지)"""
+        now = datetime.now()
+        minute_cutoff = (now - timedelta(hours=ROLLUP_MINUTE_RETENTION_HOURS)).strftime("%Y-%m-%d %H:%M")
+        hour_cutoff = (now - timedelta(days=ROLLUP_HOUR_RETENTION_DAYS)).strftime("%Y-%m-%d %H:00")
+        self.conn.execute("DELETE FROM rollup_counts WHERE granularity = 'minute' AND bucket < ?", (minute_cutoff,))
+        self.conn.execute("DELETE FROM rollup_counts WHERE granularity = 'hour' AND bucket < ?", (hour_cutoff,))
+        self.conn.execute("DELETE FROM rollup_hist WHERE bucket < ?", (hour_cutoff,))
+
+    # ------------------------------------------------------------------
+    # 조회 (집계 테이블만 읽음)
+    # ------------------------------------------------------------------
+    def dashboard(self, minutes=60, hours=48):
+        """
+        최근 minutes 분의 분당 요청 수, 최근 hours 시간의 시간당 요청 수 / 입력 길이 분포 /
+        동작별 오류 수 / 동작별 지연시간 p50·p95·p99
+        (요청 수·입력 길이는 채팅 기록 기준, 오류·지연시간은 채팅 기록 + 사용자 로그)
+        """
+        now = datetime.now()
+        minute_start = (now - timedelta(minutes=minutes - 1)).strftime("%Y-%m-%d %H:%M")
+        hour_start = (now - timedelta(hours=hours - 1)).strftime("%Y-%m-%d %H:00")
+
+        with self._lock:
+            per_minute = self.conn.execute(
+                "SELECT bucket, requests, errors FROM rollup_counts "
+                "WHERE granularity = 'minute' AND source = 'history' AND bucket >= ? ORDER BY bucket",
+                (minute_start,),
+            ).fetchall()
+            per_hour = self.conn.execute(
+                "SELECT bucket, requests, errors FROM rollup_counts "
+                "WHERE granularity = 'hour' AND source = 'history' AND bucket >= ? ORDER BY bucket",
+                (hour_start,),
+            ).fetchall()
+            by_action = self.conn.execute(
+                "SELECT source, action, SUM(requests), SUM(errors) FROM rollup_counts "
+                "WHERE granularity = 'hour' AND bucket >= ? GROUP BY source, action ORDER BY source, action",
+                (hour_start,),
+            ).fetchall()
+            hist = self.conn.execute(
+                "SELECT metric, action, le, SUM(count) FROM rollup_hist "
+                "WHERE bucket >= ? GROUP BY metric, action, le ORDER BY metric, action, le",
+                (hour_start,),
+            ).fetchall()
+            state = self.conn.execute("SELECT source, last_id, updated_at FROM rollup_state").fetchall()
+
+        input_length = Counter()
+        latency = {}
+        for metric, action, le, count in hist:
+            if metric == "input_length":
+                input_length[le] += count
+            else:
+                latency.setdefault(action, []).append((le, count))
+
+        def upper(le):
+            return None if le == float("inf") else le
+
+        return {
+            "per_minute": [{"bucket": b, "requests": r, "errors": e} for b, r, e in per_minute],
+            "per_hour": [{"bucket": b, "requests": r, "errors": e} for b, r, e in per_hour],
+            "actions": [
+                {"source": s, "action": a, "requests": r, "errors": e} for s, a, r, e in by_action
+            ],
+            "input_length": [{"le": upper(le), "count": input_length[le]} for le in INPUT_LENGTH_EDGES],
+            "latency_ms": {
+                action: {
+                    "count": sum(c for _, c in buckets),
+                    "p50": round(histogram_percentile(buckets, 50), 1),
+                    "p95": round(histogram_percentile(buckets, 95), 1),
+                    "p99": round(histogram_percentile(buckets, 99), 1),
+                }
+                for action, buckets in latency.items()
+            },
+            "high_water": {
+                s: {"last_id": last_id, "updated_at": datetime.fromtimestamp(t).strftime(TS_FORMAT)}
+                for s, last_id, t in state
+            },
+        }
+
+    def close(self):
+        self.conn.close()
+
+
+_store = None
+_store_pid = None
+_store_lock = threading.Lock()
+
+def get_rollup_store():
+    """프로세스당 하나의 집계 저장소 (fork 된 워커에서는 새로 만듦)"""
+    global _store, _store_pid
+    with _store_lock:
+        if _store is None or _store_pid != os.getpid():
+            _store = RollupStore()
+            _store_pid = os.getpid()
+        return _store
+
+
+_refresher = None
+_refresher_lock = threading.Lock()
+
+def start_background_refresh(interval=ROLLUP_INTERVAL):
+    """
+    동기 앱(Streamlit)용 - 데몬 스레드가 interval 초마다 refresh (화면을 그릴 때마다 집계하지 않음)
+    여러 번 불러도 프로세스당 스레드 하나만 띄움 (FastAPI 는 startup 의 비동기 루프가 같은 일을 함)
+    """
+    global _refresher
+
+    def refresh_loop():
+        while True:
+            try:
+                get_rollup_store().refresh()
+            except Exception as e:
+                print(f"⚠️ 통계 집계 실패: {e}")
+            time.sleep(interval)
+
+    with _refresher_lock:
+        if _refresher is None or not _refresher.is_alive():
+            _refresher = threading.Thread(target=refresh_loop, name="rollup-refresher", daemon=True)
+            _refresher.start()
+
+
+if __name__ == "__main__":
+    # cron 등에서 따로 돌릴 때: python -m monitor.rollups
+    start = time.perf_counter()
+    print(f"✅ 집계 반영: {get_rollup_store().refresh()} ({(time.perf_counter() - start) * 1000:.0f}ms)")
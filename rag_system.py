@@ -1,92 +1,248 @@
 import os
-import google.generativeai as genai
-import chromadb
-from chromadb.utils import embedding_functions
 from dotenv import load_dotenv
-import datetime
 import json # JSON 파싱을 위해 추가
+import asyncio
+import time
+from concurrent.futures import ThreadPoolExecutor
+from coaching_cache import CoachingCache, normalize_text
+from resume_cache import get_resume_cache, sha256_hex
+from embedding_cache import CachedEmbeddingFunction
+from ingest import content_id, batched
+from retrievers import ChromaRetriever, NumpyRetriever, SnapshotRetriever, RETRIEVER_BACKEND
+from monitor.metrics import metrics
+from resume_parser import split_resume, merge_parsed_chunks
+from llm_client import LLMClient, create_backend, INTERACTIVE, BATCH
+from context_packer import pack_tips, fit_section, fit_text, pack_history, budget
+from session_store import SessionStore
 
 load_dotenv()
 
-if os.getenv("GOOGLE_API_KEY"):
-    genai.configure(api_key=os.getenv("GOOGLE_API_KEY"))
+# 동시에 날아가는 LLM 호출 개수 상한 (워커 1개 기준)
+LLM_MAX_CONCURRENCY = int(os.getenv("LLM_MAX_CONCURRENCY", "8"))
+
+# 코칭 프롬프트를 고치면 버전을 올려서 이전 캐시가 쓰이지 않도록 함
+COACHING_PROMPT_VERSION = "coach-v2"
+FAST_COACHING_PROMPT_VERSION = "coach-fast-v2"
+
+# 코칭 모드: full = 1차 분석 + 2차 코칭 (LLM 2회), fast = 구조화 JSON 1회 호출
+FAST_GENERATION_CONFIG = {"response_mime_type": "application/json"}
+
+# 데이터 적재 시 한 번에 임베딩할 문서 개수
+LOAD_BATCH_SIZE = int(os.getenv("LOAD_BATCH_SIZE", "64"))
+
+# 일괄 코칭 시 배치 1건 안에서 동시에 진행할 항목 수 기본값
+BATCH_COACHING_CONCURRENCY = int(os.getenv("BATCH_COACHING_CONCURRENCY", "4"))
+
+
+# 이력서 파싱: JSON 응답 모드 + 조각별 재시도 횟수
+PARSE_GENERATION_CONFIG = {"response_mime_type": "application/json"}
+PARSE_CHUNK_RETRIES = 1
+# 파싱 프롬프트를 고치면 버전을 올려서 이전 캐시가 쓰이지 않도록 함
+PARSE_PROMPT_VERSION = "parse-v2"
+
+
+class CoachingError(Exception):
+    """LLM 단계 실패 - 메시지는 사용자에게 보여줄 에러 문구"""
+
+
+class ResumeParseError(Exception):
+    """이력서 조각 파싱 실패 (raw_response: 마지막 LLM 응답 원문)"""
+
+    def __init__(self, message, raw_response=""):
+        super().__init__(message)
+        self.raw_response = raw_response
 
 class CareerAI:
-    def __init__(self):
-        if not os.getenv("GOOGLE_API_KEY"):
+    def __init__(self, max_concurrency=LLM_MAX_CONCURRENCY, retriever_backend=RETRIEVER_BACKEND):
+        self.max_concurrency = max_concurrency
+        self.cache = CoachingCache()
+        self.resume_cache = get_resume_cache()
+
+        # 모든 LLM 호출은 공용 클라이언트를 거침 (할당량 제한, 재시도, 우선순위, 중복 호출 합치기)
+        # LLM_BACKEND=fake 면 API 키 없이 가짜 백엔드 사용
+        backend = create_backend()
+        self.llm = LLMClient(backend, max_concurrency) if backend is not None else None
+        if self.llm is None:
             return
-        
-        self.model = genai.GenerativeModel('gemini-flash-latest')
-        self.chroma_client = chromadb.PersistentClient(path="./chroma_db")
-        
-        self.collection = self.chroma_client.get_or_create_collection(
-            name="career_collection", 
-            embedding_function=embedding_functions.DefaultEmbeddingFunction()
-        )
 
-    def load_data(self, data_list):
-        if not os.getenv("GOOGLE_API_KEY"): return
-        if self.collection.count() > 0: return 
-        
-        ids = [str(i) for i in range(len(data_list))]
-        documents = [item['content'] for item in data_list]
-        metadatas = [{"source": item['source'], "category": item['category']} for item in data_list]
+        # 멀티턴 코칭 세션 (누적 요약 + 최근 턴, SQLite 저장 / 유휴 세션 자동 삭제)
+        self.sessions = SessionStore()
+        self._session_tasks = set()
+
+        # 임베딩 결과를 내용 해시로 캐싱 + 동시 요청 배치 처리 (stats() 로 지연시간 확인)
+        self.embedding_fn = CachedEmbeddingFunction()
+
+        # 검색 백엔드: numpy (작은 코퍼스, 인-프로세스) / snapshot (멀티 워커 공유) / chroma (기본, 대용량)
+        if retriever_backend == "numpy":
+            self.retriever = NumpyRetriever(self.embedding_fn)
+        elif retriever_backend == "snapshot":
+            # 여러 워커/프로세스가 같은 스냅샷을 공유 (쓰기는 파일 잠금으로 한 번에 하나씩 새 버전 게시)
+            self.retriever = SnapshotRetriever(self.embedding_fn)
+        else:
+            import chromadb  # numpy 백엔드만 쓸 때는 불러오지 않음
+            self.chroma_client = chromadb.PersistentClient(path="./chroma_db")
+            self.collection = self.chroma_client.get_or_create_collection(
+                name="career_collection", 
+                embedding_function=self.embedding_fn
+            )
+            self.retriever = ChromaRetriever(self.collection)
+
+    @staticmethod
+    def tip_id(category, source, content):
+        return content_id(category, source, content)
+
+    def load_data(self, data_list, batch_size=LOAD_BATCH_SIZE, origin="seed", prune=True):
+        """
+        지식 데이터 증분 적재 (몇 번을 돌려도 결과가 같음)
+        - ID 는 내용 해시라서, 새로 생긴/바뀐 문서만 임베딩해서 추가
+        - prune=True 면 같은 origin 으로 들어왔던 문서 중 목록에서 빠진 것은 삭제
+          (관리자가 add_new_tip 으로 넣은 문서, 다른 origin 으로 들어온 문서는 건드리지 않음)
+        - 원본마다 origin 을 따로 줘야 함 (초기 데이터: "seed", JSONL: ingest.jsonl_origin(path))
+        - data_list 는 리스트뿐 아니라 iter_jsonl() 같은 제너레이터도 가능
+        """
+        if self.llm is None: return None
 
-        self.collection.add(documents=documents, metadatas=metadatas, ids=ids)
-        print("✅ 초기 데이터 로드 완료")
+        seen = set()
+        added = unchanged = 0
+        for chunk in batched(data_list, batch_size):
+            rows = {}
+            for item in chunk:
+                doc_id = self.tip_id(item['category'], item['source'], item['content'])
+                seen.add(doc_id)
+                rows[doc_id] = item
+
+            existing = self.retriever.existing_ids(list(rows))
+            new_ids = [doc_id for doc_id in rows if doc_id not in existing]
+            unchanged += len(rows) - len(new_ids)
+            if new_ids:
+                self.retriever.add(
+                    ids=new_ids,
+                    documents=[rows[i]['content'] for i in new_ids],
+                    metadatas=[{"source": rows[i]['source'], "category": rows[i]['category'], "origin": origin} for i in new_ids],
+                )
+                added += len(new_ids)
+
+        deleted = 0
+        if prune:
+            stale = [
+                doc_id for doc_id, meta in self.retriever.iter_ids()
+                if doc_id not in seen and self._is_prunable(doc_id, meta, origin)
+            ]
+            for chunk in batched(stale, batch_size):
+                self.retriever.delete(chunk)
+            self.cache.invalidate_docs(stale)
+            deleted = len(stale)
+
+        result = {"added": added, "unchanged": unchanged, "deleted": deleted}
+        print(f"✅ 데이터 동기화 완료: {result}")
+        return result
+
+    @staticmethod
+    def _is_prunable(doc_id, meta, origin):
+        if (meta or {}).get("origin"):
+            return meta["origin"] == origin
+        # 예전 버전에서 리스트 인덱스("0", "1", ...)로 넣은 초기 데이터
+        # (14자리 타임스탬프 ID 는 예전 관리자 추가분이라 남겨둠)
+        return doc_id.isdigit() and len(doc_id) < 14
 
     def add_new_tip(self, category, source, content):
-        if not os.getenv("GOOGLE_API_KEY"): return False
-        new_id = datetime.datetime.now().strftime("%Y%m%d%H%M%S")
+        if self.llm is None: return False
+        # 내용 해시 ID: 동시에 같은 내용을 넣어도 충돌 없이 한 건으로 합쳐짐
+        new_id = self.tip_id(category, source, content)
         try:
-            self.collection.add(
+            self.retriever.upsert(
                 documents=[content],
-                metadatas=[{"category": category, "source": source}],
+                metadatas=[{"category": category, "source": source, "origin": "admin"}],
                 ids=[new_id]
             )
+            # 검색 결과가 바뀌면 캐시 키도 바뀌므로, 이 문서를 참조하던 항목만 지우면 됨
+            self.cache.invalidate_docs([new_id])
             return True
         except Exception as e:
             print(f"학습 실패: {e}")
             return False
 
-    def get_coaching(self, user_text):
-        """자소서 내용을 분석하고 첨삭해주는 함수"""
-        if not os.getenv("GOOGLE_API_KEY"):
-            return "API 키가 없습니다.", [], None
+    def search_tips(self, user_text, n_results=3):
+        """참고 가이드 검색만 실행 (LLM 호출 없음) → (프롬프트용 텍스트, 출처 목록)"""
+        found_tips, sources, _ = self._search_tips(user_text, n_results)
+        return found_tips, sources
 
-        # RAG 검색
-        results = self.collection.query(query_texts=[user_text], n_results=3)
-        
-        found_tips = ""
-        sources = []
-        if results['documents'] and results['documents'][0]:
-            for i, doc in enumerate(results['documents'][0]):
-                meta = results['metadatas'][0][i]
-                source_info = f"{meta['category']} - {meta['source']}"
-                found_tips += f"- {source_info}: {doc}\n"
-                sources.append(source_info)
+    def _search_tips(self, user_text, n_results=3):
+        """RAG 검색 결과를 프롬프트용 텍스트, 출처 목록, 문서 ID 목록으로 정리"""
+        return self._search_tips_many([user_text], n_results)[0]
+
+    def _search_tips_many(self, user_texts, n_results=3):
+        """여러 글을 query 한 번으로 검색 (임베딩/인덱스 조회를 묶어서 처리)"""
+        results = self._query(user_texts, n_results)
 
+        contexts = []
+        for q in range(len(user_texts)):
+            entries = []
+            if results['documents'] and results['documents'][q]:
+                for i, doc in enumerate(results['documents'][q]):
+                    meta = results['metadatas'][q][i]
+                    entries.append((f"{meta['category']} - {meta['source']}", doc, results['ids'][q][i]))
+            # 거의 같은 팁은 빼고, 토큰 예산 안에 들어가는 만큼만 프롬프트에 넣음
+            found_tips, kept = pack_tips(entries)
+            sources = [source_info for source_info, _, _ in kept]
+            doc_ids = [doc_id for _, _, doc_id in entries]  # 캐시 무효화는 검색된 문서 전체 기준
+            contexts.append((found_tips, sources, doc_ids))
+        return contexts
+
+    def warm_up(self):
+        """
+        첫 요청이 느리지 않도록 임베딩 모델과 검색 인덱스를 미리 메모리에 올림
+        반환: {"embedding_ms", "index_ms"}
+        """
+        if not hasattr(self, "retriever"):
+            return {}
+        embedding_ms = self.embedding_fn.warm_up()
+        start = time.perf_counter()
+        if self.retriever.count():
+            self.retriever.query(["warm-up"], 1)
+        return {"embedding_ms": round(embedding_ms, 1), "index_ms": round((time.perf_counter() - start) * 1000, 1)}
+
+    def _query(self, user_texts, n_results):
+        with metrics.span("retrieval"):
+            return self.retriever.query(user_texts, n_results)
+
+    def _cache_key(self, user_text, doc_ids, mode="full", history=""):
+        version = FAST_COACHING_PROMPT_VERSION if mode == "fast" else COACHING_PROMPT_VERSION
+        # 같은 글이라도 대화 맥락이 다르면 답이 달라지므로 맥락도 키에 포함
+        if history:
+            user_text = f"{history}\n\x00{user_text}"
+        return CoachingCache.make_key(user_text, doc_ids, version)
+
+    @staticmethod
+    def _history_block(history):
+        if not history:
+            return ""
+        return f"""
+        [이전 대화] (후속 질문이면 이 맥락을 이어서 답하고, 이미 한 지적은 반복하지 마세요)
+        {history}
+        """
+
+    def _build_draft_prompt(self, found_tips, user_text, history=""):
         # 1차 분석 (문제점 발굴)
-        draft_prompt = f"""
+        user_text = fit_section("draft", "user_text", user_text)
+        return f"""
         당신은 꼼꼼한 '이력서 교정 에디터'입니다.
         [참고 가이드]를 기준으로 [사용자 글]을 분석하여, 수정이 시급한 문장 3~5개를 찾아내세요.
         전체적인 내용을 요약하지 말고, 구체적인 '문장 단위'의 문제점을 지적해야 합니다.
 
         [참고 가이드]
         {found_tips}
-
+        {self._history_block(history)}
         [사용자 글]
         {user_text}
         """
-        
-        try:
-            draft_response = self.model.generate_content(draft_prompt)
-            draft_text = draft_response.text
-        except Exception as e:
-            return f"분석 중 에러: {str(e)}", [], None
 
+    def _build_refine_prompt(self, draft_text, user_text, history=""):
         # 2차 코칭 (쪽집게 과외 스타일)
-        refine_prompt = f"""
+        # 분석 내용은 앞쪽(우선순위 높은 지적)부터 남기고, 원문은 앞/뒤를 남겨서 예산 안으로
+        draft_text = fit_section("refine", "draft", draft_text, tail_ratio=0)
+        user_text = fit_section("refine", "user_text", user_text)
+        return f"""
         당신은 합격률 99%의 취업 컨설턴트입니다.
         앞선 [분석 내용]을 바탕으로, 의뢰인에게 **구체적인 수정 제안(첨삭)**을 해주세요.
         
@@ -94,7 +250,7 @@ class CareerAI:
 
         [분석 내용]
         {draft_text}
-
+        {self._history_block(history)}
         [사용자 원문]
         {user_text}
 
@@ -112,20 +268,418 @@ class CareerAI:
         **마무리 조언:** (자신감을 주는 멘트)
         """
 
+    def _build_fast_prompt(self, found_tips, user_text, history=""):
+        # 빠른 모드: 분석 + 첨삭을 한 번에, 결과는 JSON 으로 받아서 서버에서 마크다운으로 변환
+        user_text = fit_section("fast", "user_text", user_text)
+        return f"""
+        당신은 합격률 99%의 취업 컨설턴트이자 꼼꼼한 '이력서 교정 에디터'입니다.
+        [참고 가이드]를 기준으로 [사용자 글]에서 수정이 시급한 문장 3~5개를 찾아,
+        문장 단위로 구체적인 수정 제안(첨삭)을 해주세요.
+
+        **오직 아래 구조의 JSON 데이터만 출력하세요.**
+        {{
+            "summary": "전체적인 느낌과 주요 개선 방향 1~2줄 요약",
+            "items": [
+                {{
+                    "original": "문제가 되는 사용자의 문장을 그대로 인용",
+                    "reason": "왜 이 문장이 별로인지 설명",
+                    "suggestion": "이렇게 고쳐보세요"
+                }}
+            ],
+            "closing": "자신감을 주는 마무리 조언"
+        }}
+
+        [참고 가이드]
+        {found_tips}
+        {self._history_block(history)}
+        [사용자 글]
+        {user_text}
+        """
+
+    def _render_fast_result(self, data):
+        """빠른 모드 JSON → 2단계 코칭과 같은 마크다운 형식"""
+        lines = [f"**총평:** {data.get('summary', '')}", "---"]
+        for i, item in enumerate(data.get("items", []), 1):
+            lines.append(f"**{i}. 🔴 원문:** \"{item.get('original', '')}\"")
+            lines.append(f"   **💡 이유:** {item.get('reason', '')}")
+            lines.append(f"   **🟢 수정 제안:** \"{item.get('suggestion', '')}\"")
+            lines.append("")
+        lines += ["---", f"**마무리 조언:** {data.get('closing', '')}"]
+        return "\n".join(lines)
+
+    def get_coaching(self, user_text, mode="full", session_id=None):
+        """자소서 내용을 분석하고 첨삭해주는 함수 (mode="fast" 면 LLM 1회 호출, session_id 가 있으면 이전 대화 이어서)"""
+        if self.llm is None:
+            return "API 키가 없습니다.", [], None
+
+        # RAG 검색
+        context = self._search_tips(user_text)
+        history = self._session_history(session_id)
         try:
-            final_response = self.model.generate_content(refine_prompt)
-            return final_response.text, sources, draft_text 
+            result = self._coach(user_text, context, mode, history)
+        except CoachingError as e:
+            return str(e), [], None
+        self._record_turn(session_id, user_text, result[0])
+        return result
+
+    def _coach(self, user_text, context, mode="full", history=""):
+        """검색 이후 단계 (캐시 확인 → 1차 분석 → 2차 코칭). 실패 시 CoachingError"""
+        found_tips, sources, doc_ids = context
+
+        # 같은 글 + 같은 참고 문서면 캐시된 답변 재사용
+        cache_key = self._cache_key(user_text, doc_ids, mode, history)
+        cached = self.cache.get(cache_key)
+        if cached:
+            return cached
+
+        if mode == "fast":
+            try:
+                response = self._generate(
+                    self._build_fast_prompt(found_tips, user_text, history), "fast",
+                    generation_config=FAST_GENERATION_CONFIG,
+                )
+                answer = self._render_fast_result(self._load_parse_result(response.text))
+            except Exception as e:
+                raise CoachingError(f"코칭 중 에러: {str(e)}")
+            self.cache.set(cache_key, answer, sources, None, doc_ids)
+            return answer, sources, None
+
+        try:
+            draft_response = self._generate(self._build_draft_prompt(found_tips, user_text, history), "draft")
+            draft_text = draft_response.text
         except Exception as e:
-            return f"코칭 중 에러: {str(e)}", [], None
+            raise CoachingError(f"분석 중 에러: {str(e)}")
 
-    def parse_resume_to_json(self, raw_text):
+        try:
+            final_response = self._generate(self._build_refine_prompt(draft_text, user_text, history), "refine")
+        except Exception as e:
+            raise CoachingError(f"코칭 중 에러: {str(e)}")
+
+        self.cache.set(cache_key, final_response.text, sources, draft_text, doc_ids)
+        return final_response.text, sources, draft_text
+
+    def stream_coaching(self, user_text, mode="full", session_id=None):
         """
-        통짜 이력서 텍스트를 분석하여 구조화된 JSON으로 반환하는 함수 (신규 추가)
+        astream_coaching 의 동기 버전 (Streamlit 용) - 같은 단계 이벤트를 실제 진행에 맞춰 yield
+        retrieval → draft → token ... → done (실패 시 error)
         """
-        if not os.getenv("GOOGLE_API_KEY"):
-            return {"error": "API Key Missing"}
+        if self.llm is None:
+            yield {"event": "error", "message": "API 키가 없습니다."}
+            return
+
+        found_tips, sources, doc_ids = self._search_tips(user_text)
+        history = self._session_history(session_id)
+        yield {"event": "retrieval", "sources": sources}
+
+        # 빠른 모드는 JSON 을 다 받아야 렌더링할 수 있어서 완성본을 한 번에 전송
+        if mode == "fast":
+            try:
+                answer, sources, _ = self._coach(user_text, (found_tips, sources, doc_ids), mode, history)
+            except CoachingError as e:
+                yield {"event": "error", "message": str(e)}
+                return
+            yield {"event": "token", "text": answer}
+            self._append_turn(session_id, user_text, answer)
+            yield {"event": "done", "answer": answer, "sources": sources}
+            self._roll_session(session_id)
+            return
+
+        # 캐시 적중 시 LLM 호출 없이 완성된 답변을 한 번에 전송
+        cache_key = self._cache_key(user_text, doc_ids, history=history)
+        cached = self.cache.get(cache_key)
+        if cached:
+            answer, sources, _ = cached
+            yield {"event": "token", "text": answer}
+            self._append_turn(session_id, user_text, answer)
+            yield {"event": "done", "answer": answer, "sources": sources}
+            self._roll_session(session_id)
+            return
+
+        try:
+            draft_text = self._generate(self._build_draft_prompt(found_tips, user_text, history), "draft").text
+        except Exception as e:
+            yield {"event": "error", "message": f"분석 중 에러: {str(e)}"}
+            return
+        yield {"event": "draft"}
+
+        answer = ""
+        try:
+            for text in self.llm.stream(self._build_refine_prompt(draft_text, user_text, history), "refine"):
+                answer += text
+                yield {"event": "token", "text": text}
+        except Exception as e:
+            yield {"event": "error", "message": f"코칭 중 에러: {str(e)}"}
+            return
+
+        self.cache.set(cache_key, answer, sources, draft_text, doc_ids)
+        self._append_turn(session_id, user_text, answer)
+        yield {"event": "done", "answer": answer, "sources": sources}
+        # 오래된 턴 요약은 답변을 다 보낸 뒤에
+        self._roll_session(session_id)
+
+    def _generate(self, prompt, stage, priority=INTERACTIVE, **kwargs):
+        """LLM 동기 호출 (단계별 지연시간/에러/토큰 기록은 LLMClient 가 담당)"""
+        return self.llm.generate(prompt, stage, priority, **kwargs)
+
+    # ------------------------------------------------------------------
+    # 비동기 버전 (FastAPI 전용) - 이벤트 루프를 막지 않음
+    # ------------------------------------------------------------------
+    async def _agenerate(self, prompt, stage, priority=INTERACTIVE, **kwargs):
+        """동시 호출 수 상한 / 우선순위를 지키면서 LLM 비동기 호출"""
+        return await self.llm.agenerate(prompt, stage, priority, **kwargs)
 
-        parse_prompt = f"""
+    async def aget_coaching(self, user_text, mode="full", session_id=None):
+        """get_coaching 의 비동기 버전 (반환값 동일)"""
+        if self.llm is None:
+            return "API 키가 없습니다.", [], None
+
+        # Chroma 검색(임베딩 포함)은 CPU 작업이라 스레드로 넘김
+        context = await asyncio.to_thread(self._search_tips, user_text)
+        history = await asyncio.to_thread(self._session_history, session_id)
+
+        try:
+            result = await self._acoach(user_text, context, mode, history=history)
+        except CoachingError as e:
+            return str(e), [], None
+        await self._arecord_turn(session_id, user_text, result[0])
+        return result
+
+    async def acoach_job(self, user_text, mode="full", session_id=None):
+        """
+        백그라운드 작업용 코칭 (화면에서 기다리는 요청보다 뒤 순서)
+        aget_coaching 과 달리 실패하면 CoachingError 를 그대로 올림 → 작업 실패 사유로 기록
+        반환: (답변, 참고 출처)
+        """
+        if self.llm is None:
+            raise CoachingError("API 키가 없습니다.")
+
+        context = await asyncio.to_thread(self._search_tips, user_text)
+        history = await asyncio.to_thread(self._session_history, session_id)
+        answer, sources, _ = await self._acoach(user_text, context, mode, priority=BATCH, history=history)
+        await self._arecord_turn(session_id, user_text, answer)
+        return answer, sources
+
+    async def _acoach(self, user_text, context, mode="full", priority=INTERACTIVE, history=""):
+        """검색 이후 단계 (캐시 확인 → 1차 분석 → 2차 코칭). 실패 시 CoachingError"""
+        found_tips, sources, doc_ids = context
+
+        cache_key = self._cache_key(user_text, doc_ids, mode, history)
+        cached = await asyncio.to_thread(self.cache.get, cache_key)
+        if cached:
+            return cached
+
+        if mode == "fast":
+            try:
+                response = await self._agenerate(
+                    self._build_fast_prompt(found_tips, user_text, history), "fast", priority,
+                    generation_config=FAST_GENERATION_CONFIG,
+                )
+                answer = self._render_fast_result(self._load_parse_result(response.text))
+            except Exception as e:
+                raise CoachingError(f"코칭 중 에러: {str(e)}")
+            await asyncio.to_thread(self.cache.set, cache_key, answer, sources, None, doc_ids)
+            return answer, sources, None
+
+        try:
+            draft_response = await self._agenerate(self._build_draft_prompt(found_tips, user_text, history), "draft", priority)
+            draft_text = draft_response.text
+        except Exception as e:
+            raise CoachingError(f"분석 중 에러: {str(e)}")
+
+        try:
+            final_response = await self._agenerate(self._build_refine_prompt(draft_text, user_text, history), "refine", priority)
+        except Exception as e:
+            raise CoachingError(f"코칭 중 에러: {str(e)}")
+
+        await asyncio.to_thread(self.cache.set, cache_key, final_response.text, sources, draft_text, doc_ids)
+        return final_response.text, sources, draft_text
+
+    async def aget_coaching_batch(self, user_texts, max_concurrency=BATCH_COACHING_CONCURRENCY, mode="full"):
+        """
+        여러 자소서를 한 번에 코칭 (기수 단위 일괄 첨삭용)
+        - 검색은 query 한 번으로 묶고, LLM 단계는 max_concurrency 개씩 동시 진행
+        - 항목별로 성공/실패를 따로 돌려줌 (하나가 실패해도 나머지는 정상 반환)
+        """
+        if self.llm is None:
+            return [{"index": i, "status": "error", "error": "API 키가 없습니다."} for i in range(len(user_texts))]
+        if not user_texts:
+            return []
+
+        try:
+            contexts = await asyncio.to_thread(self._search_tips_many, list(user_texts))
+        except Exception as e:
+            return [{"index": i, "status": "error", "error": f"검색 중 에러: {str(e)}"} for i in range(len(user_texts))]
+
+        batch_semaphore = asyncio.Semaphore(max(1, max_concurrency))
+
+        async def run_one(index, user_text, context):
+            async with batch_semaphore:
+                try:
+                    answer, sources, _ = await self._acoach(user_text, context, mode, BATCH)
+                    return {"index": index, "status": "success", "answer": answer, "sources": sources}
+                except CoachingError as e:
+                    return {"index": index, "status": "error", "error": str(e)}
+
+        return await asyncio.gather(*[
+            run_one(i, text, context) for i, (text, context) in enumerate(zip(user_texts, contexts))
+        ])
+
+    def _agenerate_stream(self, prompt, stage, priority=INTERACTIVE):
+        """LLM 스트리밍 호출 - 토큰(청크)이 도착하는 대로 텍스트를 흘려보냄"""
+        return self.llm.astream(prompt, stage, priority)
+
+    async def astream_coaching(self, user_text, mode="full", session_id=None):
+        """
+        코칭 결과를 단계별 이벤트로 흘려보내는 비동기 제너레이터 (SSE 용)
+        - {"event": "retrieval", "sources": [...]} : 검색 완료
+        - {"event": "draft"}                      : 1차 분석 완료
+        - {"event": "token", "text": "..."}       : 2차 코칭 토큰
+        - {"event": "done", "answer": "...", "sources": [...]}
+        - {"event": "error", "message": "..."}
+        """
+        if self.llm is None:
+            yield {"event": "error", "message": "API 키가 없습니다."}
+            return
+
+        found_tips, sources, doc_ids = await asyncio.to_thread(self._search_tips, user_text)
+        history = await asyncio.to_thread(self._session_history, session_id)
+        yield {"event": "retrieval", "sources": sources}
+
+        # 빠른 모드는 JSON 을 다 받아야 렌더링할 수 있어서 완성본을 한 번에 전송
+        if mode == "fast":
+            try:
+                answer, sources, _ = await self._acoach(user_text, (found_tips, sources, doc_ids), mode, history=history)
+            except CoachingError as e:
+                yield {"event": "error", "message": str(e)}
+                return
+            yield {"event": "token", "text": answer}
+            await self._arecord_turn(session_id, user_text, answer)
+            yield {"event": "done", "answer": answer, "sources": sources}
+            return
+
+        # 캐시 적중 시 LLM 호출 없이 완성된 답변을 한 번에 전송
+        cache_key = self._cache_key(user_text, doc_ids, history=history)
+        cached = await asyncio.to_thread(self.cache.get, cache_key)
+        if cached:
+            answer, sources, _ = cached
+            yield {"event": "token", "text": answer}
+            await self._arecord_turn(session_id, user_text, answer)
+            yield {"event": "done", "answer": answer, "sources": sources}
+            return
+
+        try:
+            draft_response = await self._agenerate(self._build_draft_prompt(found_tips, user_text, history), "draft")
+            draft_text = draft_response.text
+        except Exception as e:
+            yield {"event": "error", "message": f"분석 중 에러: {str(e)}"}
+            return
+        yield {"event": "draft"}
+
+        answer = ""
+        try:
+            async for text in self._agenerate_stream(self._build_refine_prompt(draft_text, user_text, history), "refine"):
+                answer += text
+                yield {"event": "token", "text": text}
+        except Exception as e:
+            yield {"event": "error", "message": f"코칭 중 에러: {str(e)}"}
+            return
+
+        await asyncio.to_thread(self.cache.set, cache_key, answer, sources, draft_text, doc_ids)
+        await self._arecord_turn(session_id, user_text, answer)
+        yield {"event": "done", "answer": answer, "sources": sources}
+
+    # ------------------------------------------------------------------
+    # 멀티턴 세션 - 최근 턴은 원문, 오래된 턴은 누적 요약으로 접어서 프롬프트 크기를 일정하게 유지
+    # ------------------------------------------------------------------
+    def _session_history(self, session_id):
+        """세션 맥락을 예산 안의 텍스트로 (세션이 없으면 "")"""
+        if not session_id:
+            return ""
+        summary, turns = self.sessions.get_context(session_id)
+        return pack_history(summary, turns)
+
+    def _append_turn(self, session_id, user_text, answer):
+        if session_id:
+            self.sessions.append_turn(session_id, user_text, answer)
+
+    def _record_turn(self, session_id, user_text, answer):
+        self._append_turn(session_id, user_text, answer)
+        self._roll_session(session_id)
+
+    async def _arecord_turn(self, session_id, user_text, answer):
+        """턴 저장 후 요약 갱신은 백그라운드로 (응답을 요약 LLM 호출만큼 늦추지 않음)"""
+        if not session_id:
+            return
+        await asyncio.to_thread(self.sessions.append_turn, session_id, user_text, answer)
+        task = asyncio.create_task(self._aroll_session(session_id))
+        self._session_tasks.add(task)
+        task.add_done_callback(self._session_tasks.discard)
+
+    def _build_summary_prompt(self, summary, turns):
+        # 세션 요약 갱신: 기존 요약 + 이번에 접을 턴만 넣음 (요약 호출 자체도 예산 안)
+        turns_text = "\n".join(f"사용자: {user_text}\n코치: {answer}" for _, user_text, answer in turns)
+        turns_text = fit_section("session", "recent", turns_text)
+        return f"""
+        당신은 자소서 코칭 대화의 기록 담당자입니다.
+        [기존 요약]에 [새 대화]의 내용을 합쳐서, 다음 코칭에 필요한 맥락만 남긴 요약으로 갱신하세요.
+        - 사용자의 지원 직무/핵심 경험, 코치가 지적한 문제점, 합의된 수정 방향, 사용자의 요청 사항 위주
+        - 인사말/반복 설명은 빼고, {budget("session", "summary") * 2}자 이내의 글머리표로 작성
+
+        [기존 요약]
+        {summary or "(없음)"}
+
+        [새 대화]
+        {turns_text}
+        """
+
+    def _fold_summary(self, response_text):
+        """요약 결과를 예산으로 자름"""
+        return fit_text(response_text, budget("session", "summary"), tail_ratio=0)
+
+    @staticmethod
+    def _rollup_failed(error):
+        # 요약은 답변을 다 보낸 뒤의 부가 작업 → 실패해도 기존 요약과 턴 원문을 그대로 두고 다음 턴에 다시 시도
+        metrics.inc("session_summary_errors")
+        print(f"⚠️ 세션 요약 실패 (이전 요약 유지): {error}")
+
+    def _roll_session(self, session_id):
+        if not session_id:
+            return
+        try:
+            pending = self.sessions.pending_rollup(session_id)
+            if pending is None:
+                return
+            summary, summarized, turns = pending
+            text = self._generate(self._build_summary_prompt(summary, turns), "session_summary", BATCH).text
+            self.sessions.save_summary(session_id, self._fold_summary(text), summarized, turns[-1][0])
+        except Exception as e:
+            self._rollup_failed(e)
+
+    async def _aroll_session(self, session_id):
+        try:
+            pending = await asyncio.to_thread(self.sessions.pending_rollup, session_id)
+            if pending is None:
+                return
+            summary, summarized, turns = pending
+            text = (await self._agenerate(self._build_summary_prompt(summary, turns), "session_summary", BATCH)).text
+            await asyncio.to_thread(
+                self.sessions.save_summary, session_id, self._fold_summary(text), summarized, turns[-1][0]
+            )
+        except Exception as e:
+            self._rollup_failed(e)
+
+    def reset_session(self, session_id):
+        """새 대화 - 세션 삭제 → 삭제 여부 (API 키가 없어 세션 기능이 꺼져 있으면 아무것도 하지 않음)"""
+        if not session_id or not hasattr(self, "sessions"):
+            return False
+        return self.sessions.delete(session_id)
+
+    def _build_parse_prompt(self, raw_text, part=None):
+        # 긴 이력서를 나눠서 보낼 때는 이 덩어리에 나온 경력만 뽑도록 안내
+        part_note = ""
+        if part is not None:
+            part_note = f"4. [입력 텍스트]는 전체 이력서 {part[1]}개 조각 중 {part[0] + 1}번째입니다. 이 조각에 나온 경력만 추출하세요."
+        return f"""
         당신은 '이력서 데이터 추출기'입니다.
         아래 [입력 텍스트]를 분석하여 경력 사항을 구조화된 JSON 포맷으로 변환하세요.
         
@@ -133,6 +687,7 @@ class CareerAI:
         1. 불필요한 서술어는 제거하고 핵심만 추출하세요.
         2. 날짜/기간이 명확하지 않으면 "Unknown"으로 표시하세요.
         3. **오직 JSON 데이터만 출력하세요.** (마크다운 ```json 태그 포함 금지)
+        {part_note}
         
         [추출할 필드 구조]
         {{
@@ -151,15 +706,117 @@ class CareerAI:
         {raw_text}
         """
 
-        try:
-            response = self.model.generate_content(parse_prompt)
-            result_text = response.text.strip()
+    def _load_parse_result(self, result_text):
+        result_text = result_text.strip()
+        # JSON 파싱 (AI가 가끔 ```json ... ``` 을 붙일 때가 있어서 제거 처리)
+        if result_text.startswith("```json"):
+            result_text = result_text.replace("```json", "").replace("```", "")
+        return json.loads(result_text)
 
-            # JSON 파싱 (AI가 가끔 ```json ... ``` 을 붙일 때가 있어서 제거 처리)
-            if result_text.startswith("```json"):
-                result_text = result_text.replace("```json", "").replace("```", "")
-            
-            return json.loads(result_text)
+    def _parse_chunk(self, text, part=None):
+        """이력서 조각 1개 파싱 - 실패하면 그 조각만 다시 시도 (전체 재시도 X)"""
+        result_text = ""
+        for attempt in range(PARSE_CHUNK_RETRIES + 1):
+            try:
+                response = self._generate(
+                    self._build_parse_prompt(text, part), "parse", BATCH, generation_config=PARSE_GENERATION_CONFIG
+                )
+                result_text = response.text
+                return self._load_parse_result(result_text)
+            except Exception as e:
+                if attempt == PARSE_CHUNK_RETRIES:
+                    raise ResumeParseError(str(e), result_text)
 
-        except Exception as e:
-            return {"error": f"파싱 실패: {str(e)}", "raw_response": result_text}
\ No newline at end of file
+    async def _aparse_chunk(self, text, part=None):
+        result_text = ""
+        for attempt in range(PARSE_CHUNK_RETRIES + 1):
+            try:
+                response = await self._agenerate(
+                    self._build_parse_prompt(text, part), "parse", BATCH, generation_config=PARSE_GENERATION_CONFIG
+                )
+                result_text = response.text
+                return self._load_parse_result(result_text)
+            except Exception as e:
+                if attempt == PARSE_CHUNK_RETRIES:
+                    raise ResumeParseError(str(e), result_text)
+
+    @staticmethod
+    def _merge_chunk_results(results):
+        """조각별 결과(dict 또는 예외)를 합치기 - 일부 조각만 실패하면 failed_chunks 로 표시"""
+        parsed = [r for r in results if isinstance(r, dict)]
+        failed = [r for r in results if not isinstance(r, dict)]
+        if not parsed:
+            return {"error": f"파싱 실패: {failed[0]}"}
+        merged = merge_parsed_chunks(parsed)
+        if failed:
+            merged["failed_chunks"] = len(failed)
+        return merged
+
+    def _parse_cache_key(self, raw_text):
+        return sha256_hex(f"{PARSE_PROMPT_VERSION}\x00{normalize_text(raw_text)}")
+
+    def _load_cached_parse(self, raw_text):
+        cached = self.resume_cache.get("parse", self._parse_cache_key(raw_text))
+        return json.loads(cached) if cached is not None else None
+
+    def _store_parse(self, raw_text, result):
+        # 완전히 성공한 결과만 저장 (에러/일부 실패는 다음에 다시 시도)
+        if "error" not in result and "failed_chunks" not in result:
+            self.resume_cache.set("parse", self._parse_cache_key(raw_text), json.dumps(result, ensure_ascii=False))
+        return result
+
+    def parse_resume_to_json(self, raw_text):
+        """
+        통짜 이력서 텍스트를 분석하여 구조화된 JSON으로 반환하는 함수 (신규 추가)
+        긴 이력서는 경력 경계로 나눠 동시에 파싱한 뒤 합침
+        """
+        if self.llm is None:
+            return {"error": "API Key Missing"}
+
+        cached = self._load_cached_parse(raw_text)
+        if cached is not None:
+            return cached
+        return self._store_parse(raw_text, self._parse_uncached(raw_text))
+
+    def _parse_uncached(self, raw_text):
+        chunks = split_resume(raw_text)
+        if len(chunks) == 1:
+            try:
+                return self._parse_chunk(raw_text)
+            except ResumeParseError as e:
+                return {"error": f"파싱 실패: {str(e)}", "raw_response": e.raw_response}
+
+        def run(i):
+            try:
+                return self._parse_chunk(chunks[i], (i, len(chunks)))
+            except ResumeParseError as e:
+                return e
+
+        with ThreadPoolExecutor(max_workers=min(len(chunks), self.max_concurrency)) as pool:
+            results = list(pool.map(run, range(len(chunks))))
+        return self._merge_chunk_results(results)
+
+    async def aparse_resume_to_json(self, raw_text):
+        """parse_resume_to_json 의 비동기 버전"""
+        if self.llm is None:
+            return {"error": "API Key Missing"}
+
+        cached = await asyncio.to_thread(self._load_cached_parse, raw_text)
+        if cached is not None:
+            return cached
+        result = await self._aparse_uncached(raw_text)
+        return await asyncio.to_thread(self._store_parse, raw_text, result)
+
+    async def _aparse_uncached(self, raw_text):
+        chunks = split_resume(raw_text)
+        if len(chunks) == 1:
+            try:
+                return await self._aparse_chunk(raw_text)
+            except ResumeParseError as e:
+                return {"error": f"파싱 실패: {str(e)}", "raw_response": e.raw_response}
+
+        results = await asyncio.gather(
+            *[self._aparse_chunk(chunk, (i, len(chunks))) for i, chunk in enumerate(chunks)],
+            return_exceptions=True,
+        )
+        return self._merge_chunk_results(results)
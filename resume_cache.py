@@ -0,0 +1,119 @@
+import sqlite3
+import hashlib
+import os
+import threading
+import time
+
+# 이력서 추출/파싱 결과 캐시 설정값 (환경변수로 조정 가능)
+RESUME_CACHE_DB = os.getenv("RESUME_CACHE_DB", "monitor/resume_cache.db")
+RESUME_CACHE_MAX_BYTES = int(os.getenv("RESUME_CACHE_MAX_BYTES", str(100 * 1024 * 1024)))  # 100MB
+
+
+def sha256_hex(data):
+    if isinstance(data, str):
+        data = data.encode("utf-8")
+    return hashlib.sha256(data).hexdigest()
+
+
+class ContentCache:
+    """
+    내용 해시 기반 캐시 (SQLite 디스크 저장)
+    - namespace 별로 키를 나눔 ("extract": 업로드 파일 바이트, "parse": 정규화 텍스트 + 프롬프트 버전)
+    - 전체 크기가 max_bytes 를 넘으면 오래 안 쓴 항목부터 삭제(LRU)
+    """
+
+    def __init__(self, db_path=RESUME_CACHE_DB, max_bytes=RESUME_CACHE_MAX_BYTES):
+        self.db_path = db_path
+        self.max_bytes = max_bytes
+        self.hits = {}
+        self.misses = {}
+        self._lock = threading.Lock()
+
+        folder = os.path.dirname(db_path)
+        if folder:
+            os.makedirs(folder, exist_ok=True)
+        self.conn = sqlite3.connect(db_path, check_same_thread=False)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.executescript('''
+            CREATE TABLE IF NOT EXISTS content_cache (
+                namespace TEXT,
+                key TEXT,
+                value TEXT,
+                size INTEGER,
+                last_access REAL,
+                PRIMARY KEY (namespace, key)
+            );
+            CREATE INDEX IF NOT EXISTS idx_content_cache_access ON content_cache(last_access);
+        ''')
+        self.conn.commit()
+        self._total = self.conn.execute("SELECT COALESCE(SUM(size), 0) FROM content_cache").fetchone()[0]
+
+    def get(self, namespace, key):
+        with self._lock:
+            row = self.conn.execute(
+                "SELECT value FROM content_cache WHERE namespace = ? AND key = ?", (namespace, key)
+            ).fetchone()
+            if row is None:
+                self.misses[namespace] = self.misses.get(namespace, 0) + 1
+                return None
+            self.conn.execute(
+                "UPDATE content_cache SET last_access = ? WHERE namespace = ? AND key = ?",
+                (time.time(), namespace, key),
+            )
+            self.conn.commit()
+            self.hits[namespace] = self.hits.get(namespace, 0) + 1
+            return row[0]
+
+    def set(self, namespace, key, value):
+        size = len(value.encode("utf-8"))
+        if size > self.max_bytes:
+            return
+        with self._lock:
+            old = self.conn.execute(
+                "SELECT size FROM content_cache WHERE namespace = ? AND key = ?", (namespace, key)
+            ).fetchone()
+            self.conn.execute(
+                "INSERT OR REPLACE INTO content_cache (namespace, key, value, size, last_access) VALUES (?, ?, ?, ?, ?)",
+                (namespace, key, value, size, time.time()),
+            )
+            self._total += size - (old[0] if old else 0)
+            self._evict()
+            self.conn.commit()
+
+    def _evict(self):
+        # lock 을 잡은 상태에서만 호출
+        while self._total > self.max_bytes:
+            rows = self.conn.execute(
+                "SELECT namespace, key, size FROM content_cache ORDER BY last_access ASC LIMIT 100"
+            ).fetchall()
+            if not rows:
+                self._total = 0
+                return
+            for namespace, key, size in rows:
+                self.conn.execute("DELETE FROM content_cache WHERE namespace = ? AND key = ?", (namespace, key))
+                self._total -= size
+                if self._total <= self.max_bytes:
+                    return
+
+    def stats(self):
+        with self._lock:
+            out = {"bytes": self._total, "max_bytes": self.max_bytes}
+            for namespace in sorted(set(self.hits) | set(self.misses)):
+                hits = self.hits.get(namespace, 0)
+                total = hits + self.misses.get(namespace, 0)
+                out[f"{namespace}_hits"] = hits
+                out[f"{namespace}_misses"] = total - hits
+                out[f"{namespace}_hit_rate"] = round(hits / total, 4) if total else 0.0
+            return out
+
+
+_cache = None
+_cache_lock = threading.Lock()
+
+def get_resume_cache():
+    """프로세스 공용 캐시 (처음 쓸 때 생성)"""
+    global _cache
+    with _cache_lock:
+        if _cache is None:
+            _cache = ContentCache()
+        return _cache
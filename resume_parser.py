@@ -0,0 +1,119 @@
+import os
+import re
+
+# 이 글자 수를 넘는 이력서는 경력 단위로 나눠서 동시에 파싱
+PARSE_CHUNK_CHARS = int(os.getenv("PARSE_CHUNK_CHARS", "3000"))
+
+# 새 경력이 시작되는 줄로 보는 패턴 (기간 표기 / 회사명 표기)
+_PERIOD = re.compile(
+    r"(19|20)\d{2}\s*[.\-/년]\s*\d{0,2}\s*월?\s*[~\-–]"   # 2019.03 ~ / 2019년 3월 - / 2019-
+    r"|(19|20)\d{2}\s*[~\-–]\s*((19|20)\d{2}|현재|재직)"    # 2019 ~ 2021 / 2019 - 현재
+)
+_COMPANY = re.compile(r"(주식회사|\(주\)|㈜|\bInc\.?|\bCorp\.?|\bCo\.,?\s*Ltd)", re.IGNORECASE)
+
+# 긴 줄을 나눌 때 자르는 위치 (문장 끝 > 공백 순으로 우선)
+_SENTENCE_END = re.compile(r"[.!?。]\s+")
+_SPACE = re.compile(r"\s+")
+
+
+def _is_boundary(line):
+    line = line.strip()
+    return bool(line) and len(line) < 120 and bool(_PERIOD.search(line) or _COMPANY.search(line))
+
+
+def _split_long_line(line, max_chars):
+    """max_chars 보다 긴 줄을 문장 끝이나 공백에서 나눔 (버리는 글자 없음, 경계가 없으면 글자 수로)"""
+    slices = []
+    while len(line) > max_chars:
+        window = line[:max_chars]
+        cut = 0
+        for pattern in (_SENTENCE_END, _SPACE):
+            ends = [m.end() for m in pattern.finditer(window)]
+            if ends and ends[-1] > max_chars // 2:
+                cut = ends[-1]
+                break
+        cut = cut or max_chars
+        slices.append(line[:cut])
+        line = line[cut:]
+    slices.append(line)
+    return slices
+
+
+def split_resume(raw_text, max_chars=PARSE_CHUNK_CHARS):
+    """
+    긴 이력서를 경력 경계(기간/회사명이 나오는 줄) 기준으로 max_chars 이하 덩어리로 나눔
+    - 한 경력이 max_chars 보다 길면 줄 단위로, 한 줄이 max_chars 보다 길면 문장/공백 단위로 자름
+    """
+    if len(raw_text) <= max_chars:
+        return [raw_text]
+
+    # 1) 경력 단위 블록 만들기
+    blocks, current = [], []
+    for line in raw_text.splitlines():
+        if current and _is_boundary(line):
+            blocks.append("\n".join(current))
+            current = []
+        current.append(line)
+    if current:
+        blocks.append("\n".join(current))
+
+    # 2) 너무 긴 블록은 줄 단위로 다시 자르기
+    pieces = []
+    for block in blocks:
+        if len(block) <= max_chars:
+            pieces.append(block)
+            continue
+        part = ""
+        for whole in block.splitlines():
+            for line in _split_long_line(whole, max_chars):
+                if part and len(part) + len(line) + 1 > max_chars:
+                    pieces.append(part)
+                    part = ""
+                part = f"{part}\n{line}" if part else line
+        if part:
+            pieces.append(part)
+
+    # 3) 작은 블록들은 max_chars 안에서 합치기 (LLM 호출 수 줄이기)
+    chunks, current = [], ""
+    for piece in pieces:
+        if current and len(current) + len(piece) + 1 > max_chars:
+            chunks.append(current)
+            current = ""
+        current = f"{current}\n{piece}" if current else piece
+    if current.strip():
+        chunks.append(current)
+    return chunks
+
+
+def _norm(value):
+    return re.sub(r"[\s().,㈜]|주식회사", "", str(value or "")).lower()
+
+
+def merge_parsed_chunks(parts):
+    """덩어리별 파싱 결과를 하나의 스키마로 합치고, 같은 경력(회사+기간)은 중복 제거"""
+    summaries = []
+    merged = {}
+    for part in parts:
+        summary = (part.get("summary") or "").strip()
+        if summary and summary not in summaries:
+            summaries.append(summary)
+
+        for exp in part.get("experiences") or []:
+            key = (_norm(exp.get("company")), _norm(exp.get("period")))
+            if key not in merged:
+                merged[key] = {
+                    "company": exp.get("company", "Unknown"),
+                    "role": exp.get("role", "Unknown"),
+                    "period": exp.get("period", "Unknown"),
+                    "details": [],
+                }
+            target = merged[key]
+            # 경계에서 잘린 경력은 양쪽 덩어리에 나뉘어 나올 수 있어서 빈 값을 채우고 성과는 합침
+            for field in ("company", "role", "period"):
+                if target[field] in ("", "Unknown", None) and exp.get(field):
+                    target[field] = exp[field]
+            for detail in exp.get("details") or []:
+                if detail not in target["details"]:
+                    target["details"].append(detail)
+
+    return {"summary": " ".join(summaries), "experiences": list(merged.values())}
@@ -0,0 +1,566 @@
+from abc import ABC, abstractmethod
+import json
+import os
+import shutil
+import sqlite3
+import threading
+import time
+
+import numpy as np
+
+from ingest import iter_collection_ids
+
+try:
+    import fcntl  # 프로세스 간 쓰기 잠금 (Windows 에는 없음 → 프로세스 안에서만 잠금)
+except ImportError:
+    fcntl = None
+
+# 검색 백엔드 선택: chroma (기본, 대용량용) / numpy (작은 코퍼스용 인-프로세스 검색)
+#                  / snapshot (여러 워커가 같은 읽기 전용 스냅샷을 memory-map 으로 공유)
+RETRIEVER_BACKEND = os.getenv("RETRIEVER_BACKEND", "chroma")
+NUMPY_INDEX_DIR = os.getenv("NUMPY_INDEX_DIR", "./numpy_index")
+
+# 스냅샷 설정
+SNAPSHOT_DIR = os.getenv("SNAPSHOT_DIR", "./index_snapshots")
+SNAPSHOT_KEEP = int(os.getenv("SNAPSHOT_KEEP", "3"))                       # 남겨둘 이전 버전 수
+SNAPSHOT_POLL_SECONDS = float(os.getenv("SNAPSHOT_POLL_SECONDS", "1.0"))   # 새 버전 확인 주기
+
+
+class Retriever(ABC):
+    """
+    CareerAI 가 쓰는 검색 백엔드 공통 인터페이스 (메서드를 하나라도 빠뜨린 백엔드는 만들 수 없음)
+    query() 결과는 Chroma 와 같은 모양: {"ids": [[...]], "documents": [[...]], "metadatas": [[...]], "distances": [[...]]}
+    """
+
+    @abstractmethod
+    def count(self):
+        ...
+
+    @abstractmethod
+    def existing_ids(self, ids):
+        ...
+
+    @abstractmethod
+    def add(self, ids, documents, metadatas):
+        """이미 있는 id 는 건너뜀"""
+
+    @abstractmethod
+    def upsert(self, ids, documents, metadatas):
+        ...
+
+    @abstractmethod
+    def delete(self, ids):
+        ...
+
+    @abstractmethod
+    def iter_ids(self):
+        """저장된 (id, metadata) 전체 훑기"""
+
+    @abstractmethod
+    def query(self, query_texts, n_results, where=None):
+        ...
+
+
+class ChromaRetriever(Retriever):
+    def __init__(self, collection):
+        self.collection = collection
+
+    def count(self):
+        return self.collection.count()
+
+    def existing_ids(self, ids):
+        return set(self.collection.get(ids=list(ids), include=[])["ids"])
+
+    def add(self, ids, documents, metadatas):
+        self.collection.add(ids=ids, documents=documents, metadatas=metadatas)
+
+    def upsert(self, ids, documents, metadatas):
+        self.collection.upsert(ids=ids, documents=documents, metadatas=metadatas)
+
+    def delete(self, ids):
+        self.collection.delete(ids=ids)
+
+    def iter_ids(self):
+        return iter_collection_ids(self.collection)
+
+    def query(self, query_texts, n_results, where=None):
+        return self.collection.query(query_texts=query_texts, n_results=n_results, where=where)
+
+
+class NumpyRetriever(Retriever):
+    """
+    작은 코퍼스용 인-프로세스 검색
+    - 정규화된 임베딩 행렬을 .npy 로 저장하고 읽기 전용 memory-map 으로 사용
+    - 메타데이터는 JSON, 카테고리는 정수 코드 배열 + 카테고리별 인덱스 마스크로 미리 계산
+    - 검색은 행렬곱 한 번 + argpartition 으로 top-k (코사인 거리 = 1 - 유사도)
+    """
+
+    def __init__(self, embedding_function, index_dir=NUMPY_INDEX_DIR):
+        self.embedding_function = embedding_function
+        self.index_dir = index_dir
+        self._lock = threading.Lock()
+        os.makedirs(index_dir, exist_ok=True)
+        self._load()
+
+    # ------------------------------------------------------------------
+    # 저장/불러오기
+    # ------------------------------------------------------------------
+    @property
+    def _matrix_path(self):
+        return os.path.join(self.index_dir, "embeddings.npy")
+
+    @property
+    def _meta_path(self):
+        return os.path.join(self.index_dir, "meta.json")
+
+    def _load(self):
+        if os.path.exists(self._meta_path):
+            with open(self._meta_path, encoding="utf-8") as f:
+                meta = json.load(f)
+            ids, documents, metadatas = meta["ids"], meta["documents"], meta["metadatas"]
+            matrix = np.load(self._matrix_path, mmap_mode="r") if ids else None
+        else:
+            ids, documents, metadatas, matrix = [], [], [], None
+
+        categories = sorted({m.get("category", "") for m in metadatas})
+        codes = {c: i for i, c in enumerate(categories)}
+        category_codes = np.array([codes[m.get("category", "")] for m in metadatas], dtype=np.int32)
+
+        # 검색 중에 교체되어도 섞이지 않도록 한 번에 바꿔 끼움
+        self._state = {
+            "ids": ids,
+            "documents": documents,
+            "metadatas": metadatas,
+            "matrix": matrix,
+            "positions": {doc_id: i for i, doc_id in enumerate(ids)},
+            "category_masks": {c: np.flatnonzero(category_codes == i) for c, i in codes.items()},
+        }
+
+    @property
+    def ids(self):
+        return self._state["ids"]
+
+    @property
+    def documents(self):
+        return self._state["documents"]
+
+    @property
+    def metadatas(self):
+        return self._state["metadatas"]
+
+    @property
+    def matrix(self):
+        return self._state["matrix"]
+
+    def _save(self, ids, documents, metadatas, matrix):
+        """임시 파일에 쓰고 교체 (읽는 쪽은 항상 완성된 파일만 봄)"""
+        if len(ids):
+            tmp_matrix = self._matrix_path + ".tmp.npy"
+            np.save(tmp_matrix, np.ascontiguousarray(matrix, dtype=np.float32))
+            os.replace(tmp_matrix, self._matrix_path)
+        tmp_meta = self._meta_path + ".tmp"
+        with open(tmp_meta, "w", encoding="utf-8") as f:
+            json.dump({"ids": ids, "documents": documents, "metadatas": metadatas}, f, ensure_ascii=False)
+        os.replace(tmp_meta, self._meta_path)
+        self._load()
+
+    def _embed(self, texts):
+        vectors = np.asarray(self.embedding_function(texts), dtype=np.float32)
+        norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+        return vectors / np.maximum(norms, 1e-12)
+
+    # ------------------------------------------------------------------
+    # Retriever 인터페이스
+    # ------------------------------------------------------------------
+    def count(self):
+        return len(self.ids)
+
+    def existing_ids(self, ids):
+        positions = self._state["positions"]
+        return {doc_id for doc_id in ids if doc_id in positions}
+
+    def add(self, ids, documents, metadatas):
+        with self._lock:
+            positions = self._state["positions"]
+            new = [i for i, doc_id in enumerate(ids) if doc_id not in positions]
+            if not new:
+                return
+            vectors = self._embed([documents[i] for i in new])
+            matrix = vectors if self.matrix is None else np.vstack([self.matrix, vectors])
+            self._save(
+                self.ids + [ids[i] for i in new],
+                self.documents + [documents[i] for i in new],
+                self.metadatas + [metadatas[i] for i in new],
+                matrix,
+            )
+
+    def upsert(self, ids, documents, metadatas):
+        with self._lock:
+            replaced = set(ids)
+            keep = [i for i, doc_id in enumerate(self.ids) if doc_id not in replaced]
+            vectors = self._embed(list(documents))
+            base = self.matrix[keep] if self.matrix is not None and keep else np.zeros((0, vectors.shape[1]), np.float32)
+            self._save(
+                [self.ids[i] for i in keep] + list(ids),
+                [self.documents[i] for i in keep] + list(documents),
+                [self.metadatas[i] for i in keep] + list(metadatas),
+                np.vstack([base, vectors]),
+            )
+
+    def delete(self, ids):
+        with self._lock:
+            drop = set(ids)
+            keep = [i for i, doc_id in enumerate(self.ids) if doc_id not in drop]
+            if len(keep) == len(self.ids):
+                return
+            self._save(
+                [self.ids[i] for i in keep],
+                [self.documents[i] for i in keep],
+                [self.metadatas[i] for i in keep],
+                self.matrix[keep] if keep else None,
+            )
+
+    def iter_ids(self):
+        return iter(list(zip(self.ids, self.metadatas)))
+
+    def query(self, query_texts, n_results, where=None):
+        empty = {"ids": [], "documents": [], "metadatas": [], "distances": []}
+        state = self._state
+        matrix, ids, documents, metadatas = state["matrix"], state["ids"], state["documents"], state["metadatas"]
+        if matrix is None or not ids:
+            return {k: [[] for _ in query_texts] for k in empty}
+
+        # 카테고리 필터는 미리 계산한 인덱스로 후보 행만 골라서 계산
+        candidates = None
+        if where and "category" in where:
+            candidates = state["category_masks"].get(where["category"], np.array([], dtype=np.int64))
+            if len(candidates) == 0:
+                return {k: [[] for _ in query_texts] for k in empty}
+
+        queries = self._embed(list(query_texts))
+        sub = matrix if candidates is None else matrix[candidates]
+        scores = queries @ np.asarray(sub).T          # (질문 수, 후보 수)
+        k = min(n_results, scores.shape[1])
+
+        out = {key: [] for key in empty}
+        for row in scores:
+            top = np.argpartition(-row, k - 1)[:k] if k < len(row) else np.arange(len(row))
+            top = top[np.argsort(-row[top])]
+            rows = top if candidates is None else candidates[top]
+            out["ids"].append([ids[i] for i in rows])
+            out["documents"].append([documents[i] for i in rows])
+            out["metadatas"].append([metadatas[i] for i in rows])
+            out["distances"].append([float(1 - row[j]) for j in top])
+        return out
+
+
+class SnapshotRetriever(Retriever):
+    """
+    멀티 워커용 읽기 전용 스냅샷 검색
+    - 스냅샷 1개 = 버전 폴더 (embeddings.npy, categories.npy, docs.db) 이며 한 번 만들면 바꾸지 않음
+    - CURRENT 파일이 가리키는 버전이 최신 (교체는 os.replace 한 번이라 항상 완성된 버전만 보임)
+    - 읽는 쪽: 행렬/카테고리 코드는 memory-map, 문서/메타데이터는 top-k 행만 SQLite 에서 조회
+      → 워커가 늘어도 인덱스는 OS 페이지 캐시 한 벌을 같이 씀
+    - 쓰는 쪽: 파일 잠금으로 한 번에 한 프로세스만 "현재 버전 + 변경분" 으로 새 버전을 만들어 게시
+    - 다른 프로세스가 게시한 새 버전은 SNAPSHOT_POLL_SECONDS 마다 확인해서 바꿔 끼움
+    """
+
+    def __init__(self, embedding_function, snapshot_dir=SNAPSHOT_DIR, keep=SNAPSHOT_KEEP,
+                 poll_seconds=SNAPSHOT_POLL_SECONDS):
+        self.embedding_function = embedding_function
+        self.snapshot_dir = snapshot_dir
+        self.keep = max(1, keep)
+        self.poll_seconds = poll_seconds
+        self._lock = threading.Lock()
+        self._checked = 0.0
+        self._state = self._empty_state()
+        os.makedirs(snapshot_dir, exist_ok=True)
+        self._reload(force=True)
+
+    # ------------------------------------------------------------------
+    # 읽기: 현재 버전 불러오기 / 바꿔 끼우기
+    # ------------------------------------------------------------------
+    @property
+    def _current_path(self):
+        return os.path.join(self.snapshot_dir, "CURRENT")
+
+    @staticmethod
+    def _empty_state():
+        return {"version": None, "matrix": None, "codes": None, "categories": {}, "db": None, "count": 0}
+
+    def _read_current(self):
+        try:
+            with open(self._current_path, encoding="utf-8") as f:
+                return f.read().strip() or None
+        except FileNotFoundError:
+            return None
+
+    def _open(self, version):
+        path = os.path.join(self.snapshot_dir, version)
+        with open(os.path.join(path, "categories.json"), encoding="utf-8") as f:
+            categories = json.load(f)
+        db = sqlite3.connect(f"file:{os.path.join(path, 'docs.db')}?mode=ro&immutable=1", uri=True,
+                             check_same_thread=False)
+        count = db.execute("SELECT COUNT(*) FROM docs").fetchone()[0]
+        return {
+            "version": version,
+            "matrix": np.load(os.path.join(path, "embeddings.npy"), mmap_mode="r") if count else None,
+            "codes": np.load(os.path.join(path, "categories.npy"), mmap_mode="r") if count else None,
+            "categories": {name: i for i, name in enumerate(categories["names"])},
+            "db": db,
+            "count": count,
+        }
+
+    def _reload(self, force=False):
+        """CURRENT 가 바뀌었으면 새 버전으로 교체 (검색 중인 스레드는 이전 버전을 끝까지 씀)"""
+        now = time.monotonic()
+        if not force and now - self._checked < self.poll_seconds:
+            return
+        self._checked = now
+        version = self._read_current()
+        if version is None or version == self._state["version"]:
+            return
+        try:
+            self._state = self._open(version)
+        except (FileNotFoundError, sqlite3.Error):
+            # 게시 직후 정리된 오래된 버전 등 → 다음 확인 때 다시 시도
+            self._checked = 0.0
+
+    @property
+    def version(self):
+        return self._state["version"]
+
+    def _rows(self, state, rows):
+        """행 번호 목록 → (ids, documents, metadatas), 요청한 순서 그대로"""
+        if not rows:
+            return [], [], []
+        found = {}
+        for start in range(0, len(rows), 500):
+            part = rows[start:start + 500]
+            query = f"SELECT row, id, document, metadata FROM docs WHERE row IN ({','.join('?' * len(part))})"
+            for row, doc_id, document, metadata in state["db"].execute(query, part):
+                found[row] = (doc_id, document, json.loads(metadata))
+        ordered = [found[r] for r in rows]
+        return [o[0] for o in ordered], [o[1] for o in ordered], [o[2] for o in ordered]
+
+    def _all_rows(self, state):
+        if state["db"] is None:
+            return [], [], []
+        rows = state["db"].execute("SELECT id, document, metadata FROM docs ORDER BY row").fetchall()
+        return [r[0] for r in rows], [r[1] for r in rows], [json.loads(r[2]) for r in rows]
+
+    def _embed(self, texts):
+        vectors = np.asarray(self.embedding_function(texts), dtype=np.float32)
+        norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+        return vectors / np.maximum(norms, 1e-12)
+
+    # ------------------------------------------------------------------
+    # 쓰기: 잠금 → 현재 버전 + 변경분으로 새 버전 → CURRENT 교체
+    # ------------------------------------------------------------------
+    def _publish(self, change):
+        """
+        change(ids, documents, metadatas, matrix) → 새 (ids, documents, metadatas, matrix) 또는 None(변경 없음)
+        다른 프로세스의 게시와 겹치지 않도록 파일 잠금 안에서 최신 버전을 다시 읽고 적용
+        """
+        with self._lock, open(os.path.join(self.snapshot_dir, ".writer.lock"), "a") as lock_file:
+            if fcntl is not None:
+                fcntl.flock(lock_file, fcntl.LOCK_EX)
+            self._reload(force=True)
+            state = self._state
+            ids, documents, metadatas = self._all_rows(state)
+            matrix = np.asarray(state["matrix"]) if state["matrix"] is not None else None
+
+            result = change(ids, documents, metadatas, matrix)
+            if result is None:
+                return
+            version = self._write_version(*result)
+            tmp = self._current_path + ".tmp"
+            with open(tmp, "w", encoding="utf-8") as f:
+                f.write(version)
+            os.replace(tmp, self._current_path)
+            self._reload(force=True)
+            self._prune()
+
+    def _write_version(self, ids, documents, metadatas, matrix):
+        existing = [d for d in os.listdir(self.snapshot_dir) if d.startswith("v") and d[1:].isdigit()]
+        number = max([int(d[1:]) for d in existing], default=0) + 1
+        version = f"v{number:06d}"
+        tmp_dir = os.path.join(self.snapshot_dir, f".tmp-{version}")
+        shutil.rmtree(tmp_dir, ignore_errors=True)
+        os.makedirs(tmp_dir)
+
+        names = sorted({m.get("category", "") for m in metadatas})
+        codes = {c: i for i, c in enumerate(names)}
+        if ids:
+            np.save(os.path.join(tmp_dir, "embeddings.npy"), np.ascontiguousarray(matrix, dtype=np.float32))
+            np.save(os.path.join(tmp_dir, "categories.npy"),
+                    np.array([codes[m.get("category", "")] for m in metadatas], dtype=np.int32))
+        with open(os.path.join(tmp_dir, "categories.json"), "w", encoding="utf-8") as f:
+            json.dump({"names": names}, f, ensure_ascii=False)
+
+        db = sqlite3.connect(os.path.join(tmp_dir, "docs.db"))
+        db.execute("CREATE TABLE docs (row INTEGER PRIMARY KEY, id TEXT UNIQUE, document TEXT, metadata TEXT)")
+        db.executemany(
+            "INSERT INTO docs (row, id, document, metadata) VALUES (?, ?, ?, ?)",
+            [(i, doc_id, documents[i], json.dumps(metadatas[i], ensure_ascii=False)) for i, doc_id in enumerate(ids)],
+        )
+        db.commit()
+        db.close()
+
+        os.rename(tmp_dir, os.path.join(self.snapshot_dir, version))
+        return version
+
+    def _prune(self):
+        """오래된 버전 삭제 (이미 memory-map 으로 열어둔 프로세스는 파일이 지워져도 계속 읽을 수 있음)"""
+        versions = sorted(d for d in os.listdir(self.snapshot_dir) if d.startswith("v") and d[1:].isdigit())
+        for old in versions[:-self.keep]:
+            shutil.rmtree(os.path.join(self.snapshot_dir, old), ignore_errors=True)
+
+    # ------------------------------------------------------------------
+    # Retriever 인터페이스
+    # ------------------------------------------------------------------
+    def count(self):
+        self._reload()
+        return self._state["count"]
+
+    def existing_ids(self, ids):
+        self._reload()
+        state = self._state
+        if state["db"] is None:
+            return set()
+        ids = list(ids)
+        found = set()
+        for start in range(0, len(ids), 500):
+            part = ids[start:start + 500]
+            query = f"SELECT id FROM docs WHERE id IN ({','.join('?' * len(part))})"
+            found.update(r[0] for r in state["db"].execute(query, part))
+        return found
+
+    def add(self, ids, documents, metadatas):
+        # 임베딩은 잠금 밖에서 미리 계산 (잠금 안에서는 최신 버전 기준으로 한 번 더 걸러냄)
+        existing = self.existing_ids(ids)
+        new = [i for i, doc_id in enumerate(ids) if doc_id not in existing]
+        if not new:
+            return
+        vectors = dict(zip([ids[i] for i in new], self._embed([documents[i] for i in new])))
+
+        def change(cur_ids, cur_docs, cur_metas, matrix):
+            current = set(cur_ids)
+            rows = [i for i in new if ids[i] not in current]
+            if not rows:
+                return None
+            added = np.stack([vectors[ids[i]] for i in rows])
+            return (
+                cur_ids + [ids[i] for i in rows],
+                cur_docs + [documents[i] for i in rows],
+                cur_metas + [metadatas[i] for i in rows],
+                added if matrix is None else np.vstack([matrix, added]),
+            )
+
+        self._publish(change)
+
+    def upsert(self, ids, documents, metadatas):
+        vectors = self._embed(list(documents))
+
+        def change(cur_ids, cur_docs, cur_metas, matrix):
+            replaced = set(ids)
+            keep = [i for i, doc_id in enumerate(cur_ids) if doc_id not in replaced]
+            base = matrix[keep] if matrix is not None and keep else np.zeros((0, vectors.shape[1]), np.float32)
+            return (
+                [cur_ids[i] for i in keep] + list(ids),
+                [cur_docs[i] for i in keep] + list(documents),
+                [cur_metas[i] for i in keep] + list(metadatas),
+                np.vstack([base, vectors]),
+            )
+
+        self._publish(change)
+
+    def delete(self, ids):
+        drop = set(ids)
+
+        def change(cur_ids, cur_docs, cur_metas, matrix):
+            keep = [i for i, doc_id in enumerate(cur_ids) if doc_id not in drop]
+            if len(keep) == len(cur_ids):
+                return None
+            return (
+                [cur_ids[i] for i in keep],
+                [cur_docs[i] for i in keep],
+                [cur_metas[i] for i in keep],
+                matrix[keep] if keep else None,
+            )
+
+        self._publish(change)
+
+    def iter_ids(self):
+        self._reload()
+        state = self._state
+        if state["db"] is None:
+            return iter([])
+        rows = state["db"].execute("SELECT id, metadata FROM docs ORDER BY row").fetchall()
+        return iter([(doc_id, json.loads(meta)) for doc_id, meta in rows])
+
+    def query(self, query_texts, n_results, where=None):
+        self._reload()
+        state = self._state  # 검색 도중 새 버전으로 바뀌어도 이 버전으로 끝까지 진행
+        keys = ("ids", "documents", "metadatas", "distances")
+        if state["matrix"] is None:
+            return {k: [[] for _ in query_texts] for k in keys}
+
+        candidates = None
+        if where and "category" in where:
+            code = state["categories"].get(where["category"])
+            if code is None:
+                return {k: [[] for _ in query_texts] for k in keys}
+            candidates = np.flatnonzero(np.asarray(state["codes"]) == code)
+
+        queries = self._embed(list(query_texts))
+        sub = state["matrix"] if candidates is None else state["matrix"][candidates]
+        scores = queries @ np.asarray(sub).T
+        k = min(n_results, scores.shape[1])
+
+        out = {key: [] for key in keys}
+        for row in scores:
+            top = np.argpartition(-row, k - 1)[:k] if k < len(row) else np.arange(len(row))
+            top = top[np.argsort(-row[top])]
+            rows = top if candidates is None else candidates[top]
+            ids, documents, metadatas = self._rows(state, [int(r) for r in rows])
+            out["ids"].append(ids)
+            out["documents"].append(documents)
+            out["metadatas"].append(metadatas)
+            out["distances"].append([float(1 - row[j]) for j in top])
+        return out
+
+
+def recall_at_k(reference, candidate, queries, k=3):
+    """두 백엔드의 top-k 결과가 얼마나 겹치는지 (reference 기준 recall)"""
+    ref = reference.query(queries, k)["ids"]
+    got = candidate.query(queries, k)["ids"]
+    hits = sum(len(set(r) & set(g)) for r, g in zip(ref, got))
+    total = sum(len(r) for r in ref)
+    return hits / total if total else 1.0
+
+
+if __name__ == "__main__":
+    # 사용법: python retrievers.py  → 같은 데이터로 chroma / numpy 검색 결과 비교
+    import tempfile
+    import chromadb
+    from career_data import CAREER_TIPS
+    from embedding_cache import CachedEmbeddingFunction
+    from ingest import content_id
+
+    embedding_fn = CachedEmbeddingFunction()
+    tmp = tempfile.mkdtemp()
+    chroma = ChromaRetriever(chromadb.PersistentClient(path=os.path.join(tmp, "chroma")).get_or_create_collection(
+        name="recall_check", embedding_function=embedding_fn, metadata={"hnsw:space": "cosine"}
+    ))
+    numpy_backend = NumpyRetriever(embedding_fn, index_dir=os.path.join(tmp, "numpy"))
+
+    ids = [content_id(t["category"], t["source"], t["content"]) for t in CAREER_TIPS]
+    docs = [t["content"] for t in CAREER_TIPS]
+    metas = [{"category": t["category"], "source": t["source"]} for t in CAREER_TIPS]
+    for backend in (chroma, numpy_backend):
+        backend.add(ids, docs, metas)
+
+    with open("dummy_personas.json", encoding="utf-8") as f:
+        queries = [p["raw_input"] for p in json.load(f)["personas"]]
+    print(f"recall@3 (numpy vs chroma): {recall_at_k(chroma, numpy_backend, queries, 3):.3f}")
@@ -0,0 +1,184 @@
+import os
+import re
+import sqlite3
+import threading
+import time
+
+# 코칭 대화 세션 설정 (환경변수로 조정 가능)
+SESSION_DB = os.getenv("SESSION_DB", "monitor/sessions.db")
+SESSION_IDLE_TTL = int(os.getenv("SESSION_IDLE_TTL", str(6 * 3600)))       # 이 시간 동안 대화가 없으면 세션 삭제 (초)
+SESSION_RECENT_TURNS = int(os.getenv("SESSION_RECENT_TURNS", "2"))         # 요약하지 않고 원문 그대로 두는 최근 턴 수
+SESSION_EVICT_INTERVAL = float(os.getenv("SESSION_EVICT_INTERVAL", "300"))  # 오래된 세션 정리 주기 (초)
+
+# 세션 ID 는 클라이언트가 만들어서 보냄 (UUID 등) - 형식만 검사
+SESSION_ID_PATTERN = re.compile(r"^[A-Za-z0-9_-]{8,64}$")
+
+
+def is_valid_session_id(session_id):
+    return bool(session_id) and SESSION_ID_PATTERN.match(session_id) is not None
+
+
+class SessionStore:
+    """
+    멀티턴 코칭 세션 저장소 (SQLite)
+    - 세션마다 누적 요약(summary) + 아직 요약에 넣지 않은 최근 턴 원문만 보관
+    - 요약에 반영된 턴은 바로 삭제 → 대화가 길어져도 세션 1개의 크기는 일정
+    - SESSION_IDLE_TTL 동안 대화가 없는 세션은 턴 기록과 함께 삭제
+    - 요약 갱신은 낙관적 잠금 (동시에 두 번 요약해도 먼저 끝난 쪽만 반영)
+    """
+
+    def __init__(self, db_path=SESSION_DB, idle_ttl=SESSION_IDLE_TTL, recent_turns=SESSION_RECENT_TURNS):
+        self.db_path = db_path
+        self.idle_ttl = idle_ttl
+        self.recent_turns = recent_turns
+        self.evicted = 0
+        self._lock = threading.Lock()
+        self._last_evict = 0.0
+
+        folder = os.path.dirname(db_path)
+        if folder:
+            os.makedirs(folder, exist_ok=True)
+        self.conn = sqlite3.connect(db_path, timeout=30, check_same_thread=False, isolation_level=None)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        self.conn.executescript('''
+            CREATE TABLE IF NOT EXISTS sessions (
+                id TEXT PRIMARY KEY,
+                summary TEXT DEFAULT '',
+                summarized_turns INTEGER DEFAULT 0,
+                created_at REAL,
+                updated_at REAL
+            );
+            CREATE TABLE IF NOT EXISTS session_turns (
+                session_id TEXT,
+                turn INTEGER,
+                user_text TEXT,
+                ai_text TEXT,
+                created_at REAL,
+                PRIMARY KEY (session_id, turn)
+            );
+            CREATE INDEX IF NOT EXISTS idx_sessions_updated ON sessions(updated_at);
+        ''')
+
+    def _read(self, session_id):
+        """(요약, 요약된 턴 수, 요약 안 된 턴들) 을 한 번에 읽음 - 없거나 유휴 시간이 지났으면 None"""
+        with self._lock:
+            row = self.conn.execute(
+                "SELECT summary, summarized_turns FROM sessions WHERE id = ? AND updated_at >= ?",
+                (session_id, time.time() - self.idle_ttl),
+            ).fetchone()
+            if row is None:
+                return None
+            turns = self.conn.execute(
+                "SELECT turn, user_text, ai_text FROM session_turns WHERE session_id = ? AND turn > ? ORDER BY turn",
+                (session_id, row[1]),
+            ).fetchall()
+        return row[0], row[1], turns
+
+    def get_context(self, session_id):
+        """(누적 요약, 요약에 아직 안 들어간 턴 [(턴 번호, 사용자 글, 답변), ...]) - 없는 세션이면 ("", [])"""
+        state = self._read(session_id)
+        if state is None:
+            return "", []
+        return state[0], state[2]
+
+    def append_turn(self, session_id, user_text, ai_text):
+        """대화 1턴 저장 (세션이 없으면 새로 만듦) → 턴 번호"""
+        now = time.time()
+        with self._lock:
+            self.conn.execute("BEGIN IMMEDIATE")
+            try:
+                # 유휴 시간이 지난 세션에 다시 말을 걸면 새 대화로 시작
+                expired = self.conn.execute(
+                    "DELETE FROM sessions WHERE id = ? AND updated_at < ?", (session_id, now - self.idle_ttl)
+                ).rowcount
+                if expired:
+                    self.conn.execute("DELETE FROM session_turns WHERE session_id = ?", (session_id,))
+                self.conn.execute(
+                    "INSERT INTO sessions (id, created_at, updated_at) VALUES (?, ?, ?) "
+                    "ON CONFLICT(id) DO UPDATE SET updated_at = excluded.updated_at",
+                    (session_id, now, now),
+                )
+                turn = self.conn.execute(
+                    "SELECT COALESCE(MAX(turn), (SELECT summarized_turns FROM sessions WHERE id = ?)) + 1 "
+                    "FROM session_turns WHERE session_id = ?",
+                    (session_id, session_id),
+                ).fetchone()[0]
+                self.conn.execute(
+                    "INSERT INTO session_turns (session_id, turn, user_text, ai_text, created_at) VALUES (?, ?, ?, ?, ?)",
+                    (session_id, turn, user_text, ai_text, now),
+                )
+                self.conn.execute("COMMIT")
+            except Exception:
+                self.conn.execute("ROLLBACK")
+                raise
+        self._maybe_evict(now)
+        return turn
+
+    def pending_rollup(self, session_id):
+        """
+        요약에 넣어야 할 오래된 턴 (최근 recent_turns 개를 넘는 부분)
+        반환: (기존 요약, 요약된 턴 수, 넣을 턴 목록) 또는 None (넣을 게 없음)
+        """
+        state = self._read(session_id)
+        if state is None or len(state[2]) <= self.recent_turns:
+            return None
+        summary, summarized, turns = state
+        return summary, summarized, turns[:len(turns) - self.recent_turns]
+
+    def save_summary(self, session_id, summary, expected_turns, upto_turn):
+        """expected_turns 이후로 다른 요약이 반영되지 않았을 때만 저장 + 요약된 턴 삭제 → 저장 여부"""
+        with self._lock:
+            self.conn.execute("BEGIN IMMEDIATE")
+            try:
+                saved = self.conn.execute(
+                    "UPDATE sessions SET summary = ?, summarized_turns = ? WHERE id = ? AND summarized_turns = ?",
+                    (summary, upto_turn, session_id, expected_turns),
+                ).rowcount
+                if saved:
+                    self.conn.execute(
+                        "DELETE FROM session_turns WHERE session_id = ? AND turn <= ?", (session_id, upto_turn)
+                    )
+                self.conn.execute("COMMIT")
+            except Exception:
+                self.conn.execute("ROLLBACK")
+                raise
+        return bool(saved)
+
+    def delete(self, session_id):
+        with self._lock:
+            self.conn.execute("DELETE FROM session_turns WHERE session_id = ?", (session_id,))
+            return self.conn.execute("DELETE FROM sessions WHERE id = ?", (session_id,)).rowcount > 0
+
+    def evict_idle(self, now=None):
+        """유휴 시간이 지난 세션 삭제 → 삭제한 세션 수"""
+        cutoff = (now or time.time()) - self.idle_ttl
+        with self._lock:
+            self.conn.execute("BEGIN IMMEDIATE")
+            try:
+                self.conn.execute(
+                    "DELETE FROM session_turns WHERE session_id IN (SELECT id FROM sessions WHERE updated_at < ?)",
+                    (cutoff,),
+                )
+                removed = self.conn.execute("DELETE FROM sessions WHERE updated_at < ?", (cutoff,)).rowcount
+                self.conn.execute("COMMIT")
+            except Exception:
+                self.conn.execute("ROLLBACK")
+                raise
+        self.evicted += removed
+        return removed
+
+    def _maybe_evict(self, now):
+        if now - self._last_evict < SESSION_EVICT_INTERVAL:
+            return
+        self._last_evict = now
+        removed = self.evict_idle(now)
+        if removed:
+            print(f"🧹 유휴 세션 {removed}개 정리")
+
+    def stats(self):
+        with self._lock:
+            sessions, turns = self.conn.execute(
+                "SELECT (SELECT COUNT(*) FROM sessions), (SELECT COUNT(*) FROM session_turns)"
+            ).fetchone()
+        return {"sessions": sessions, "turns": turns, "evicted": self.evicted}
@@ -0,0 +1,22 @@
+import os
+import sys
+
+# 모듈 import 시점에 읽는 설정값이 많아서, 어떤 모듈보다 먼저 오프라인 백엔드로 고정
+# (API 키 / 모델 다운로드 / 네트워크 없이 실행)
+os.environ.setdefault("LLM_BACKEND", "fake")
+os.environ.setdefault("EMBEDDING_BACKEND", "hash")
+os.environ.setdefault("FAKE_LLM_LATENCY", "0")
+os.environ.setdefault("EMBED_BATCH_WINDOW_MS", "0")
+os.environ.setdefault("LLM_RPM", "0")
+os.environ.setdefault("LLM_TPM", "0")
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import pytest
+
+
+@pytest.fixture(autouse=True)
+def workdir(tmp_path, monkeypatch):
+    """monitor/*.db, chroma_db 같은 상대 경로 저장소를 테스트마다 임시 폴더에 만듦"""
+    monkeypatch.chdir(tmp_path)
+    return tmp_path
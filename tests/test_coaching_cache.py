@@ -0,0 +1,69 @@
+import pytest
+
+import coaching_cache
+from coaching_cache import CoachingCache
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    now = [1_000_000.0]
+    monkeypatch.setattr(coaching_cache.time, "time", lambda: now[0])
+    return now
+
+
+def make_cache(**kwargs):
+    return CoachingCache(db_path="monitor/coaching_cache.db", **kwargs)
+
+
+def test_key_ignores_whitespace_and_doc_order_only():
+    key = CoachingCache.make_key("저는  성실한\n사람입니다.", ["b", "a"], "v1")
+    assert key == CoachingCache.make_key(" 저는 성실한 사람입니다. ", ["a", "b"], "v1")
+    assert key != CoachingCache.make_key("저는 성실한 사람입니다!", ["a", "b"], "v1")
+    assert key != CoachingCache.make_key("저는 성실한 사람입니다.", ["a", "c"], "v1")
+    assert key != CoachingCache.make_key("저는 성실한 사람입니다.", ["a", "b"], "v2")
+
+
+def test_key_depends_on_mode_and_session_history():
+    from rag_system import CareerAI
+
+    ai = CareerAI.__new__(CareerAI)
+    base = ai._cache_key("같은 글", ["a"])
+    assert base == ai._cache_key("같은 글", ["a"], "full", "")
+    assert base != ai._cache_key("같은 글", ["a"], "fast")
+    assert base != ai._cache_key("같은 글", ["a"], "full", "사용자: 이전 질문")
+
+
+def test_roundtrip_and_ttl_expiry(clock):
+    cache = make_cache(ttl=60)
+    cache.set("k", "답변", ["출처"], "초안", ["a"])
+    assert cache.get("k") == ("답변", ["출처"], "초안")
+
+    clock[0] += 61
+    assert cache.get("k") is None
+    assert cache.stats()["entries"] == 0
+    assert (cache.hits, cache.misses) == (1, 1)
+
+
+def test_invalidate_docs_only_drops_dependent_entries():
+    cache = make_cache()
+    cache.set("uses-a", "1", [], None, ["a", "b"])
+    cache.set("uses-c", "2", [], None, ["c"])
+    assert cache.invalidate_docs(["a"]) == 1
+    assert cache.get("uses-a") is None
+    assert cache.get("uses-c") is not None
+    # 다시 저장하면 이전 의존 문서 기록은 남지 않음
+    cache.set("uses-c", "3", [], None, ["d"])
+    assert cache.invalidate_docs(["c"]) == 0
+
+
+def test_evicts_least_recently_used_over_max_entries(clock):
+    cache = make_cache(max_entries=2)
+    cache.set("old", "1", [], None, [])
+    clock[0] += 1
+    cache.set("mid", "2", [], None, [])
+    clock[0] += 1
+    assert cache.get("old") is not None   # old 를 최근에 씀 → mid 가 가장 오래 안 쓴 항목
+    clock[0] += 1
+    cache.set("new", "3", [], None, [])
+    assert cache.get("mid") is None
+    assert cache.get("old") is not None and cache.get("new") is not None
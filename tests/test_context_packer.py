@@ -0,0 +1,65 @@
+from context_packer import budget, dedupe_tips, fit_text, pack_history, pack_tips
+from llm_client import estimate_tokens
+
+SENTENCES = [f"{i}번째 문장은 경험을 설명합니다. " for i in range(20)]
+ESSAY = "".join(SENTENCES).strip()
+
+
+def test_fit_text_returns_short_text_unchanged():
+    assert fit_text("  짧은 글입니다.  ", 100) == "짧은 글입니다."
+
+
+def test_fit_text_keeps_whole_sentences_from_head_and_tail():
+    packed = fit_text(ESSAY, 60)
+    head, tail = packed.split("\n(…중략…)\n")
+    assert head.startswith("0번째 문장") and tail.endswith("19번째 문장은 경험을 설명합니다.")
+    # 앞/뒤 모두 문장 단위 (중간에서 잘린 문장 없음)
+    assert head.endswith("설명합니다.") and ESSAY.endswith(" " + tail)
+    # 앞쪽 42토큰 / 뒤쪽 18토큰 예산 (tail_ratio=0.3) 안에 들어감
+    assert estimate_tokens(head) <= 42 and estimate_tokens(tail) <= 18
+
+
+def test_fit_text_without_tail_and_oversized_sentence():
+    packed = fit_text(ESSAY, 40, tail_ratio=0)
+    assert packed.endswith("(…이하 생략…)") and packed.startswith("0번째 문장")
+    assert estimate_tokens(packed.rsplit("\n", 1)[0]) <= 40
+
+    long_sentence = "가" * 100
+    assert fit_text(long_sentence, 10) == "가" * 20 + " (…이하 생략…)"
+
+
+def test_dedupe_tips_drops_near_duplicates_keeping_first():
+    entries = [
+        ("가이드A", "면접에서는 경험을 구체적인 숫자로 설명하세요.", "a"),
+        ("가이드B", "면접에서는 경험을 구체적인 숫자로 설명하세요!", "b"),
+        ("가이드C", "자소서 첫 문장은 결론부터 쓰세요.", "c"),
+    ]
+    assert [e[2] for e in dedupe_tips(entries)] == ["a", "c"]
+
+
+def test_pack_tips_stops_at_budget_in_rank_order():
+    entries = [(f"출처{i}", f"{i}번 팁 " + "내용" * 10, str(i)) for i in range(5)]
+    line_cost = estimate_tokens(f"- 출처0: {entries[0][1]}\n")
+    text, kept = pack_tips(entries, max_tokens=line_cost * 2 + 1)
+    assert [e[2] for e in kept] == ["0", "1"]
+    assert estimate_tokens(text) <= line_cost * 2 + 1
+
+
+def test_pack_tips_trims_first_tip_larger_than_budget():
+    text, kept = pack_tips([("출처", ESSAY, "big")], max_tokens=30)
+    assert [e[2] for e in kept] == ["big"]
+    body, _ = text.split("\n(…이하 생략…)")
+    assert body.startswith("- 출처: 0번째 문장")
+    # 본문은 머리말("- 출처: ") 을 뺀 나머지 예산 안에서 문장 단위로
+    assert estimate_tokens(body[len("- 출처: "):]) <= 30 - estimate_tokens("- 출처: \n")
+
+
+def test_pack_history_keeps_latest_turns_within_budget(monkeypatch):
+    monkeypatch.setenv("CONTEXT_BUDGET_SESSION_RECENT", "40")
+    assert budget("session", "recent") == 40
+    turns = [(i, f"{i}번 질문입니다", f"{i}번 답변입니다 " + "설명" * 5) for i in range(5)]
+    packed = pack_history("지금까지 리더십 경험을 다룸", turns)
+    assert packed.startswith("[이전 대화 요약]\n지금까지 리더십 경험을 다룸")
+    recent = packed.split("[최근 대화]\n")[1]
+    assert "4번 질문" in recent and "0번 질문" not in recent
+    assert estimate_tokens(recent) <= 40
@@ -0,0 +1,74 @@
+import warnings
+
+import chromadb
+from chromadb.utils import embedding_functions
+
+from embedding_cache import CachedEmbeddingFunction, HashEmbeddingFunction
+
+
+def make_ef(**kwargs):
+    kwargs.setdefault("base", HashEmbeddingFunction())
+    return CachedEmbeddingFunction(db_path="monitor/embedding_cache.db", batch_window_ms=0, **kwargs)
+
+
+def test_reopens_collection_created_with_default_embedding(tmp_path):
+    path = str(tmp_path / "chroma_db")
+    chromadb.PersistentClient(path=path).get_or_create_collection(
+        name="career_collection", embedding_function=embedding_functions.DefaultEmbeddingFunction())
+
+    ef = make_ef(base=embedding_functions.DefaultEmbeddingFunction())
+    assert ef.name() == "default" and ef.get_config() == {}
+    with warnings.catch_warnings():
+        warnings.simplefilter("error", DeprecationWarning)
+        collection = chromadb.PersistentClient(path=path).get_or_create_collection(
+            name="career_collection", embedding_function=ef)
+    assert collection.name == "career_collection"
+
+
+def test_hash_collection_roundtrips_config(tmp_path):
+    client = chromadb.PersistentClient(path=str(tmp_path / "chroma_db"))
+    with warnings.catch_warnings():
+        warnings.simplefilter("error", DeprecationWarning)
+        collection = client.get_or_create_collection(name="tips", embedding_function=make_ef())
+        collection.add(ids=["1"], documents=["리더십 경험을 구체적으로 쓰세요."])
+    assert collection.query(query_texts=["리더십 경험"], n_results=1)["ids"] == [["1"]]
+    assert HashEmbeddingFunction.build_from_config(HashEmbeddingFunction(dim=64).get_config()).dim == 64
+
+
+def test_memory_lru_keeps_most_recent_entries():
+    ef = make_ef(lru_size=2)
+    ef(["가", "나"])
+    ef(["가"])          # 가 를 최근에 씀 → 나 가 가장 오래 안 쓴 항목
+    ef(["다"])
+    assert len(ef._lru) == 2
+    assert ef._lru_get(ef._hash("나")) is None
+    assert ef._lru_get(ef._hash("가")) is not None
+
+
+def test_disk_cache_evicts_least_recently_used_over_max_rows(monkeypatch):
+    import embedding_cache
+
+    now = [1000.0]
+    monkeypatch.setattr(embedding_cache.time, "time", lambda: now[0])
+    ef = make_ef(lru_size=1, max_rows=3)
+    for text in ["하나", "둘", "셋"]:
+        ef([text])
+        now[0] += 1
+    ef._lru.clear()
+    ef(["하나"])        # 디스크 적중 → last_access 갱신
+    now[0] += 1
+    ef(["넷", "다섯"])
+
+    stats = ef.stats()
+    assert stats["disk_rows"] == 3 and stats["disk_evicted"] == 2
+    assert stats["disk_hits"] == 1
+    kept = {row[0] for row in ef.conn.execute("SELECT hash FROM embeddings")}
+    assert kept == {ef._hash(t) for t in ["하나", "넷", "다섯"]}
+
+
+def test_cached_vectors_match_model_and_skip_second_call():
+    ef = make_ef()
+    first = ef(["같은 문장", "같은 문장"])
+    again = ef(["같은 문장"])
+    assert list(first[0]) == list(first[1]) == list(again[0])
+    assert ef.stats()["model_texts"] == 1
@@ -0,0 +1,99 @@
+import io
+import os
+
+import pytest
+from fastapi.testclient import TestClient
+from pypdf import PdfWriter
+from pypdf.generic import DecodedStreamObject, DictionaryObject, NameObject
+
+import api
+import file_utils
+from rag_system import CareerAI
+
+
+def make_pdf(pages):
+    writer = PdfWriter()
+    font = writer._add_object(DictionaryObject({
+        NameObject("/Type"): NameObject("/Font"),
+        NameObject("/Subtype"): NameObject("/Type1"),
+        NameObject("/BaseFont"): NameObject("/Helvetica"),
+    }))
+    for p in range(pages):
+        page = writer.add_blank_page(612, 792)
+        stream = DecodedStreamObject()
+        stream.set_data(f"BT /F1 12 Tf 72 720 Td (page {p} text) Tj ET".encode())
+        page[NameObject("/Contents")] = writer._add_object(stream)
+        page[NameObject("/Resources")] = DictionaryObject({
+            NameObject("/Font"): DictionaryObject({NameObject("/F1"): font}),
+        })
+    buf = io.BytesIO()
+    writer.write(buf)
+    return buf.getvalue()
+
+
+def test_pool_extraction_matches_sequential_and_reuses_pool(monkeypatch):
+    data = make_pdf(9)
+    monkeypatch.setattr(file_utils, "EXTRACT_WORKERS", 1)
+    sequential = list(file_utils.iter_text_from_bytes(data, "resume.pdf"))
+
+    monkeypatch.setattr(file_utils, "EXTRACT_WORKERS", 2)
+    monkeypatch.setattr(file_utils, "PARALLEL_PAGE_THRESHOLD", 8)
+    try:
+        assert list(file_utils.iter_text_from_bytes(data, "resume.pdf")) == sequential
+        pool = file_utils._pool
+        assert pool is not None
+        assert list(file_utils.iter_text_from_bytes(data, "resume.pdf")) == sequential
+        assert file_utils._pool is pool
+    finally:
+        file_utils.shutdown_extract_pool()
+    assert file_utils._pool is None
+    assert [text.strip() for text in sequential] == [f"page {p} text" for p in range(9)]
+
+
+def test_pool_workers_receive_path_and_page_range(tmp_path, monkeypatch):
+    path = tmp_path / "resume.pdf"
+    path.write_bytes(make_pdf(9))
+    monkeypatch.setattr(file_utils, "EXTRACT_WORKERS", 2)
+    monkeypatch.setattr(file_utils, "PARALLEL_PAGE_THRESHOLD", 8)
+    submitted = []
+    try:
+        pool = file_utils._get_pool()
+        original = pool.submit
+        monkeypatch.setattr(pool, "submit", lambda fn, *args: submitted.append(args) or original(fn, *args))
+        pages = list(file_utils.iter_text_from_path(str(path), "resume.pdf"))
+    finally:
+        file_utils.shutdown_extract_pool()
+    assert [text.strip() for text in pages] == [f"page {p} text" for p in range(9)]
+    assert submitted == [(str(path), 0, 5), (str(path), 5, 9)]
+
+
+def test_save_upload_stops_at_size_limit(monkeypatch):
+    monkeypatch.setattr(file_utils, "MAX_FILE_BYTES", 20)
+    monkeypatch.setattr(file_utils, "UPLOAD_READ_CHUNK", 4)
+    created = []
+    mkstemp = file_utils.tempfile.mkstemp
+    monkeypatch.setattr(file_utils.tempfile, "mkstemp", lambda **kw: created.append(mkstemp(**kw)) or created[-1])
+
+    with pytest.raises(file_utils.FileTooLargeError):
+        file_utils.save_upload(io.BytesIO(b"x" * 21), "resume.txt")
+    assert not os.path.exists(created[0][1])
+
+    path, digest = file_utils.save_upload(io.BytesIO("자기소개".encode()), "resume.txt")
+    try:
+        assert file_utils.extract_text_from_path(path, "resume.txt", digest) == "자기소개"
+    finally:
+        os.unlink(path)
+
+
+def test_upload_endpoint_extracts_from_temp_file(monkeypatch):
+    monkeypatch.setattr(api, "ai_system", CareerAI(retriever_backend="numpy"))
+    api._ready.set()
+    try:
+        client = TestClient(api.app)
+        res = client.post("/api/parse/file", files={"file": ("resume.pdf", make_pdf(2), "application/pdf")})
+        monkeypatch.setattr(api, "MAX_FILE_BYTES", 10)
+        too_large = client.post("/api/parse/file", files={"file": ("resume.txt", b"x" * 11, "text/plain")})
+    finally:
+        api._ready.clear()
+    assert res.status_code == 200 and res.json()["status"] == "success"
+    assert too_large.status_code == 413
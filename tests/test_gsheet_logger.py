@@ -0,0 +1,90 @@
+import sqlite3
+
+import pytest
+
+from monitor import gsheet_logger
+from monitor.gsheet_logger import LocalSink, RealTimeLogger
+
+
+@pytest.fixture
+def make_logger(monkeypatch):
+    monkeypatch.setattr(gsheet_logger, "LOG_RETRY_BASE", 0)
+    loggers = []
+
+    def make(sink):
+        logger = RealTimeLogger("missing-key.json", "sheet", sink=sink, db_path="monitor/service.db",
+                                batch_size=10, flush_interval=0.05)
+        loggers.append(logger)
+        return logger
+
+    yield make
+    for logger in loggers:
+        logger.close()
+
+
+def local_rows(db_path="monitor/service.db"):
+    conn = sqlite3.connect(db_path)
+    try:
+        return conn.execute("SELECT COUNT(*) FROM user_logs").fetchone()[0]
+    finally:
+        conn.close()
+
+
+def test_ships_to_sink_and_saves_locally(make_logger):
+    sink = LocalSink()
+    logger = make_logger(sink)
+    for i in range(3):
+        logger.log(f"user{i}", "click", "detail")
+    assert logger.flush()
+
+    assert [row[1] for row in sink.rows] == ["user0", "user1", "user2"]
+    assert local_rows() == 3
+    assert logger.spill_count() == 0
+
+
+def test_sink_outage_spills_then_resends_in_order(make_logger):
+    sink = LocalSink()
+    logger = make_logger(sink)
+    sink.fail = True
+    logger.log("a", "click", "")
+    assert logger.flush()
+    assert logger.spill_count() == 1
+
+    sink.fail = False
+    logger.log("b", "click", "")
+    assert logger.flush()
+    assert [row[1] for row in sink.rows] == ["a", "b"]
+    assert logger.spill_count() == 0
+
+
+def test_local_write_failure_does_not_lose_batch(make_logger, monkeypatch):
+    sink = LocalSink()
+    logger = make_logger(sink)
+
+    def broken_save(rows):
+        raise sqlite3.OperationalError("disk I/O error")
+
+    monkeypatch.setattr(logger, "_save_local", broken_save)
+    logger.log("a", "click", "")
+    assert logger.flush()
+    # 로컬 저장이 실패해도 시트에는 전송됨
+    assert [row[1] for row in sink.rows] == ["a"]
+
+    sink.fail = True
+    logger.log("b", "click", "")
+    assert logger.flush()
+    assert logger.spill_count() == 1
+
+
+def test_ship_error_spills_batch(make_logger, monkeypatch):
+    sink = LocalSink()
+    logger = make_logger(sink)
+
+    def broken_ship(rows):
+        raise sqlite3.OperationalError("database is locked")
+
+    monkeypatch.setattr(logger, "_ship", broken_ship)
+    logger.log("a", "click", "")
+    assert logger.flush()
+    assert local_rows() == 1
+    assert logger.spill_count() == 1
@@ -0,0 +1,112 @@
+import pytest
+from fastapi.testclient import TestClient
+
+import api
+import user_db
+
+
+@pytest.fixture
+def history():
+    user_db.init_user_db()
+    for i in range(3):
+        user_db.save_message(f"리더십 경험 질문 {i}", f"협업 답변 {i}")
+    user_db.save_message("지원 동기 질문", "성장 가능성 답변")
+    user_db.flush_history()
+    yield
+    user_db.close_user_db()
+
+
+def test_history_search_combines_index_and_like_terms(history):
+    page = user_db.get_history_page(query="리더십 경험")
+    assert len(page["items"]) == 3 and page["scan_limit"] is None
+    # 짧은 검색어는 긴 검색어로 좁힌 결과 안에서만 거름
+    page = user_db.get_history_page(query="리더십 1")
+    assert [item["user_input"] for item in page["items"]] == ["리더십 경험 질문 1"]
+
+
+def test_history_search_finds_two_character_terms(history, monkeypatch):
+    page = user_db.get_history_page(query="지원 동기")
+    assert [item["user_input"] for item in page["items"]] == ["지원 동기 질문"]
+    assert page["scan_limit"] == user_db.HISTORY_LIKE_SCAN_MAX
+
+    # 색인 없이 훑는 범위는 최근 HISTORY_LIKE_SCAN_MAX 건으로 제한
+    monkeypatch.setattr(user_db, "HISTORY_LIKE_SCAN_MAX", 1)
+    assert user_db.get_history_page(query="협업")["items"] == []
+    assert [item["ai_response"] for item in user_db.get_history_page(query="성장")["items"]] == ["성장 가능성 답변"]
+
+
+def test_history_endpoint_requires_admin_token(history, monkeypatch):
+    client = TestClient(api.app)
+
+    monkeypatch.setattr(api, "ADMIN_TOKEN", None)
+    assert client.get("/api/history").status_code == 503
+
+    monkeypatch.setattr(api, "ADMIN_TOKEN", "secret-token")
+    assert client.get("/api/history").status_code == 401
+    assert client.get("/api/history", headers={"X-Admin-Token": "wrong"}).status_code == 401
+
+    headers = {"X-Admin-Token": "secret-token"}
+    res = client.get("/api/history", params={"q": "지원 동기"}, headers=headers)
+    assert res.status_code == 200
+    assert [item["user_input"] for item in res.json()["items"]] == ["지원 동기 질문"]
+    res = client.get("/api/history", params={"q": "성장 가능성"}, headers=headers)
+    assert res.status_code == 200
+    assert [item["ai_response"] for item in res.json()["items"]] == ["성장 가능성 답변"]
+
+
+class FlakyConnection:
+    """앞의 failures 번 커밋만 실패시키는 연결 래퍼"""
+
+    def __init__(self, conn, failures):
+        self.conn = conn
+        self.failures = failures
+
+    def executemany(self, sql, rows):
+        if self.failures:
+            self.failures -= 1
+            raise user_db.sqlite3.OperationalError("database is locked")
+        return self.conn.executemany(sql, rows)
+
+    def __getattr__(self, name):
+        return getattr(self.conn, name)
+
+
+def stored_inputs():
+    conn = user_db._connect()
+    try:
+        return [r[0] for r in conn.execute("SELECT user_input FROM history ORDER BY id")]
+    finally:
+        conn.close()
+
+
+def test_history_writer_retries_then_spills_without_losing_rows(monkeypatch):
+    monkeypatch.setattr(user_db, "HISTORY_RETRY_BASE", 0)
+    writer = user_db.HistoryWriter(flush_interval=0)
+    try:
+        writer.conn = FlakyConnection(writer.conn, failures=user_db.HISTORY_MAX_RETRIES - 1)
+        writer.put("재시도 후 저장", "답변")
+        writer.flush()
+        assert stored_inputs() == ["재시도 후 저장"]
+
+        # 재시도를 모두 실패하면 spill 파일에 보관
+        writer.conn.failures = user_db.HISTORY_MAX_RETRIES
+        writer.put("보관된 기록", "답변")
+        writer.flush()
+        assert writer.spilled == 1 and writer.dropped == 0
+        assert stored_inputs() == ["재시도 후 저장"]
+
+        # 다음 커밋이 성공하면 보관분부터 함께 저장하고 파일을 지움
+        writer.put("다음 기록", "답변")
+        writer.flush()
+        assert stored_inputs() == ["재시도 후 저장", "보관된 기록", "다음 기록"]
+        assert not user_db.os.path.exists(writer.spill_path)
+    finally:
+        writer.close()
+
+
+def test_history_writer_put_gives_up_after_timeout_when_full():
+    writer = user_db.HistoryWriter(queue_size=1, put_timeout=0)
+    writer.close()                      # 저장 스레드가 멈춰서 큐가 비워지지 않음
+    assert writer.put("하나", "답변") is True
+    assert writer.put("둘", "답변") is False
+    assert writer.dropped == 1
@@ -0,0 +1,52 @@
+import json
+
+from career_data import CAREER_TIPS
+from ingest import iter_jsonl, jsonl_origin
+from rag_system import CareerAI
+
+
+def make_ai():
+    return CareerAI(retriever_backend="numpy")
+
+
+def write_jsonl(path, items):
+    path.write_text("\n".join(json.dumps(item, ensure_ascii=False) for item in items), encoding="utf-8")
+
+
+def all_ids(ai):
+    return {doc_id for doc_id, _ in ai.retriever.iter_ids()}
+
+
+def test_seed_and_jsonl_sources_do_not_prune_each_other(workdir):
+    extra = {"category": "면접질문", "source": "JSONL 팁", "content": "JSONL 로만 들어오는 면접 팁입니다."}
+    path = workdir / "tips.jsonl"
+    write_jsonl(path, [extra])
+    seed_ids = {CareerAI.tip_id(t["category"], t["source"], t["content"]) for t in CAREER_TIPS}
+    extra_id = CareerAI.tip_id(extra["category"], extra["source"], extra["content"])
+
+    ai = make_ai()
+    ai.load_data(CAREER_TIPS)
+    result = ai.load_data(iter_jsonl(str(path)), origin=jsonl_origin(str(path)))
+    assert result["deleted"] == 0
+    assert all_ids(ai) == seed_ids | {extra_id}
+
+    # API 워밍업처럼 초기 데이터를 다시 적재해도 JSONL 문서는 남아 있어야 함
+    result = ai.load_data(CAREER_TIPS)
+    assert result == {"added": 0, "unchanged": len(seed_ids), "deleted": 0}
+    assert all_ids(ai) == seed_ids | {extra_id}
+
+
+def test_jsonl_prune_only_removes_its_own_stale_documents(workdir):
+    first = {"category": "직무역량", "source": "A", "content": "처음 파일에만 있던 팁"}
+    second = {"category": "직무역량", "source": "B", "content": "파일을 고친 뒤의 팁"}
+    path = workdir / "tips.jsonl"
+
+    ai = make_ai()
+    ai.load_data(CAREER_TIPS)
+    write_jsonl(path, [first])
+    ai.load_data(iter_jsonl(str(path)), origin=jsonl_origin(str(path)))
+    write_jsonl(path, [second])
+    result = ai.load_data(iter_jsonl(str(path)), origin=jsonl_origin(str(path)))
+
+    assert result == {"added": 1, "unchanged": 0, "deleted": 1}
+    assert ai.retriever.count() == len(CAREER_TIPS) + 1
@@ -0,0 +1,103 @@
+import asyncio
+
+from job_queue import FAILED, SUCCEEDED, JobQueue
+from rag_system import CareerAI
+
+
+async def wait_finished(queue, job_id, timeout=5):
+    for _ in range(int(timeout / 0.02)):
+        job = queue.get(job_id)
+        if job["status"] in (SUCCEEDED, FAILED):
+            return job
+        await asyncio.sleep(0.02)
+    raise AssertionError(f"작업이 끝나지 않음: {queue.get(job_id)}")
+
+
+def make_queue(ai):
+    queue = JobQueue(db_path="monitor/jobs.db", workers=2)
+
+    async def coach(payload):
+        answer, sources = await ai.acoach_job(payload["user_input"], payload.get("mode", "full"),
+                                              payload.get("session_id"))
+        return {"answer": answer, "sources": sources}
+
+    queue.register("coach", coach)
+    return queue
+
+
+def test_dedup_can_be_disabled_per_submit():
+    queue = JobQueue(db_path="monitor/jobs.db")
+    queue.register("coach", None)
+    first, created = queue.submit("coach", {"user_input": "같은 글"})
+    again, created_again = queue.submit("coach", {"user_input": "같은 글"})
+    assert created and not created_again and again["id"] == first["id"]
+
+    fresh, created_fresh = queue.submit("coach", {"user_input": "같은 글"}, dedup=False)
+    assert created_fresh and fresh["id"] != first["id"]
+
+
+def test_session_follow_up_jobs_are_not_deduplicated():
+    ai = CareerAI(retriever_backend="numpy")
+    queue = make_queue(ai)
+    payload = {"user_input": "리더십 경험을 어떻게 쓰면 좋을까요?", "mode": "full", "session_id": "session-0001"}
+
+    async def scenario():
+        await queue.start()
+        try:
+            jobs = []
+            for _ in range(2):
+                job, created = queue.submit("coach", payload, dedup=not payload.get("session_id"))
+                assert created
+                jobs.append(await wait_finished(queue, job["id"]))
+            return jobs
+        finally:
+            await queue.stop()
+
+    first, second = asyncio.run(scenario())
+    assert first["status"] == second["status"] == SUCCEEDED
+    # 두 번째 턴은 첫 턴을 맥락으로 포함한 프롬프트라서 답이 달라짐
+    assert first["result"]["answer"] != second["result"]["answer"]
+
+
+def test_coach_job_without_api_key_fails_cleanly():
+    ai = CareerAI(retriever_backend="numpy")
+    ai.llm = None
+    queue = make_queue(ai)
+
+    async def scenario():
+        await queue.start()
+        try:
+            job, _ = queue.submit("coach", {"user_input": "자소서 내용", "mode": "full", "session_id": None})
+            return await wait_finished(queue, job["id"])
+        finally:
+            await queue.stop()
+
+    job = asyncio.run(scenario())
+    assert job["status"] == FAILED
+    assert job["error"] == "API 키가 없습니다."
+
+
+def test_api_lifecycle_survives_failed_warm_up(monkeypatch):
+    import os
+    import time
+
+    from fastapi.testclient import TestClient
+
+    import api
+
+    assert api.job_queue is None and not os.path.exists("monitor/jobs.db")   # import 만으로는 만들지 않음
+    monkeypatch.setattr(api, "job_queue", None)
+    monkeypatch.setitem(api.startup, "error", None)
+    monkeypatch.setattr(api, "READY_POLL_INTERVAL", 0.01)
+    monkeypatch.setattr(api, "_warm_up", lambda: api.startup.update(error="모델 로딩 실패"))
+
+    with TestClient(api.app) as client:
+        assert client.get("/ready").json()["status"] == "failed"
+        assert client.get("/api/jobs/unknown").status_code == 404
+        starter = api.app.state.job_starter
+        for _ in range(100):
+            if starter.done():
+                break
+            time.sleep(0.01)
+        assert starter.done() and not starter.cancelled()   # 실패를 알아채고 스스로 끝남
+    assert api.job_queue._tasks == []   # 작업자는 시작하지 않음
@@ -0,0 +1,34 @@
+from embedding_cache import HashEmbeddingFunction
+from law_index import LawIndex
+
+
+def article(text, effective_date):
+    return {"law_name": "근로기준법", "article_no": "제26조", "article_title": "해고의 예고",
+            "effective_date": effective_date, "text": text}
+
+
+def test_reingest_replaces_previous_version_of_article(tmp_path):
+    index = LawIndex(path=str(tmp_path / "law_db"), embedding_function=HashEmbeddingFunction())
+    other = {"source": "민법 제750조(불법행위의 내용)", "content": "고의 또는 과실로 인한 위법행위로 타인에게 손해를 가한 자는 배상할 책임이 있다."}
+    old = article("① 사용자는 근로자를 해고하려면 30일 전에 예고를 하여야 한다. ② 예고를 하지 아니하면 30일분 이상의 통상임금을 지급하여야 한다.", "2019-01-15")
+    stats = index.ingest([other, old])
+    assert stats["added"] == 3 and index.count() == 3
+
+    # 항이 하나로 바뀐 개정 조문 → 이전 버전의 두 항은 삭제
+    new = article("사용자는 근로자를 해고하려면 적어도 30일 전에 예고를 하여야 한다.", "2021-05-18")
+    stats = index.ingest([new], batch_size=1)
+    assert stats == {**stats, "added": 1, "removed": 2}
+    assert index.count() == 2
+    hits = index.search("해고 예고", top_k=5, law_name="근로기준법")
+    assert [h["effective_date"] for h in hits] == ["2021-05-18"]
+
+    # 같은 버전을 다시 넣으면 아무것도 바뀌지 않음
+    assert index.ingest([new])["added"] == 0
+    assert index.count() == 2
+
+
+def test_same_article_twice_in_one_batch_keeps_last(tmp_path):
+    index = LawIndex(path=str(tmp_path / "law_db"), embedding_function=HashEmbeddingFunction())
+    index.ingest([article("첫 번째 버전 본문입니다.", "2019-01-15"), article("두 번째 버전 본문입니다.", "2021-05-18")])
+    hits = index.search("버전 본문", top_k=5)
+    assert [h["effective_date"] for h in hits] == ["2021-05-18"]
@@ -0,0 +1,196 @@
+import asyncio
+import json
+import threading
+import time
+
+import pytest
+
+import llm_client
+from llm_client import BATCH, INTERACTIVE, FakeLLMBackend, FakeLLMError, LLMClient, PrioritySlots
+
+
+# ------------------------------------------------------------------
+# 우선순위 슬롯
+# ------------------------------------------------------------------
+def test_slots_serve_interactive_before_batch_then_fifo():
+    async def scenario():
+        slots = PrioritySlots(1)
+        await slots.acquire(BATCH)
+        order = []
+
+        async def worker(name, priority):
+            await slots.acquire(priority)
+            order.append(name)
+            slots.release()
+
+        tasks = []
+        for name, priority in [("batch-1", BATCH), ("interactive", INTERACTIVE), ("batch-2", BATCH)]:
+            tasks.append(asyncio.create_task(worker(name, priority)))
+            await asyncio.sleep(0)
+        slots.release()
+        await asyncio.gather(*tasks)
+        return order
+
+    assert asyncio.run(scenario()) == ["interactive", "batch-1", "batch-2"]
+
+
+def test_reserved_slot_is_interactive_only():
+    async def scenario():
+        slots = PrioritySlots(2, reserved=1)
+        await slots.acquire(BATCH)
+        batch = asyncio.create_task(slots.acquire(BATCH))
+        await asyncio.sleep(0)
+        assert not batch.done()
+        await asyncio.wait_for(slots.acquire(INTERACTIVE), 1)
+        assert slots.in_use == 2
+        batch.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await batch
+        # 기다리다 취소한 요청은 자리를 차지하지 않음
+        slots.release()
+        slots.release()
+        assert slots.in_use == 0
+
+    asyncio.run(scenario())
+
+
+def test_sync_and_async_callers_share_slots():
+    slots = PrioritySlots(1)
+    slots.acquire_sync(BATCH)
+    acquired = threading.Event()
+
+    def sync_waiter():
+        slots.acquire_sync(INTERACTIVE)
+        acquired.set()
+
+    thread = threading.Thread(target=sync_waiter)
+    thread.start()
+    assert not acquired.wait(0.05)
+
+    async def async_waiter():
+        await slots.acquire(BATCH)
+
+    # 비동기 BATCH 는 먼저 기다리던 동기 INTERACTIVE 뒤에 배정됨
+    def release_later():
+        time.sleep(0.05)
+        slots.release()          # → 동기 INTERACTIVE
+        acquired.wait(1)
+        slots.release()          # → 비동기 BATCH
+
+    releaser = threading.Thread(target=release_later)
+    releaser.start()
+    asyncio.run(asyncio.wait_for(async_waiter(), 2))
+    thread.join(1)
+    releaser.join(1)
+    assert acquired.is_set()
+    assert slots.in_use == 1
+
+
+# ------------------------------------------------------------------
+# LLMClient
+# ------------------------------------------------------------------
+class _CountingBackend(FakeLLMBackend):
+    """동시에 몇 개의 호출이 backend 에 들어와 있었는지 기록"""
+
+    def __init__(self, latency):
+        super().__init__(latency=latency)
+        self.active = 0
+        self.peak = 0
+
+    def generate_content(self, prompt, generation_config=None, stream=False, **kwargs):
+        with self._lock:
+            self.active += 1
+            self.peak = max(self.peak, self.active)
+        try:
+            return super().generate_content(prompt, generation_config, stream, **kwargs)
+        finally:
+            with self._lock:
+                self.active -= 1
+
+
+def test_sync_generate_respects_concurrency_limit():
+    backend = _CountingBackend(latency=0.02)
+    client = LLMClient(backend, max_concurrency=2, rpm=0, tpm=0, interactive_reserved=0)
+    threads = [threading.Thread(target=client.generate, args=(f"prompt {i}", "test")) for i in range(6)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert backend.calls == 6
+    assert backend.peak == 2
+
+
+def test_quota_wait_does_not_hold_a_slot(monkeypatch):
+    client = LLMClient(FakeLLMBackend(), max_concurrency=1, rpm=0, tpm=0, interactive_reserved=0)
+    waits = iter([0.2, 0.0])
+    monkeypatch.setattr(client, "_reserve", lambda prompt: (next(waits), 1))
+
+    async def scenario():
+        slow = asyncio.create_task(client.agenerate("rate limited", "test"))
+        await asyncio.sleep(0.05)
+        # 앞 요청이 할당량을 기다리는 동안 슬롯은 비어 있음
+        assert client._slots.in_use == 0
+        await asyncio.wait_for(client.agenerate("next", "test"), 0.1)
+        await slow
+
+    asyncio.run(scenario())
+
+
+def test_retries_retryable_errors_then_raises(monkeypatch):
+    monkeypatch.setattr(llm_client, "backoff_delay", lambda attempt: 0)
+    backend = FakeLLMBackend(error_rate=1.0)
+    client = LLMClient(backend, rpm=0, tpm=0, max_retries=2)
+    with pytest.raises(FakeLLMError):
+        client.generate("always fails", "test")
+    assert backend.calls == 3
+    with pytest.raises(FakeLLMError):
+        asyncio.run(client.agenerate("always fails", "test"))
+    assert backend.calls == 6
+
+
+# ------------------------------------------------------------------
+# 가짜 백엔드
+# ------------------------------------------------------------------
+def test_fake_backend_is_deterministic_and_schema_shaped():
+    backend = FakeLLMBackend()
+    first = backend.generate_content("같은 프롬프트")
+    assert backend.generate_content("같은 프롬프트").text == first.text
+    assert backend.generate_content("다른 프롬프트").text != first.text
+    assert first.usage_metadata.candidates_token_count > 0
+
+    data = json.loads(backend.generate_content("파싱", generation_config={"response_mime_type": "application/json"}).text)
+    assert {"summary", "items", "closing", "experiences"} <= set(data)
+
+
+def test_fake_backend_streams_with_usage_on_last_chunk():
+    backend = FakeLLMBackend()
+    full = backend.generate_content("스트리밍").text
+    chunks = list(backend.generate_content("스트리밍", stream=True))
+    assert "".join(c.text for c in chunks) == full
+    assert all(c.usage_metadata is None for c in chunks[:-1])
+    assert chunks[-1].usage_metadata is not None
+
+    client = LLMClient(backend, rpm=0, tpm=0)
+    assert "".join(client.stream("스트리밍", "test")) == full
+
+    async def collect():
+        return "".join([text async for text in client.astream("스트리밍", "test")])
+
+    assert asyncio.run(collect()) == full
+
+
+def test_fake_backend_error_rate_is_seeded():
+    def pattern(seed):
+        backend = FakeLLMBackend(error_rate=0.5, seed=seed)
+        out = []
+        for i in range(20):
+            try:
+                backend.generate_content(f"p{i}")
+                out.append(True)
+            except FakeLLMError as e:
+                assert e.code == 429
+                out.append(False)
+        return out
+
+    assert pattern(1) == pattern(1)
+    assert not all(pattern(1))
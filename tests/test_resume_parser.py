@@ -0,0 +1,33 @@
+import re
+
+from resume_parser import split_resume
+
+
+def squash(text):
+    return re.sub(r"\s+", "", text)
+
+
+def test_long_lines_are_split_without_losing_text():
+    sentence = "고객 데이터 파이프라인을 설계하고 운영 비용을 절감했습니다. "
+    raw_text = "\n".join([
+        "2019.03 ~ 2021.02 주식회사 가나다",
+        sentence * 40,                 # 문장 경계가 있는 긴 줄
+        "x" * 700,                     # 경계가 전혀 없는 긴 줄
+        "2021.03 ~ 현재 (주)라마바",
+        "짧은 성과 요약",
+    ])
+
+    chunks = split_resume(raw_text, max_chars=300)
+
+    assert len(chunks) > 1
+    assert all(len(chunk) <= 300 for chunk in chunks)
+    assert squash("".join(chunks)) == squash(raw_text)
+    # 문장이 중간에서 잘리지 않음
+    for chunk in chunks:
+        for line in chunk.splitlines():
+            if line.startswith("고객"):
+                assert line.rstrip().endswith("했습니다.")
+
+
+def test_short_resume_is_single_chunk():
+    assert split_resume("짧은 이력서", max_chars=300) == ["짧은 이력서"]
@@ -0,0 +1,105 @@
+import json
+import os
+
+import pytest
+
+from career_data import CAREER_TIPS
+from embedding_cache import HashEmbeddingFunction
+from ingest import content_id
+from retrievers import NumpyRetriever, Retriever, SnapshotRetriever, recall_at_k
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+BACKENDS = ["numpy", "snapshot", "chroma"]
+
+DOCS = {
+    "a": ("면접에서는 STAR 기법으로 경험을 구조화해서 답변하세요.", {"category": "interview"}),
+    "b": ("자기소개서는 지원 동기와 직무 역량을 구체적인 수치로 보여주세요.", {"category": "resume"}),
+    "c": ("포트폴리오에는 문제 정의와 해결 과정을 함께 적으세요.", {"category": "resume"}),
+}
+
+
+def make_backend(name, path):
+    embedding_fn = HashEmbeddingFunction()
+    if name == "numpy":
+        return NumpyRetriever(embedding_fn, index_dir=os.path.join(path, "numpy"))
+    if name == "snapshot":
+        return SnapshotRetriever(embedding_fn, snapshot_dir=os.path.join(path, "snapshots"), poll_seconds=0)
+    chromadb = pytest.importorskip("chromadb")
+    from retrievers import ChromaRetriever
+    client = chromadb.PersistentClient(path=os.path.join(path, "chroma"))
+    return ChromaRetriever(client.get_or_create_collection(
+        name="test", embedding_function=embedding_fn, metadata={"hnsw:space": "cosine"}
+    ))
+
+
+@pytest.fixture(params=BACKENDS)
+def backend(request, tmp_path):
+    return make_backend(request.param, str(tmp_path))
+
+
+def load(backend, keys=("a", "b", "c")):
+    backend.add(list(keys), [DOCS[k][0] for k in keys], [DOCS[k][1] for k in keys])
+
+
+def test_retriever_requires_full_interface():
+    with pytest.raises(TypeError):
+        Retriever()
+
+    class Partial(Retriever):
+        def count(self):
+            return 0
+
+    with pytest.raises(TypeError):
+        Partial()
+
+
+def test_add_count_and_existing_ids(backend):
+    assert backend.count() == 0
+    load(backend, ("a", "b"))
+    load(backend, ("b", "c"))  # 이미 있는 id 는 건너뜀
+    assert backend.count() == 3
+    assert backend.existing_ids(["a", "c", "z"]) == {"a", "c"}
+    assert sorted(doc_id for doc_id, _ in backend.iter_ids()) == ["a", "b", "c"]
+
+
+def test_query_ranks_same_text_first(backend):
+    load(backend)
+    result = backend.query([DOCS["b"][0], DOCS["a"][0]], 2)
+    assert [ids[0] for ids in result["ids"]] == ["b", "a"]
+    assert all(len(ids) == 2 for ids in result["ids"])
+    assert result["distances"][0][0] == pytest.approx(0, abs=1e-4)
+    assert result["documents"][0][0] == DOCS["b"][0]
+    assert result["metadatas"][0][0] == DOCS["b"][1]
+
+
+def test_query_category_filter(backend):
+    load(backend)
+    result = backend.query([DOCS["a"][0]], 3, where={"category": "resume"})
+    assert sorted(result["ids"][0]) == ["b", "c"]
+
+
+def test_upsert_and_delete(backend):
+    load(backend)
+    backend.upsert(["a"], ["면접 질문에는 두괄식으로 답하세요."], [{"category": "interview"}])
+    assert backend.count() == 3
+    assert backend.query(["면접 질문에는 두괄식으로 답하세요."], 1)["ids"] == [["a"]]
+
+    backend.delete(["a", "b"])
+    assert backend.count() == 1
+    assert backend.existing_ids(["a", "b", "c"]) == {"c"}
+    assert backend.query([DOCS["a"][0]], 3)["ids"] == [["c"]]
+
+
+def test_recall_matches_chroma_on_career_tips(tmp_path):
+    pytest.importorskip("chromadb")
+    ids = [content_id(t["category"], t["source"], t["content"]) for t in CAREER_TIPS]
+    docs = [t["content"] for t in CAREER_TIPS]
+    metas = [{"category": t["category"], "source": t["source"]} for t in CAREER_TIPS]
+    backends = {name: make_backend(name, str(tmp_path)) for name in BACKENDS}
+    for backend in backends.values():
+        backend.add(ids, docs, metas)
+
+    with open(os.path.join(REPO_ROOT, "dummy_personas.json"), encoding="utf-8") as f:
+        queries = [p["raw_input"] for p in json.load(f)["personas"]]
+    for name in ("numpy", "snapshot"):
+        assert recall_at_k(backends["chroma"], backends[name], queries, 3) == pytest.approx(1.0)
@@ -0,0 +1,36 @@
+from fastapi.testclient import TestClient
+
+import api
+import user_db
+from monitor.rollups import RollupStore
+
+
+def test_only_error_prefixes_count_as_failures():
+    user_db.init_user_db()
+    answers = [
+        "분석 중 에러: 429 quota exceeded",
+        "코칭 중 에러: timeout",
+        "API 키가 없습니다.",
+        "에러 처리 경험을 구체적으로 적어보세요.",        # 본문에 "에러" 가 있는 정상 답변
+        "좋은 답변입니다. 코칭 중 에러: 라는 문구를 인용",   # 중간에 나오는 것도 정상
+    ]
+    for answer in answers:
+        user_db.save_message("자소서", answer)
+    user_db.flush_history()
+    user_db.close_user_db()
+
+    store = RollupStore(db_path="monitor/analytics.db", history_db=user_db.DB_NAME,
+                        service_log_db="monitor/service.db")
+    assert store.refresh()["history"] == len(answers)
+    [coaching] = [a for a in store.dashboard()["actions"] if a["source"] == "history"]
+    assert coaching == {"source": "history", "action": "coaching", "requests": 5, "errors": 3}
+    store.close()
+
+
+def test_analytics_endpoint_requires_admin_token(monkeypatch):
+    client = TestClient(api.app)
+    monkeypatch.setattr(api, "ADMIN_TOKEN", "secret-token")
+    assert client.get("/api/admin/analytics").status_code == 401
+    res = client.get("/api/admin/analytics", headers={"X-Admin-Token": "secret-token"})
+    assert res.status_code == 200
+    assert res.json()["status"] == "success"
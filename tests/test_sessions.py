@@ -0,0 +1,62 @@
+import asyncio
+
+from fastapi.testclient import TestClient
+
+import api
+import rag_system
+from rag_system import CareerAI
+
+SESSION_ID = "session-0001"
+
+
+def failing_summary(original):
+    def call(prompt, stage, *args, **kwargs):
+        if stage == "session_summary":
+            raise RuntimeError("summary backend down")
+        return original(prompt, stage, *args, **kwargs)
+    return call
+
+
+def test_summary_failure_keeps_turn_and_previous_summary(monkeypatch):
+    ai = CareerAI(retriever_backend="numpy")
+    monkeypatch.setattr(ai.llm, "generate", failing_summary(ai.llm.generate))
+
+    answers = [ai.get_coaching(f"{i}번째 자소서 문단입니다.", session_id=SESSION_ID)[0] for i in range(3)]
+    assert not any(a.startswith(("분석 중 에러:", "코칭 중 에러:")) for a in answers)
+    summary, turns = ai.sessions.get_context(SESSION_ID)
+    assert summary == "" and len(turns) == 3   # 요약 실패 → 턴 원문을 그대로 두고 다음에 다시 시도
+
+    monkeypatch.undo()
+    ai.get_coaching("네 번째 문단입니다.", session_id=SESSION_ID)
+    summary, turns = ai.sessions.get_context(SESSION_ID)
+    assert summary and len(turns) == ai.sessions.recent_turns
+
+
+def test_async_summary_failure_is_swallowed(monkeypatch):
+    ai = CareerAI(retriever_backend="numpy")
+    for i in range(3):
+        ai.sessions.append_turn(SESSION_ID, f"질문 {i}", f"답변 {i}")
+
+    async def fail(prompt, stage, *args, **kwargs):
+        raise RuntimeError("summary backend down")
+
+    monkeypatch.setattr(ai.llm, "agenerate", fail)
+    asyncio.run(ai._aroll_session(SESSION_ID))
+    summary, turns = ai.sessions.get_context(SESSION_ID)
+    assert summary == "" and len(turns) == 3
+
+
+def test_reset_session_without_api_key_is_noop(monkeypatch):
+    monkeypatch.setattr(rag_system, "create_backend", lambda: None)
+    ai = CareerAI(retriever_backend="numpy")
+    assert ai.llm is None
+    assert ai.reset_session(SESSION_ID) is False
+
+    monkeypatch.setattr(api, "ai_system", ai)
+    api._ready.set()
+    try:
+        res = TestClient(api.app).delete(f"/api/sessions/{SESSION_ID}")
+    finally:
+        api._ready.clear()
+    assert res.status_code == 200
+    assert res.json() == {"status": "success", "deleted": False}
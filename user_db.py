@@ -2,22 +2,48 @@ import sqlite3
 import pandas as pd
 from datetime import datetime
 import os  # 폴더 생성을 위해 추가
+import atexit
+import json
+import logging
+import queue
+import threading
+import time
+from monitor.metrics import metrics
 
 # DB 파일 경로 설정
 DB_FOLDER = "monitor"
 DB_NAME = f"{DB_FOLDER}/user_history.db"
 
+# 백그라운드 저장 설정 (환경변수로 조정 가능)
+HISTORY_QUEUE_SIZE = int(os.getenv("HISTORY_QUEUE_SIZE", "10000"))
+HISTORY_BATCH_SIZE = int(os.getenv("HISTORY_BATCH_SIZE", "200"))
+HISTORY_FLUSH_INTERVAL = float(os.getenv("HISTORY_FLUSH_INTERVAL", "0.5"))  # 초
+HISTORY_PUT_TIMEOUT = float(os.getenv("HISTORY_PUT_TIMEOUT", "1"))  # 큐가 가득 찼을 때 요청 스레드가 기다리는 최대 시간 (초)
+HISTORY_MAX_RETRIES = int(os.getenv("HISTORY_MAX_RETRIES", "3"))
+HISTORY_RETRY_BASE = float(os.getenv("HISTORY_RETRY_BASE", "0.2"))  # 초 (재시도마다 2배)
+# 커밋이 계속 실패한 기록을 보관하는 파일 (DB 자체가 문제일 수 있으므로 DB 밖에 둠, 다음 커밋 때 다시 저장)
+HISTORY_SPILL_PATH = os.getenv("HISTORY_SPILL_PATH", f"{DB_FOLDER}/history_spill.jsonl")
+
+logger = logging.getLogger(__name__)
+
+def _connect():
+    """WAL 모드 연결 (읽기와 쓰기가 서로 막지 않음, 여러 워커가 써도 database is locked 방지)"""
+    conn = sqlite3.connect(DB_NAME, timeout=30, check_same_thread=False)
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.execute("PRAGMA synchronous=NORMAL")
+    return conn
+
 def init_user_db():
     """사용자 데이터 저장용 DB 테이블 생성"""
-    
+
     # 🔥 [핵심 수정] 폴더가 없으면 자동으로 생성
     if not os.path.exists(DB_FOLDER):
         os.makedirs(DB_FOLDER)
         print(f"📂 '{DB_FOLDER}' 폴더를 생성했습니다.")
 
-    conn = sqlite3.connect(DB_NAME)
+    conn = _connect()
     cursor = conn.cursor()
-    
+
     # 테이블 생성
     cursor.execute('''
         CREATE TABLE IF NOT EXISTS history (
@@ -27,26 +53,237 @@ def init_user_db():
             ai_response TEXT
         )
     ''')
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_history_timestamp ON history(timestamp, id)")
+    _init_history_fts(conn)
     conn.commit()
     conn.close()
 
+def _init_history_fts(conn):
+    """
+    관리자 검색용 FTS5 전문 검색 인덱스 (trigram: 한글 부분 문자열 검색 가능)
+    history 테이블에 트리거로 자동 동기화됨
+    """
+    exists = conn.execute(
+        "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'history_fts'"
+    ).fetchone()
+    try:
+        conn.executescript('''
+            CREATE VIRTUAL TABLE IF NOT EXISTS history_fts USING fts5(
+                user_input, ai_response, content='history', content_rowid='id', tokenize='trigram'
+            );
+            CREATE TRIGGER IF NOT EXISTS history_fts_ai AFTER INSERT ON history BEGIN
+                INSERT INTO history_fts(rowid, user_input, ai_response) VALUES (new.id, new.user_input, new.ai_response);
+            END;
+            CREATE TRIGGER IF NOT EXISTS history_fts_ad AFTER DELETE ON history BEGIN
+                INSERT INTO history_fts(history_fts, rowid, user_input, ai_response) VALUES ('delete', old.id, old.user_input, old.ai_response);
+            END;
+            CREATE TRIGGER IF NOT EXISTS history_fts_au AFTER UPDATE ON history BEGIN
+                INSERT INTO history_fts(history_fts, rowid, user_input, ai_response) VALUES ('delete', old.id, old.user_input, old.ai_response);
+                INSERT INTO history_fts(rowid, user_input, ai_response) VALUES (new.id, new.user_input, new.ai_response);
+            END;
+        ''')
+        # 인덱스를 처음 만들 때 기존 기록도 색인
+        if not exists:
+            conn.execute("INSERT INTO history_fts(history_fts) VALUES ('rebuild')")
+    except sqlite3.OperationalError as e:
+        # FTS5 가 없는 SQLite 빌드 → LIKE 검색으로 대체
+        print(f"⚠️ 전문 검색 인덱스 생성 실패 (LIKE 검색 사용): {e}")
+
+def _has_fts(conn):
+    return conn.execute(
+        "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'history_fts'"
+    ).fetchone() is not None
+
+
+class HistoryWriter:
+    """
+    채팅 기록 백그라운드 저장기 (프로세스당 1개)
+    - 요청 처리 쪽은 큐에 넣기만 하고 바로 반환 (fsync 대기 없음)
+    - 백그라운드 스레드가 연결 1개를 유지하면서 여러 건을 한 트랜잭션으로 묶어 커밋
+    - 커밋 실패 시 재시도(지수 백오프), 그래도 실패하면 spill 파일에 보관했다가 다음 커밋 때 다시 저장
+    - 종료 시 남은 기록을 모두 저장 (flush / close)
+    """
+
+    def __init__(self, queue_size=HISTORY_QUEUE_SIZE, batch_size=HISTORY_BATCH_SIZE,
+                 flush_interval=HISTORY_FLUSH_INTERVAL, put_timeout=HISTORY_PUT_TIMEOUT,
+                 spill_path=HISTORY_SPILL_PATH):
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.put_timeout = put_timeout
+        self.spill_path = spill_path
+        self.queue = queue.Queue(maxsize=queue_size)
+        self.written = 0
+        self.dropped = 0
+        self.spilled = 0
+        self._closed = False
+        init_user_db()
+        self.conn = _connect()
+        self.thread = threading.Thread(target=self._run, name="history-writer", daemon=True)
+        self.thread.start()
+
+    def put(self, user_input, ai_response):
+        """
+        기록 1건을 큐에 넣음
+        - 평소에는 바로 반환
+        - 큐가 가득 차면 호출한 (요청 처리) 스레드가 최대 put_timeout 초 동안 막힘
+          (쓰기 속도가 못 따라갈 때의 역압력), 그래도 자리가 없으면 버리고 False
+        - put_timeout=0 이면 기다리지 않고 바로 버림
+        """
+        now = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+        try:
+            if self.put_timeout > 0:
+                self.queue.put((now, user_input, ai_response), timeout=self.put_timeout)
+            else:
+                self.queue.put_nowait((now, user_input, ai_response))
+            return True
+        except queue.Full:
+            self.dropped += 1
+            metrics.inc("history_dropped")
+            logger.warning("기록 저장 큐가 가득 차서 1건을 버렸습니다.")
+            return False
+
+    def flush(self, timeout=10):
+        """지금까지 넣은 기록이 모두 커밋될 때까지 대기"""
+        done = threading.Event()
+        self.queue.put(done)
+        return done.wait(timeout)
+
+    def close(self):
+        if self._closed:
+            return
+        self._closed = True
+        self.queue.put(None)
+        self.thread.join(timeout=10)
+        self.conn.close()
+
+    def _run(self):
+        while True:
+            item = self.queue.get()
+            batch, markers, stop = [], [], False
+            deadline = None
+            while True:
+                if item is None:
+                    stop = True
+                elif isinstance(item, threading.Event):
+                    markers.append(item)
+                else:
+                    batch.append(item)
+                    if deadline is None:
+                        deadline = time.monotonic() + self.flush_interval
+
+                if stop or markers or len(batch) >= self.batch_size:
+                    break
+                # 최대 flush_interval 동안 더 모아서 한 번에 커밋
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                try:
+                    item = self.queue.get(timeout=remaining)
+                except queue.Empty:
+                    break
+
+            if batch:
+                self._commit(batch)
+            for marker in markers:
+                marker.set()
+            if stop:
+                return
+
+    def _commit(self, rows):
+        """묶음 커밋 (이전에 보관한 기록 포함) - 재시도해도 실패하면 이번 묶음을 spill 파일에 보관"""
+        spilled = self._load_spill()
+        pending = spilled + rows
+        for attempt in range(HISTORY_MAX_RETRIES):
+            try:
+                with metrics.span("db_history_commit"):
+                    self.conn.executemany('''
+                        INSERT INTO history (timestamp, user_input, ai_response)
+                        VALUES (?, ?, ?)
+                    ''', pending)
+                    self.conn.commit()
+                self.written += len(pending)
+                if spilled:
+                    self._clear_spill()
+                return True
+            except sqlite3.Error as e:
+                metrics.inc("history_write_errors")
+                try:
+                    self.conn.rollback()
+                except sqlite3.Error:
+                    pass
+                if attempt == HISTORY_MAX_RETRIES - 1:
+                    logger.error("기록 %d건 커밋 실패 (spill 파일에 보관): %s", len(pending), e)
+                    break
+                logger.warning("기록 커밋 실패 (재시도 %d/%d): %s", attempt + 1, HISTORY_MAX_RETRIES - 1, e)
+                time.sleep(HISTORY_RETRY_BASE * (2 ** attempt))
+        # 이전 보관분은 파일에 그대로 있으므로 이번 묶음만 덧붙임
+        self._spill(rows)
+        return False
+
+    def _spill(self, rows):
+        try:
+            folder = os.path.dirname(self.spill_path)
+            if folder:
+                os.makedirs(folder, exist_ok=True)
+            with open(self.spill_path, "a", encoding="utf-8") as f:
+                for row in rows:
+                    f.write(json.dumps(list(row), ensure_ascii=False) + "\n")
+            self.spilled += len(rows)
+            metrics.inc("history_spilled", len(rows))
+        except OSError as e:
+            self.dropped += len(rows)
+            metrics.inc("history_dropped", len(rows))
+            logger.error("기록 %d건 보관 실패 (유실): %s", len(rows), e)
+
+    def _load_spill(self):
+        if not os.path.exists(self.spill_path):
+            return []
+        try:
+            with open(self.spill_path, encoding="utf-8") as f:
+                return [tuple(json.loads(line)) for line in f if line.strip()]
+        except (OSError, ValueError) as e:
+            logger.error("보관된 기록을 읽지 못했습니다 (%s): %s", self.spill_path, e)
+            return []
+
+    def _clear_spill(self):
+        try:
+            os.remove(self.spill_path)
+        except OSError as e:
+            # 지우지 못하면 다음 커밋 때 같은 기록이 한 번 더 저장될 수 있음
+            logger.warning("보관 파일 삭제 실패 (%s): %s", self.spill_path, e)
+
+
+_writer = None
+_writer_pid = None
+_writer_lock = threading.Lock()
+
+def get_history_writer():
+    """프로세스당 하나의 저장기 (fork 된 워커에서는 새로 만듦)"""
+    global _writer, _writer_pid
+    with _writer_lock:
+        if _writer is None or _writer_pid != os.getpid():
+            _writer = HistoryWriter()
+            _writer_pid = os.getpid()
+            atexit.register(_writer.close)
+        return _writer
+
 def save_message(user_input, ai_response):
-    """채팅 내용 저장"""
-    # 저장 전에도 폴더 확인 (안전장치)
-    if not os.path.exists(DB_FOLDER):
-        os.makedirs(DB_FOLDER)
+    """채팅 내용 저장 (백그라운드 큐에 넣고 바로 반환)"""
+    with metrics.span("db_save_message"):
+        get_history_writer().put(user_input, ai_response)
 
-    conn = sqlite3.connect(DB_NAME)
-    cursor = conn.cursor()
-    now = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-    
-    cursor.execute('''
-        INSERT INTO history (timestamp, user_input, ai_response) 
-        VALUES (?, ?, ?)
-    ''', (now, user_input, ai_response))
-    
-    conn.commit()
-    conn.close()
+def flush_history(timeout=10):
+    """대기 중인 기록을 즉시 저장 (관리자 화면 조회 직전 등)"""
+    if _writer is not None and _writer_pid == os.getpid():
+        return _writer.flush(timeout)
+    return True
+
+def close_user_db():
+    """서버 종료 시 호출 - 남은 기록 저장 후 연결 종료"""
+    global _writer
+    if _writer is not None and _writer_pid == os.getpid():
+        _writer.close()
+        _writer = None
 
 def get_all_history():
     """저장된 모든 데이터 가져오기"""
@@ -54,7 +291,80 @@ def get_all_history():
     if not os.path.exists(DB_NAME):
         return pd.DataFrame(columns=["id", "timestamp", "user_input", "ai_response"])
 
+    flush_history()
     conn = sqlite3.connect(DB_NAME)
     df = pd.read_sql_query("SELECT * FROM history ORDER BY id DESC", conn)
     conn.close()
-    return df
\ No newline at end of file
+    return df
+
+# trigram 인덱스는 3글자 이상 검색어만 찾을 수 있음 (더 짧으면 LIKE 로 찾음)
+FTS_MIN_QUERY_LEN = 3
+HISTORY_PAGE_MAX = 200
+# 색인을 못 쓰는 검색 (2글자 이하 검색어만 있거나 FTS5 가 없는 SQLite 빌드) 에서 LIKE 로 훑는 최근 기록 수 상한 (전체 테이블 스캔 방지)
+HISTORY_LIKE_SCAN_MAX = int(os.getenv("HISTORY_LIKE_SCAN_MAX", "5000"))
+
+def get_history_page(limit=50, cursor=None, query=None, start=None, end=None):
+    """
+    채팅 기록 페이지 조회 (최신순, keyset 페이지네이션)
+    - cursor: 이전 페이지의 next_cursor (마지막 행 id) → 그보다 오래된 기록부터
+    - query : 질문/답변 전문 검색어 (공백으로 나누면 AND 검색)
+              3글자 이상 검색어는 전문 검색 색인으로 찾고, 짧은 검색어는 그 결과 안에서 LIKE 로 거름
+              2글자 이하 검색어만 있으면 ("성실", "면접") 최근 HISTORY_LIKE_SCAN_MAX 건 안에서 LIKE 검색
+    - start/end: "YYYY-MM-DD HH:MM:SS" 형식 기간 필터 (timestamp 인덱스 사용)
+    반환: {"items": [...], "next_cursor": id 또는 None,
+           "scan_limit": 최근 N 건 안에서만 찾았으면 N, 전체를 찾았으면 None}
+    """
+    limit = max(1, min(int(limit), HISTORY_PAGE_MAX))
+    terms = (query or "").split()
+    long_terms = [t for t in terms if len(t) >= FTS_MIN_QUERY_LEN]
+    short_terms = [t for t in terms if len(t) < FTS_MIN_QUERY_LEN]
+    if not os.path.exists(DB_NAME):
+        return {"items": [], "next_cursor": None, "scan_limit": None}
+    flush_history()
+
+    where, params = [], []
+    if cursor is not None:
+        where.append("h.id < ?")
+        params.append(int(cursor))
+    if start:
+        where.append("h.timestamp >= ?")
+        params.append(start)
+    if end:
+        where.append("h.timestamp < ?")
+        params.append(end)
+
+    conn = _connect()
+    try:
+        source = "history h"
+        like_terms = short_terms
+        scan_limit = None
+        if terms:
+            if long_terms and _has_fts(conn):
+                source = "history_fts f JOIN history h ON h.id = f.rowid"
+                where.append("history_fts MATCH ?")
+                params.append(" ".join('"' + t.replace('"', '""') + '"' for t in long_terms))
+            else:
+                # 색인을 못 쓰면 (짧은 검색어만 있거나 FTS5 없음) 최근 HISTORY_LIKE_SCAN_MAX 건 안에서만 검색
+                like_terms = terms
+                scan_limit = HISTORY_LIKE_SCAN_MAX
+                where.append("h.id > (SELECT COALESCE(MAX(id), 0) FROM history) - ?")
+                params.append(HISTORY_LIKE_SCAN_MAX)
+            for t in like_terms:
+                where.append("(h.user_input LIKE ? OR h.ai_response LIKE ?)")
+                params += [f"%{t}%", f"%{t}%"]
+
+        sql = f"SELECT h.id, h.timestamp, h.user_input, h.ai_response FROM {source}"
+        if where:
+            sql += " WHERE " + " AND ".join(where)
+        sql += " ORDER BY h.id DESC LIMIT ?"
+        rows = conn.execute(sql, params + [limit + 1]).fetchall()
+    finally:
+        conn.close()
+
+    has_more = len(rows) > limit
+    rows = rows[:limit]
+    items = [
+        {"id": r[0], "timestamp": r[1], "user_input": r[2], "ai_response": r[3]}
+        for r in rows
+    ]
+    return {"items": items, "next_cursor": rows[-1][0] if has_more else None, "scan_limit": scan_limit}